@@ -3,14 +3,19 @@
 import sqlite3
 import json
 import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import logging
 import os
+from observability.metrics import histogram
 
 logger = logging.getLogger(__name__)
 
 DB_PATH = 'memorycore/dbs/structured/neuracity_events.db'
 
+SQLITE_WRITE_SECONDS = histogram(
+    "neuracity_sqlite_write_seconds", "Latency of structured event writes, including the commit.", ["operation"]
+)
+
 class StructuredMemory:
     """Manages the SQLite database for structured event logging."""
     def __init__(self, db_path: str = DB_PATH):
@@ -42,13 +47,28 @@ class StructuredMemory:
         timestamp = datetime.datetime.now().isoformat()
         details_json = json.dumps(details_dict)
         
-        cursor.execute(
-            "INSERT INTO events (timestamp, source, type, details) VALUES (?, ?, ?, ?)",
-            (timestamp, source, type, details_json)
-        )
-        self.conn.commit()
+        with SQLITE_WRITE_SECONDS.labels(operation="add").time():
+            cursor.execute(
+                "INSERT INTO events (timestamp, source, type, details) VALUES (?, ?, ?, ?)",
+                (timestamp, source, type, details_json)
+            )
+            self.conn.commit()
         logger.info(f"[MemoryCore-Structured] Added structured event from '{source}'.")
 
+    def add_many(self, source: str, events: List[Tuple[str, Dict[str, Any]]]):
+        """Adds several (type, details_dict) events from one source in a single transaction."""
+        if not events:
+            return
+        timestamp = datetime.datetime.now().isoformat()
+        rows = [(timestamp, source, type, json.dumps(details_dict)) for type, details_dict in events]
+
+        with SQLITE_WRITE_SECONDS.labels(operation="add_many").time(), self.conn:
+            self.conn.executemany(
+                "INSERT INTO events (timestamp, source, type, details) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        logger.info(f"[MemoryCore-Structured] Added {len(rows)} structured event(s) from '{source}'.")
+
     # --- THIS IS THE ONLY ADDITION ---
     # This new method is required by the `insightcloud` module to build its
     # analytics cache. It does not change any of your existing, working code.
@@ -69,4 +89,36 @@ class StructuredMemory:
         except Exception as e:
             logger.error(f"[MemoryCore-Structured] Failed to get recent events: {e}")
             return []
-    # --- END ADDITION ---
\ No newline at end of file
+    # --- END ADDITION ---
+
+    def get_events_since(self, last_id: int = 0, since_timestamp: str | None = None, limit: int = 5000) -> List[sqlite3.Row]:
+        """
+        Retrieves events with an id greater than 'last_id', oldest first.
+
+        Used by consumers that keep a high-water mark (such as insightcloud's
+        columnar event store) so that each poll only reads rows it has not seen yet.
+
+        Args:
+            last_id (int): The highest event id the caller has already consumed.
+            since_timestamp (str | None): Optional ISO timestamp lower bound.
+            limit (int): The maximum number of events to return.
+
+        Returns:
+            A list of sqlite3.Row objects ordered by ascending id.
+        """
+        try:
+            cursor = self.conn.cursor()
+            if since_timestamp is None:
+                cursor.execute(
+                    "SELECT id, timestamp, source, type, details FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, limit)
+                )
+            else:
+                cursor.execute(
+                    "SELECT id, timestamp, source, type, details FROM events WHERE id > ? AND timestamp >= ? ORDER BY id LIMIT ?",
+                    (last_id, since_timestamp, limit)
+                )
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"[MemoryCore-Structured] Failed to get events since id {last_id}: {e}")
+            return []
\ No newline at end of file
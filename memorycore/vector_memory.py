@@ -5,6 +5,7 @@ import chromadb
 from chromadb.utils import embedding_functions
 from typing import List, Dict, Any
 import logging
+from observability.metrics import histogram
 
 # Configure logger for this specific component
 logger = logging.getLogger(__name__)
@@ -12,6 +13,8 @@ logger = logging.getLogger(__name__)
 DB_PATH = 'memorycore/dbs/vector'
 COLLECTION_NAME = "neuracity_vector_memory"
 
+VECTOR_QUERY_SECONDS = histogram("neuracity_vector_query_seconds", "Latency of semantic queries against vector memory.")
+
 class VectorMemory:
     """Manages the ChromaDB instance for semantic search."""
     def __init__(self, db_path: str = DB_PATH):
@@ -41,7 +44,8 @@ class VectorMemory:
     def query(self, query_text: str, top_k: int = 3) -> List[str]:
         """Queries for semantically similar documents."""
         try:
-            results = self.collection.query(query_texts=[query_text], n_results=top_k)
+            with VECTOR_QUERY_SECONDS.time():
+                results = self.collection.query(query_texts=[query_text], n_results=top_k)
             return results.get('documents', [[]])[0]
         except Exception as e:
             logger.error(f"Failed to query vector memory: {e}")
@@ -3,10 +3,13 @@
 import requests
 import datetime
 import copy
+import logging
 import time
 from .utils.config import REFLEX_SYSTEM_URL
 from memorycore.memory_manager import get_memory_core
 
+logger = logging.getLogger(__name__)
+
 # --- ADDED: The URL for InsightCloud's ping endpoint ---
 INSIGHTCLOUD_URL = "http://localhost:8002"
 
@@ -23,10 +26,10 @@ def ping_insight_cloud():
             # Calls the new '/health/ping/{module_name}' endpoint in InsightCloud
             requests.post(f"{INSIGHTCLOUD_URL}/health/ping/cv_watchtower", timeout=2)
             _last_ping_time = current_time
-            print("[Integration] Sent health ping to InsightCloud.")
+            logger.debug("Sent health ping to InsightCloud.")
         except requests.exceptions.RequestException:
             # It's okay if this fails; the system should not crash.
-            print("[Integration] Warning: Could not send health ping to InsightCloud.")
+            logger.warning("Could not send health ping to InsightCloud.")
 
 
 # --- Your other two functions remain unchanged ---
@@ -44,43 +47,69 @@ def log_event_to_memorycore(event_data: dict):
             type=data_to_log.get("event_type", "generic_cv_event"),
             details_dict=data_to_log
         )
-        print(f"[Integration] Successfully logged '{data_to_log.get('event_type')}' event to MemoryCore.")
+        logger.info("Logged '%s' event to MemoryCore.", data_to_log.get('event_type'),
+                    extra={"event_type": data_to_log.get('event_type'), "camera_id": data_to_log.get('camera_id')})
     except Exception as e:
-        print(f"[Integration] ERROR: Could not log event to MemoryCore. {e}")
+        logger.error("Could not log event to MemoryCore. %s", e)
 
 
-def trigger_reflex_alert(event_data: dict):
-    """Sends a trigger to the reflex_system based on the event's priority."""
+def _build_reflex_action(event_data: dict):
+    """Maps a detected event to a reflex_system (endpoint, payload), or None if it needs no action."""
     event_type = event_data.get("event_type")
     location = event_data.get("camera_id", "Unknown Camera")
     details = event_data.get("details", {})
-    
-    endpoint = None
-    payload = None
 
     if event_type in ["FALL_DETECTED", "VIOLENCE_DETECTED", "FIRE_SMOKE_DETECTED"]:
-        endpoint = "/actions/call_security"
         reason = "Generic Emergency"
         if event_type == "FALL_DETECTED": reason = "Possible Fall Detected"
         if event_type == "VIOLENCE_DETECTED": reason = details.get("reason", "Aggressive Behavior")
         if event_type == "FIRE_SMOKE_DETECTED": reason = "Fire/Smoke Detected"
-        payload = {"location": f"{location} (CRITICAL: {reason})"}
-    
+        return "/actions/call_security", {"location": f"{location} (CRITICAL: {reason})"}
+
     elif event_type == "ABANDONED_OBJECT":
-        endpoint = "/actions/notify_admin"
-        payload = {"department": "Security", "message": f"High Priority: Unattended object at {location} for >{details.get('duration')}s."}
-    
+        return "/actions/notify_admin", {"department": "Security", "message": f"High Priority: Unattended object at {location} for >{details.get('duration')}s."}
+
     elif event_type == "INTRUSION_DETECTED":
-        endpoint = "/actions/notify_admin"
-        payload = {"department": "Security", "message": f"Alert: Intrusion detected in restricted zone at {location}."}
+        return "/actions/notify_admin", {"department": "Security", "message": f"Alert: Intrusion detected in restricted zone at {location}."}
+
+    return None
+
+
+def trigger_reflex_alert(event_data: dict):
+    """Sends a trigger to the reflex_system based on the event's priority."""
+    action = _build_reflex_action(event_data)
+    if action is None:
+        return
+    endpoint, payload = action
+
+    try:
+        response = requests.post(f"{REFLEX_SYSTEM_URL}{endpoint}", json=payload)
+        response.raise_for_status()
+        logger.info("Triggered reflex action: %s", endpoint)
+    except requests.exceptions.RequestException as e:
+        logger.error("Could not trigger reflex action. %s", e)
+
 
-    else:
+def trigger_reflex_alerts(events: list):
+    """
+    Sends every actionable event from one processing pass to reflex_system in a
+    single batch request. The server coalesces repeats of the same alert.
+    """
+    actions = []
+    for event_data in events:
+        action = _build_reflex_action(event_data)
+        if action is not None:
+            endpoint, payload = action
+            actions.append({"action": endpoint.rsplit("/", 1)[-1], **payload})
+    if not actions:
         return
 
     try:
-        if endpoint and payload:
-            response = requests.post(f"{REFLEX_SYSTEM_URL}{endpoint}", json=payload)
-            response.raise_for_status()
-            print(f"[Integration] Successfully triggered reflex action: {endpoint}")
+        response = requests.post(f"{REFLEX_SYSTEM_URL}/actions/batch", json={"actions": actions})
+        response.raise_for_status()
+        summary = response.json()
+        logger.info("Triggered %s reflex action(s) in one batch (%s coalesced as duplicates).",
+                    summary.get('dispatched'), summary.get('deduplicated'),
+                    extra={"dispatched": summary.get('dispatched'), "deduplicated": summary.get('deduplicated')})
     except requests.exceptions.RequestException as e:
-        print(f"[Integration] ERROR: Could not trigger reflex action. {e}")
\ No newline at end of file
+        logger.error("Could not trigger reflex actions. %s", e)
@@ -10,12 +10,18 @@ import cv2
 import numpy as np
 import time
 import argparse
+import logging
 from .utils import config
+from .utils.metrics import YOLO_INFERENCE_SECONDS, DETECT_EVENTS_SECONDS, FRAMES_PROCESSED, EVENTS_TRIGGERED
+from observability.http import start_metrics_server
+from observability.logs import configure_logging
 from ultralytics import YOLO
 from .processing import event_detector
-from .integrations import log_event_to_memorycore, trigger_reflex_alert, ping_insight_cloud # Import the new ping function
+from .integrations import log_event_to_memorycore, trigger_reflex_alerts, ping_insight_cloud # Import the new ping function
 import datetime
 
+logger = logging.getLogger("modules.cv_watchtower.main")
+
 def create_grid(frames: dict, cam_ids: list, grid_shape=(2, 3)):
     """Stitches frames into a grid display."""
     if not cam_ids: return np.zeros((720, 1280, 3), dtype=np.uint8)
@@ -49,12 +55,13 @@ if __name__ == "__main__":
         help="Operating mode: 'single' for webcam, 'showcase' for 6-video grid."
     )
     args = parser.parse_args()
+    configure_logging("cv_watchtower")
 
     if args.mode == "showcase":
-        print("[Watchtower Main] Starting in SHOWCASE mode...")
+        logger.info("Starting in SHOWCASE mode...")
         camera_sources, loitering_time, abandoned_time = config.SHOWCASE_VIDEO_SOURCES, config.LOITERING_TIME_SHOWCASE, config.ABANDONED_OBJECT_TIME_SHOWCASE
     else:
-        print("[Watchtower Main] Starting in SINGLE camera mode...")
+        logger.info("Starting in SINGLE camera mode...")
         camera_sources, loitering_time, abandoned_time = {"MyWebcam": config.SINGLE_CAMERA_SOURCE}, config.LOITERING_TIME_REALISTIC, config.ABANDONED_OBJECT_TIME_REALISTIC
     
     device = "mps" if config.MPS_ENABLED else "cpu"
@@ -62,13 +69,16 @@ if __name__ == "__main__":
     caps = {cam_id: cv2.VideoCapture(source) for cam_id, source in camera_sources.items()}
 
     person_tracker, object_tracker, last_alert_times, current_frames = {}, {}, {}, {}
-    print("[Watchtower Main] Starting sequential processing loop...")
+    start_metrics_server(config.METRICS_PORT)
+    logger.info("Starting sequential processing loop...")
 
     try:
         while True:
             # --- ADDED: Ping InsightCloud on each loop to show it's alive ---
             ping_insight_cloud()
 
+            # Alerts from every camera in this pass go to reflex_system in one batch request
+            triggered_events = []
             for cam_id, cap in caps.items():
                 if not cap.isOpened(): continue
                 success, frame = cap.read()
@@ -76,11 +86,14 @@ if __name__ == "__main__":
                     if isinstance(camera_sources.get(cam_id), str): cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                     continue
                 
-                results = model.track(frame, persist=True, conf=config.DETECTION_CONFIDENCE_THRESHOLD,
-                                      device=device, verbose=False, classes=[0, 24, 26, 28, 43])
+                with YOLO_INFERENCE_SECONDS.labels(camera=cam_id).time():
+                    results = model.track(frame, persist=True, conf=config.DETECTION_CONFIDENCE_THRESHOLD,
+                                          device=device, verbose=False, classes=[0, 24, 26, 28, 43])
                 
-                detected_events = event_detector.detect_events(
-                    results, person_tracker, object_tracker, frame, loitering_time, abandoned_time)
+                with DETECT_EVENTS_SECONDS.labels(camera=cam_id).time():
+                    detected_events = event_detector.detect_events(
+                        results, person_tracker, object_tracker, frame, loitering_time, abandoned_time)
+                FRAMES_PROCESSED.labels(camera=cam_id).inc()
 
                 current_time = time.time()
                 for event in detected_events:
@@ -88,9 +101,11 @@ if __name__ == "__main__":
                     if (current_time - last_alert_times.get(cooldown_key, 0)) > config.EVENT_COOLDOWN_SECONDS:
                         last_alert_times[cooldown_key] = current_time
                         event_data = {**event, "camera_id": cam_id, "timestamp": datetime.datetime.now().isoformat()}
-                        print(f"!!! [{cam_id}] TRIGGER: {event_data['event_type']} -> {event_data['details']}!!!")
+                        EVENTS_TRIGGERED.labels(camera=cam_id, event_type=event_data['event_type']).inc()
+                        logger.warning("TRIGGER [%s]: %s -> %s", cam_id, event_data['event_type'], event_data['details'],
+                                       extra={"camera_id": cam_id, "event_type": event_data['event_type']})
                         log_event_to_memorycore(event_data)
-                        trigger_reflex_alert(event_data)
+                        triggered_events.append(event_data)
 
                 annotated_frame = results[0].plot()
                 if detected_events:
@@ -98,6 +113,8 @@ if __name__ == "__main__":
                     cv2.putText(annotated_frame, event_text, (30, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 4, cv2.LINE_AA)
                 current_frames[cam_id] = annotated_frame
 
+            trigger_reflex_alerts(triggered_events)
+
             grid_display = create_grid(current_frames, list(caps.keys()))
             cv2.imshow("NeuraCity Watchtower", grid_display)
 
@@ -105,10 +122,10 @@ if __name__ == "__main__":
             time.sleep(0.01)
 
     except KeyboardInterrupt:
-        print("\n[Watchtower Main] Shutdown signal (Ctrl+C) received.")
+        logger.info("Shutdown signal (Ctrl+C) received.")
     finally:
-        print("[Watchtower Main] Releasing all video captures...")
+        logger.info("Releasing all video captures...")
         for cap in caps.values():
             cap.release()
         cv2.destroyAllWindows()
-        print("[Watchtower Main] Program has finished.")
\ No newline at end of file
+        logger.info("Program has finished.")
\ No newline at end of file
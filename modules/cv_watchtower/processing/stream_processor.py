@@ -1,13 +1,17 @@
 # File: modules/cv_watchtower/processing/stream_processor.py
 
 import cv2
+import logging
 import time
 from ultralytics import YOLO
 from ..utils.config import MODEL_PATH, DETECTION_CONFIDENCE_THRESHOLD, MPS_ENABLED, EVENT_COOLDOWN_SECONDS
+from ..utils.metrics import YOLO_INFERENCE_SECONDS, DETECT_EVENTS_SECONDS, FRAMES_PROCESSED, EVENTS_TRIGGERED
 from . import event_detector
-from ..integrations import log_event_to_memorycore, trigger_reflex_alert
+from ..integrations import log_event_to_memorycore, trigger_reflex_alerts
 import datetime
 
+logger = logging.getLogger(__name__)
+
 class StreamProcessor:
     """
     Manages the processing of a single video stream for event detection,
@@ -30,44 +34,47 @@ class StreamProcessor:
 
     def run(self):
         """Starts the video processing loop for this stream."""
-        print(f"[Processor-{self.camera_id}] Attempting to open video capture for source: '{self.stream_source}'")
+        logger.info("[%s] Attempting to open video capture for source: '%s'", self.camera_id, self.stream_source)
         cap = cv2.VideoCapture(self.stream_source)
         
         if not cap.isOpened():
-            print(f"[Processor-{self.camera_id}] ERROR: cap.isOpened() returned False. Camera or file is inaccessible.")
+            logger.error("[%s] cap.isOpened() returned False. Camera or file is inaccessible.", self.camera_id)
             return
 
-        print(f"[Processor-{self.camera_id}] Video stream opened successfully. Starting detection loop...")
+        logger.info("[%s] Video stream opened successfully. Starting detection loop...", self.camera_id)
         
         while cap.isOpened():
             success, frame = cap.read()
             if not success:
                 # If it's a file, we're done. If it's a camera, maybe try to reconnect.
                 if isinstance(self.stream_source, str):
-                    print(f"[Processor-{self.camera_id}] End of video file reached.")
+                    logger.info("[%s] End of video file reached.", self.camera_id)
                     break
                 else:
-                    print(f"[Processor-{self.camera_id}] Failed to read frame from camera. Retrying...")
+                    logger.warning("[%s] Failed to read frame from camera. Retrying...", self.camera_id)
                     time.sleep(1)
                     continue
 
             # Run YOLOv8 tracking on the frame, filtering for relevant classes to improve performance
-            results = self.model.track(
-                frame,
-                persist=True,
-                conf=DETECTION_CONFIDENCE_THRESHOLD,
-                device=self.device,
-                classes=[0, 24, 26, 28, 43], # person, backpack, handbag, suitcase, knife
-                verbose=False # Quieter logs for cleaner output
-            )
+            with YOLO_INFERENCE_SECONDS.labels(camera=self.camera_id).time():
+                results = self.model.track(
+                    frame,
+                    persist=True,
+                    conf=DETECTION_CONFIDENCE_THRESHOLD,
+                    device=self.device,
+                    classes=[0, 24, 26, 28, 43], # person, backpack, handbag, suitcase, knife
+                    verbose=False # Quieter logs for cleaner output
+                )
 
             # Pass the correct state dictionaries to the event detector.
-            detected_events = event_detector.detect_events(
-                yolo_results=results,
-                person_tracker=self.person_tracker,
-                object_tracker=self.object_tracker,
-                frame=frame
-            )
+            with DETECT_EVENTS_SECONDS.labels(camera=self.camera_id).time():
+                detected_events = event_detector.detect_events(
+                    yolo_results=results,
+                    person_tracker=self.person_tracker,
+                    object_tracker=self.object_tracker,
+                    frame=frame
+                )
+            FRAMES_PROCESSED.labels(camera=self.camera_id).inc()
             
             # Annotate frame BEFORE putting it in the queue for the grid display
             annotated_frame = results[0].plot()
@@ -80,19 +87,21 @@ class StreamProcessor:
             # Put the processed frame into the shared queue for the main display
             self.frame_queue.put((self.camera_id, annotated_frame))
 
-        print(f"[Processor-{self.camera_id}] Releasing video capture.")
+        logger.info("[%s] Releasing video capture.", self.camera_id)
         cap.release()
         
     def handle_detected_events(self, events: list):
         """Processes events, checking against a cooldown before triggering alerts."""
         current_time = time.time()
+        triggered_events = []
         
         for event in events:
             event_type = event['event_type']
             
             last_alert = self.last_alert_times.get(event_type, 0)
             if (current_time - last_alert) < EVENT_COOLDOWN_SECONDS:
-                print(f"[{self.camera_id}] Cooldown active for '{event_type}'. Ignoring.")
+                # Repeats every frame while an event persists; rate-limited by the shared logging setup
+                logger.debug("[%s] Cooldown active for '%s'. Ignoring.", self.camera_id, event_type)
                 continue
 
             # If not in cooldown, process the event fully
@@ -100,9 +109,14 @@ class StreamProcessor:
             
             event["camera_id"] = self.camera_id
             event["timestamp"] = datetime.datetime.now().isoformat()
+            EVENTS_TRIGGERED.labels(camera=self.camera_id, event_type=event_type).inc()
             
-            print(f"!!! [{self.camera_id}] TRIGGERING EVENT: {event['event_type']} with details: {event['details']}!!!")
+            logger.warning("TRIGGER [%s]: %s -> %s", self.camera_id, event['event_type'], event['details'],
+                           extra={"camera_id": self.camera_id, "event_type": event['event_type']})
             
             # Integrate with other NeuraCity modules
             log_event_to_memorycore(event)
-            trigger_reflex_alert(event)
\ No newline at end of file
+            triggered_events.append(event)
+
+        # Everything detected in this frame goes to reflex_system in one batch request
+        trigger_reflex_alerts(triggered_events)
\ No newline at end of file
@@ -35,4 +35,7 @@ FIRE_CHECK_AREA = [0, 0, 1280, 720]
 
 # --- Alerting & Integration ---
 EVENT_COOLDOWN_SECONDS = 15.0
-REFLEX_SYSTEM_URL = "http://localhost:8001/api"
\ No newline at end of file
+REFLEX_SYSTEM_URL = "http://localhost:8001/api"
+
+# --- Observability ---
+METRICS_PORT = 9103  # Prometheus-compatible exporter: http://localhost:9103/metrics
\ No newline at end of file
@@ -0,0 +1,15 @@
+# File: modules/cv_watchtower/utils/metrics.py
+# Frame-loop metrics, served by the exporter started in main.py (see METRICS_PORT).
+
+from observability.metrics import counter, histogram
+
+YOLO_INFERENCE_SECONDS = histogram(
+    "neuracity_yolo_inference_seconds", "Latency of YOLO tracking on one frame.", ["camera"]
+)
+DETECT_EVENTS_SECONDS = histogram(
+    "neuracity_detect_events_seconds", "Latency of the event heuristics on one frame.", ["camera"]
+)
+FRAMES_PROCESSED = counter("neuracity_cv_frames_processed_total", "Frames run through detection.", ["camera"])
+EVENTS_TRIGGERED = counter(
+    "neuracity_cv_events_triggered_total", "Events that passed the cooldown and were reported.", ["camera", "event_type"]
+)
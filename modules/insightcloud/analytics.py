@@ -1,82 +1,171 @@
 # File: modules/insightcloud/analytics.py
 
+import asyncio
+import datetime
 import pandas as pd
-import json
-from typing import List, Dict, Any
+import logging
+from typing import List, Dict
 from sklearn.ensemble import IsolationForest
 
-from memorycore.memory_manager import get_memory_core
+from .event_store import event_store
+from .anomaly import anomaly_detector
+from .rollups import hourly_rollup
 
-# In-memory cache to hold the last 24 hours of data for fast responses
-DATA_CACHE: pd.DataFrame = pd.DataFrame()
+logger = logging.getLogger(__name__)
+
+# --- Refresh Configuration ---
+# There is no time-window eviction: /stats is served from the hourly rollups, which stay
+# small for the full history, and the raw rows live in the columnar store on disk.
+CACHE_REFRESH_INTERVAL_SECONDS = 30 # How often the background task ingests new events
+
+# --- Anomaly Detection Configuration ---
+ANOMALY_BASELINE_DAYS = 28                 # History replayed into the streaming detector on startup
+ANOMALY_MODEL_REFIT_ENABLED = True         # Periodically refit IsolationForest in the background
+ANOMALY_MODEL_REFIT_INTERVAL_SECONDS = 900
+ANOMALY_MODEL_HISTORY_DAYS = 7             # Hourly counts the IsolationForest is fitted on
+
+_refresh_lock = asyncio.Lock()
+
+# Set once the rollups and anomaly baselines have been seeded from the columnar store
+_streaming_seeded: bool = False
+
+# Results of the latest background IsolationForest fit
+_model_anomalies: List[Dict] = []
+
+# Bumped whenever any cached analytics state changes; materialized results are keyed on it
+CACHE_GENERATION: int = 0
+
+def to_store_time(value: datetime.datetime | None) -> datetime.datetime | None:
+    """
+    Events are stored with naive local timestamps; a timezone-aware bound
+    (e.g. '...Z' in a query string) is converted to that before comparing.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+def _bump_generation():
+    global CACHE_GENERATION
+    CACHE_GENERATION += 1
+
+def _observe_new_events(frame: pd.DataFrame):
+    """Feeds one batch of just-ingested events to the hourly rollups and the streaming anomaly detector."""
+    hourly_rollup.update_from_frame(frame)
+    anomaly_detector.observe_frame(frame)
+
+def _update_streaming_state() -> tuple[int, bool]:
+    """
+    Ingests new events into the columnar store and feeds the same rows to the
+    hourly rollups and the streaming anomaly detector. Runs in a worker thread.
+    Returns the number of events stored and whether the rollups or detector changed.
+    """
+    global _streaming_seeded
+    before = (hourly_rollup.last_event_id, anomaly_detector.closed_hours)
+    if not _streaming_seeded:
+        # Seed once from the columnar store: full history for the rollups, recent weeks for the baselines
+        history = event_store.scan(columns=["id", "timestamp", "source", "type"]).to_pandas()
+        if not history.empty:
+            history = history.sort_values("id")
+            hourly_rollup.update_from_frame(history)
+            baseline_start = datetime.datetime.now() - datetime.timedelta(days=ANOMALY_BASELINE_DAYS)
+            anomaly_detector.observe_frame(history[history["timestamp"] >= baseline_start])
+        _streaming_seeded = True
+    stored = event_store.ingest_new_events(on_batch=_observe_new_events)
+    anomaly_detector.advance_to(datetime.datetime.now())
+    return stored, (hourly_rollup.last_event_id, anomaly_detector.closed_hours) != before
 
 async def refresh_data_cache() -> bool:
     """
-    Fetches recent structured events from MemoryCore and populates the
-    in-memory pandas DataFrame cache for fast analytical queries.
+    Incrementally updates the columnar event store, and from the same new rows
+    the hourly rollups and anomaly baselines every /stats endpoint is served from.
     """
-    global DATA_CACHE
-    try:
-        # 1. Fetch raw event rows from the correct structured memory backend
-        all_events_rows = get_memory_core().structured.get_recent_events(n=1000)
-        
-        if not all_events_rows:
-            print("[Analytics] No events found in MemoryCore to build cache.")
-            DATA_CACHE = pd.DataFrame() # Ensure cache is empty
+    async with _refresh_lock:
+        try:
+            stored, streaming_changed = await asyncio.to_thread(_update_streaming_state)
+            if stored or streaming_changed:
+                _bump_generation()
+            if stored:
+                logger.info("Data refreshed: %d events stored.", stored, extra={"stored": stored})
             return True
+        except Exception as e:
+            logger.error("Failed to refresh data cache. %s", e)
+            return False
 
-        # 2. Convert sqlite3.Row objects to a list of standard dictionaries
-        all_events = [dict(row) for row in all_events_rows]
+async def start_background_refresher():
+    """The main loop that keeps the data cache current without manual refreshes."""
+    logger.info("Starting background cache refresher task...")
+    while True:
+        await asyncio.sleep(CACHE_REFRESH_INTERVAL_SECONDS)
+        await refresh_data_cache()
 
-        # 3. Create a powerful pandas DataFrame
-        df = pd.DataFrame(all_events)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # 4. Robustly parse the 'details' JSON string into separate columns
-        # This "flattens" the data, making it much easier to analyze
-        try:
-            # Use json_normalize which is perfect for nested JSON
-            details_df = pd.json_normalize(df['details'].apply(json.loads))
-            # Combine the flattened details with the main DataFrame
-            df = pd.concat([df.drop('details', axis=1), details_df], axis=1)
-        except (TypeError, json.JSONDecodeError):
-            print("[Analytics] Warning: Could not parse all 'details' fields into columns.")
-
-
-        DATA_CACHE = df
-        print(f"[Analytics] Data cache refreshed successfully with {len(DATA_CACHE)} events.")
-        return True
-    except Exception as e:
-        print(f"[Analytics] ERROR: Failed to refresh data cache. {e}", exc_info=True)
-        return False
-
-def get_events_per_day() -> Dict:
-    """Aggregates event counts by day."""
-    if DATA_CACHE.empty: return {}
-    events_by_day = DATA_CACHE.set_index('timestamp').resample('D').size()
-    # Format for clean JSON output
-    return {timestamp.strftime('%Y-%m-%d'): count for timestamp, count in events_by_day.items()}
-
-def get_events_by_module() -> Dict:
-    """Groups event counts by the source module."""
-    if DATA_CACHE.empty: return {}
-    return DATA_CACHE.groupby('source')['id'].count().to_dict()
-
-def find_anomalies() -> List[Dict]:
-    """Uses IsolationForest to detect anomalous spikes in event frequency."""
-    if DATA_CACHE.empty or len(DATA_CACHE) < 10:
-        return [{"message": "Not enough data to perform anomaly detection."}]
-    
-    events_per_hour = DATA_CACHE.set_index('timestamp').resample('h').size().reset_index(name='count')
-    if len(events_per_hour) < 2: return [] # Need at least 2 data points
+def get_events_per_day(granularity: str = "day", start: datetime.datetime | None = None,
+                       end: datetime.datetime | None = None) -> Dict:
+    """Aggregates event counts per day (or another granularity) from the hourly rollups."""
+    return hourly_rollup.events_over_time(granularity, start=start, end=end)
+
+def get_events_by_module(start: datetime.datetime | None = None, end: datetime.datetime | None = None) -> Dict:
+    """Groups event counts by the source module from the hourly rollups."""
+    return hourly_rollup.events_by('source', start=start, end=end)
+
+def get_event_counts(group_by: str, start: datetime.datetime | None = None,
+                     end: datetime.datetime | None = None) -> Dict:
+    """Ad-hoc event counts grouped by 'source' or 'type' within an optional time range."""
+    return event_store.count_by(group_by, start=start, end=end)
+
+def refit_anomaly_model() -> List[Dict]:
+    """
+    Fits IsolationForest on hourly event counts from the columnar store and
+    stores the flagged hours. Runs in a worker thread, never inside a request.
+    """
+    global _model_anomalies
+    start = datetime.datetime.now() - datetime.timedelta(days=ANOMALY_MODEL_HISTORY_DAYS)
+    timestamps = event_store.scan(columns=['timestamp'], start=start).column('timestamp').to_pandas()
+    if len(timestamps) < 10:
+        _model_anomalies = []
+        return _model_anomalies
+
+    events_per_hour = pd.Series(1, index=pd.DatetimeIndex(timestamps)).sort_index().resample('h').size()
+    events_per_hour = events_per_hour.rename_axis('timestamp').reset_index(name='count')
+    if len(events_per_hour) < 2:
+        _model_anomalies = []
+        return _model_anomalies
 
     model = IsolationForest(contamination=0.1, random_state=42) # Assume up to 10% are anomalies
     events_per_hour['anomaly'] = model.fit_predict(events_per_hour[['count']])
-    
     anomalies = events_per_hour[events_per_hour['anomaly'] == -1]
-    
-    return [{
+
+    _model_anomalies = [{
         "timestamp_hour": row['timestamp'].isoformat(),
         "event_count": int(row['count']),
+        "scope": "all",
+        "detector": "isolation_forest",
         "details": "Unusually high number of events detected in this hour."
-    } for _, row in anomalies.iterrows()]
\ No newline at end of file
+    } for _, row in anomalies.iterrows()]
+    return _model_anomalies
+
+async def start_background_model_refitter():
+    """The main loop that periodically refits the IsolationForest model."""
+    logger.info("Starting background anomaly model refit task...")
+    while True:
+        try:
+            anomalies = await asyncio.to_thread(refit_anomaly_model)
+            _bump_generation()
+            logger.info("Anomaly model refitted; %d anomalous hours flagged.", len(anomalies))
+        except Exception as e:
+            logger.error("Failed to refit anomaly model. %s", e)
+        await asyncio.sleep(ANOMALY_MODEL_REFIT_INTERVAL_SECONDS)
+
+def find_anomalies(start: datetime.datetime | None = None, end: datetime.datetime | None = None) -> List[Dict]:
+    """
+    Returns precomputed anomalies: spikes found by the streaming detector (for
+    the whole system, per source and per type) plus the last background model fit.
+    """
+    if anomaly_detector.closed_hours == 0 and not _model_anomalies:
+        return [{"message": "Not enough data to perform anomaly detection."}]
+    anomalies = anomaly_detector.get_anomalies() + _model_anomalies
+    start, end = to_store_time(start), to_store_time(end)
+    if start or end:
+        anomalies = [a for a in anomalies
+                     if (start is None or datetime.datetime.fromisoformat(a["timestamp_hour"]) >= start)
+                     and (end is None or datetime.datetime.fromisoformat(a["timestamp_hour"]) < end)]
+    return anomalies
@@ -0,0 +1,126 @@
+# File: modules/insightcloud/anomaly.py
+
+import datetime
+import math
+from collections import Counter, deque
+from typing import Dict, List
+
+import pandas as pd
+
+HOURS_PER_WEEK = 168
+EWMA_ALPHA = 0.2                  # Weight of the newest hour in each baseline
+Z_SCORE_THRESHOLD = 3.0           # How many standard deviations above the baseline counts as a spike
+MIN_BASELINE_OBSERVATIONS = 3     # Weeks of history a slot needs before it can flag anomalies
+MIN_STD_DEV = 1.0                 # Floor for the deviation so near-constant baselines don't over-trigger
+MAX_REPORTED_ANOMALIES = 500
+
+class SeasonalBaseline:
+    """EWMA mean and variance of hourly event counts for each hour of the week."""
+    __slots__ = ("alpha", "mean", "var", "observations")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.mean = [0.0] * HOURS_PER_WEEK
+        self.var = [0.0] * HOURS_PER_WEEK
+        self.observations = [0] * HOURS_PER_WEEK
+
+    def score(self, slot: int, count: int) -> float:
+        """Returns the z-score of 'count' against the baseline of this slot."""
+        std_dev = max(math.sqrt(self.var[slot]), MIN_STD_DEV)
+        return (count - self.mean[slot]) / std_dev
+
+    def update(self, slot: int, count: int):
+        if self.observations[slot] == 0:
+            self.mean[slot] = float(count)
+        else:
+            diff = count - self.mean[slot]
+            increment = self.alpha * diff
+            self.mean[slot] += increment
+            self.var[slot] = (1 - self.alpha) * (self.var[slot] + diff * increment)
+        self.observations[slot] += 1
+
+
+class StreamingAnomalyDetector:
+    """
+    Detects spikes in hourly event counts as events arrive.
+
+    Counts are kept for the whole system, per source and per type. When an hour
+    closes, each count is compared to its hour-of-week baseline and the baseline
+    is updated, so serving anomalies is just a read of precomputed results.
+    """
+    def __init__(self, alpha: float = EWMA_ALPHA, z_threshold: float = Z_SCORE_THRESHOLD,
+                 min_observations: int = MIN_BASELINE_OBSERVATIONS):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_observations = min_observations
+        self.baselines: Dict[str, SeasonalBaseline] = {}
+        self.anomalies: deque = deque(maxlen=MAX_REPORTED_ANOMALIES)
+        self.last_event_id: int = 0
+        self.closed_hours: int = 0
+        self._current_hour: datetime.datetime | None = None
+        self._current_counts: Counter = Counter()
+
+    def observe(self, event_id: int, timestamp: datetime.datetime, source: str, event_type: str):
+        """Counts one event. Events already seen (by id) or for an already closed hour are skipped."""
+        if event_id <= self.last_event_id:
+            return
+        self.last_event_id = event_id
+
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        if self._current_hour is None:
+            self._current_hour = hour
+        elif hour > self._current_hour:
+            self._close_hours_until(hour)
+        elif hour < self._current_hour:
+            return
+
+        self._current_counts["all"] += 1
+        self._current_counts[f"source:{source}"] += 1
+        self._current_counts[f"type:{event_type}"] += 1
+
+    def observe_frame(self, df: pd.DataFrame):
+        """Feeds a batch of events with 'id', 'timestamp', 'source' and 'type' columns."""
+        for event_id, timestamp, source, event_type in zip(df["id"], df["timestamp"], df["source"], df["type"]):
+            self.observe(int(event_id), timestamp.to_pydatetime(), source, event_type)
+
+    def advance_to(self, now: datetime.datetime):
+        """Closes every hour before 'now', so quiet hours also count as observations."""
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        if self._current_hour is not None and hour > self._current_hour:
+            self._close_hours_until(hour)
+
+    def _close_hours_until(self, hour: datetime.datetime):
+        # After a long gap, only the last week matters: every slot gets one fresh observation
+        if hour - self._current_hour > datetime.timedelta(hours=HOURS_PER_WEEK):
+            self._close_hour(self._current_hour)
+            self._current_hour = hour - datetime.timedelta(hours=HOURS_PER_WEEK)
+        while self._current_hour < hour:
+            self._close_hour(self._current_hour)
+            self._current_hour += datetime.timedelta(hours=1)
+
+    def _close_hour(self, hour: datetime.datetime):
+        slot = hour.weekday() * 24 + hour.hour
+        for scope in set(self.baselines) | set(self._current_counts):
+            baseline = self.baselines.setdefault(scope, SeasonalBaseline(self.alpha))
+            count = self._current_counts.get(scope, 0)
+            if baseline.observations[slot] >= self.min_observations:
+                z_score = baseline.score(slot, count)
+                if z_score >= self.z_threshold:
+                    self.anomalies.append({
+                        "timestamp_hour": hour.isoformat(),
+                        "event_count": count,
+                        "expected_count": round(baseline.mean[slot], 2),
+                        "z_score": round(z_score, 2),
+                        "scope": scope,
+                        "detector": "seasonal_ewma",
+                        "details": "Unusually high number of events detected in this hour."
+                    })
+            baseline.update(slot, count)
+        self._current_counts.clear()
+        self.closed_hours += 1
+
+    def get_anomalies(self) -> List[Dict]:
+        """Returns the anomalies found so far, newest first. Safe to call while another thread observes."""
+        return list(self.anomalies)[::-1]
+
+anomaly_detector = StreamingAnomalyDetector()
@@ -1,20 +1,35 @@
 # File: modules/insightcloud/app.py
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
+from typing import Literal
 import asyncio
+import datetime
+import logging
 from . import analytics, realtime
 from .healthcheck import health_checker
+from .health_history import health_history
+from .materialized import materialized_results, conditional_response
+from .broadcast import live_broadcaster
+from observability.http import instrument_app, SSE_HEADERS
+from observability.logs import configure_logging
+
+configure_logging("insightcloud")
+logger = logging.getLogger(__name__)
 
 # Global handles for background tasks for graceful shutdown
 redis_listener_task = None
 health_checker_task = None
+cache_refresher_task = None
+model_refitter_task = None
+broadcaster_task = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manages the startup and shutdown of background services and clients."""
-    global redis_listener_task, health_checker_task
-    print("[InsightCloud] Application starting up...")
+    global redis_listener_task, health_checker_task, cache_refresher_task, model_refitter_task, broadcaster_task
+    logger.info("Application starting up...")
     
     # 1. Initialize the persistent HTTP client for the Health Checker
     health_checker.initialize_client()
@@ -22,17 +37,21 @@ async def lifespan(app: FastAPI):
     # 2. Start the background tasks
     redis_listener_task = await realtime.live_analytics.register_with_reflex()
     health_checker_task = asyncio.create_task(health_checker.start_background_checker())
+    broadcaster_task = asyncio.create_task(live_broadcaster.run(realtime.live_analytics.get_overview))
     
-    # 3. Build the initial analytics cache
+    # 3. Build the initial analytics cache and keep it topped up in the background
     await analytics.refresh_data_cache()
+    cache_refresher_task = asyncio.create_task(analytics.start_background_refresher())
+    if analytics.ANOMALY_MODEL_REFIT_ENABLED:
+        model_refitter_task = asyncio.create_task(analytics.start_background_model_refitter())
     
     yield
     
     # --- On Application Shutdown ---
-    print("[InsightCloud] Application shutting down...")
+    logger.info("Application shutting down...")
     
     # 1. Cancel background tasks
-    tasks = [t for t in [redis_listener_task, health_checker_task] if t]
+    tasks = [t for t in [redis_listener_task, health_checker_task, cache_refresher_task, model_refitter_task, broadcaster_task] if t]
     for task in tasks:
         task.cancel()
     
@@ -41,7 +60,7 @@ async def lifespan(app: FastAPI):
 
     # 2. Gracefully close the health checker's HTTP client
     await health_checker.close_client()
-    print("[InsightCloud] Shutdown complete.")
+    logger.info("Shutdown complete.")
     
 app = FastAPI(
     title="NeuraCity InsightCloud",
@@ -49,6 +68,8 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+# Request latency histograms and GET /metrics
+instrument_app(app)
 
 # --- THE ONLY NEW ADDITION IS THIS ENDPOINT ---
 @app.post("/health/ping/{module_name}", summary="Allows a module to report its own health")
@@ -65,22 +86,90 @@ def report_health(module_name: str):
 def get_module_health():
     return health_checker.get_status()
 
+@app.get("/stats/module_health/history", summary="Probe Latency, Uptime and Outages of All Modules")
+def get_module_health_history(window_seconds: int = Query(3600, ge=60, le=30 * 86400)):
+    """
+    p50/p95 probe latency, uptime percentage and outage intervals of every module
+    over the window. A plain 'def': windows older than the in-memory rings are
+    read from SQLite, which must not block the event loop.
+    """
+    return [health_history.summary(name, window_seconds) for name in health_checker.registered_modules]
+
+@app.get("/stats/module_health/{module_name}/history", summary="Probe Latency, Uptime and Outages of One Module")
+def get_single_module_health_history(module_name: str, window_seconds: int = Query(3600, ge=60, le=30 * 86400)):
+    if module_name not in health_checker.registered_modules:
+        raise HTTPException(status_code=404, detail=f"Unknown module '{module_name}'.")
+    return health_history.summary(module_name, window_seconds)
+
+@app.get("/health", summary="Liveness Probe")
+def health():
+    """Cheap liveness probe; touches no database or cache."""
+    return {"status": "ok"}
+
+# The /stats endpoints below are served from results materialized once per cache
+# generation and support conditional GETs (If-None-Match / If-Modified-Since).
+# They are plain 'def' so a recompute after a refresh runs in the threadpool, not on the event loop.
+# Timezone-aware start/end bounds are converted to the store's naive local time.
 @app.get("/stats/events_per_day", summary="Get Historical Event Counts Per Day")
-def get_events_per_day():
-    return analytics.get_events_per_day()
+def get_events_per_day(request: Request, granularity: Literal["hour", "day", "week", "month"] = "day",
+                       start: datetime.datetime | None = None, end: datetime.datetime | None = None):
+    start, end = analytics.to_store_time(start), analytics.to_store_time(end)
+    result = materialized_results.get(
+        ("events_per_day", granularity, start, end), analytics.CACHE_GENERATION,
+        lambda: analytics.get_events_per_day(granularity, start=start, end=end)
+    )
+    return conditional_response(request, result)
 
 @app.get("/stats/events_by_module", summary="Get Historical Event Counts by Source Module")
-def get_events_by_module():
-    return analytics.get_events_by_module()
+def get_events_by_module(request: Request, start: datetime.datetime | None = None,
+                         end: datetime.datetime | None = None):
+    start, end = analytics.to_store_time(start), analytics.to_store_time(end)
+    result = materialized_results.get(
+        ("events_by_module", start, end), analytics.CACHE_GENERATION,
+        lambda: analytics.get_events_by_module(start=start, end=end)
+    )
+    return conditional_response(request, result)
+
+@app.get("/stats/event_counts", summary="Get Event Counts Grouped by Source or Type")
+def get_event_counts(group_by: Literal["source", "type"] = "type",
+                     start: datetime.datetime | None = None, end: datetime.datetime | None = None):
+    start, end = analytics.to_store_time(start), analytics.to_store_time(end)
+    return analytics.get_event_counts(group_by, start=start, end=end)
 
 @app.get("/stats/anomalies", summary="Detect Anomalous Event Spikes")
-def find_anomalies():
-    return analytics.find_anomalies()
+def find_anomalies(request: Request, start: datetime.datetime | None = None,
+                   end: datetime.datetime | None = None):
+    start, end = analytics.to_store_time(start), analytics.to_store_time(end)
+    result = materialized_results.get(
+        ("anomalies", start, end), analytics.CACHE_GENERATION,
+        lambda: analytics.find_anomalies(start=start, end=end)
+    )
+    return conditional_response(request, result)
 
 @app.get("/stats/realtime_overview", summary="Get Live System Overview")
 def get_realtime_overview():
     return realtime.live_analytics.get_overview()
 
+@app.get("/stats/realtime_rates", summary="Get Live Event Rates Over a Sliding Window")
+def get_realtime_rates(window_seconds: int = Query(60, ge=1, le=86400), top_k: int = Query(5, ge=1, le=50)):
+    return realtime.live_analytics.get_rates(window_seconds, top_k)
+
+@app.get("/stream/live", summary="Stream Live Events and Overview Updates (Server-Sent Events)")
+async def stream_live():
+    """
+    A Server-Sent Events stream for dashboards. It starts with a full overview
+    snapshot, then pushes coalesced batches of live events ('events') and
+    changed overview fields ('overview') as they happen.
+    """
+    subscriber = live_broadcaster.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many live stream clients connected.")
+    return StreamingResponse(
+        live_broadcaster.stream(subscriber, realtime.live_analytics.get_overview()),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @app.post("/system/refresh_cache", summary="Manually Refresh Historical Data Cache")
 async def refresh_cache():
     success = await analytics.refresh_data_cache()
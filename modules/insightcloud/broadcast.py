@@ -0,0 +1,144 @@
+# File: modules/insightcloud/broadcast.py
+
+import asyncio
+import logging
+import time
+from typing import Callable, Optional, Set
+
+from observability.http import format_sse
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 1.0      # Live events are coalesced and pushed at most once per interval
+OVERVIEW_INTERVAL_SECONDS = 5.0   # How often an overview delta is considered
+MAX_EVENTS_PER_FLUSH = 50         # Events beyond this within one interval are counted, not sent
+CLIENT_QUEUE_SIZE = 32            # Pending messages per client before the oldest is dropped
+SLOW_CLIENT_DROP_LIMIT = 20       # Consecutive drops after which a client is disconnected
+MAX_SUBSCRIBERS = 1000
+KEEPALIVE_SECONDS = 15.0
+
+
+class Subscriber:
+    """A connected client and its bounded message queue."""
+    __slots__ = ("queue", "dropped", "consecutive_drops", "closed")
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.consecutive_drops = 0
+        self.closed = False
+
+
+class LiveBroadcaster:
+    """
+    Fans out live events and overview deltas to many Server-Sent Events clients.
+
+    The Redis listener only appends to a pending batch. A single flush task
+    serializes each batch once and offers the same bytes to every client's
+    bounded queue; clients that fall behind lose their oldest messages and are
+    disconnected if they stay behind.
+    """
+    def __init__(self, queue_size: int = CLIENT_QUEUE_SIZE, drop_limit: int = SLOW_CLIENT_DROP_LIMIT):
+        self.queue_size = queue_size
+        self.drop_limit = drop_limit
+        self.subscribers: Set[Subscriber] = set()
+        self._pending_events: list = []
+        self._pending_overflow = 0
+        self._last_overview: dict = {}
+        self._last_overview_time = 0.0
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """Registers a new client, or returns None if the server is at capacity."""
+        if len(self.subscribers) >= MAX_SUBSCRIBERS:
+            return None
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish_event(self, event: dict):
+        """Queues a live event for the next flush. Called once per Redis message."""
+        if not self.subscribers:
+            return
+        if len(self._pending_events) < MAX_EVENTS_PER_FLUSH:
+            self._pending_events.append(event)
+        else:
+            self._pending_overflow += 1
+
+    def _offer(self, subscriber: Subscriber, message: Optional[bytes]):
+        try:
+            subscriber.queue.put_nowait(message)
+            subscriber.consecutive_drops = 0
+            return
+        except asyncio.QueueFull:
+            pass
+
+        # Slow consumer: drop its oldest message to make room for the newest one
+        subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(message)
+        subscriber.dropped += 1
+        subscriber.consecutive_drops += 1
+        if subscriber.consecutive_drops >= self.drop_limit:
+            self._disconnect(subscriber)
+
+    def _disconnect(self, subscriber: Subscriber):
+        """Replaces a client's backlog with the end-of-stream marker."""
+        subscriber.closed = True
+        self.unsubscribe(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def flush(self, overview: Optional[dict] = None):
+        """Sends the coalesced events (and an overview delta, if given and changed) to every client."""
+        messages = []
+        if self._pending_events:
+            messages.append(format_sse("events", {
+                "events": self._pending_events,
+                "coalesced_overflow": self._pending_overflow
+            }))
+            self._pending_events, self._pending_overflow = [], 0
+
+        if overview is not None:
+            delta = {key: value for key, value in overview.items() if self._last_overview.get(key) != value}
+            if delta:
+                messages.append(format_sse("overview", delta))
+                self._last_overview = overview
+
+        for message in messages:
+            for subscriber in list(self.subscribers):
+                self._offer(subscriber, message)
+
+    async def run(self, overview_provider: Callable[[], dict]):
+        """The background loop that flushes pending messages to all clients."""
+        logger.info("Live stream broadcaster is now running in the background.")
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            if not self.subscribers:
+                continue
+            overview = None
+            now = time.monotonic()
+            if now - self._last_overview_time >= OVERVIEW_INTERVAL_SECONDS:
+                overview = overview_provider()
+                self._last_overview_time = now
+            self.flush(overview)
+
+    async def stream(self, subscriber: Subscriber, snapshot: dict):
+        """Yields SSE messages for one client, starting with a full overview snapshot."""
+        try:
+            yield format_sse("overview", snapshot)
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+live_broadcaster = LiveBroadcaster()
@@ -0,0 +1,187 @@
+# File: modules/insightcloud/event_store.py
+
+import os
+import re
+import datetime
+import functools
+import operator
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from memorycore.memory_manager import get_memory_core
+
+STORE_PATH = 'memorycore/dbs/columnar/events'
+INGEST_BATCH_SIZE = 5000
+COMPACT_AFTER_FILES = 16  # Merge a day's small part files once it has this many
+
+# Part files are named after the id range they contain, so the high-water mark
+# can be recovered from the directory listing alone after a restart.
+_PART_FILE_PATTERN = re.compile(r"part-(\d+)-(\d+)\.parquet$")
+_PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("timestamp", pa.timestamp("us")),
+    ("source", pa.string()),
+    ("type", pa.string()),
+    ("details", pa.string()),
+])
+_DATASET_SCHEMA = _SCHEMA.append(pa.field("day", pa.string()))
+
+
+class ColumnarEventStore:
+    """
+    A Parquet copy of the structured event log, partitioned by day.
+
+    It is fed incrementally from StructuredMemory (only rows above the stored
+    high-water mark are read) and answers analytical queries with vectorized
+    column reads, so scans over months of events never re-parse JSON.
+    """
+    def __init__(self, store_path: str = STORE_PATH):
+        self.store_path = store_path
+        os.makedirs(self.store_path, exist_ok=True)
+        self.last_event_id = self._load_high_water_mark()
+
+    # --- Layout helpers ---
+
+    def _day_dir(self, day: str) -> str:
+        return os.path.join(self.store_path, f"day={day}")
+
+    def _part_files(self, day: Optional[str] = None) -> List[str]:
+        """Lists part files, optionally for a single day, in id order."""
+        day_dirs = [self._day_dir(day)] if day else [
+            os.path.join(self.store_path, d) for d in os.listdir(self.store_path) if d.startswith("day=")
+        ]
+        files = []
+        for day_dir in day_dirs:
+            if os.path.isdir(day_dir):
+                files.extend(os.path.join(day_dir, f) for f in os.listdir(day_dir) if _PART_FILE_PATTERN.match(f))
+        return sorted(files, key=lambda f: int(_PART_FILE_PATTERN.search(f).group(1)))
+
+    def _load_high_water_mark(self) -> int:
+        last_ids = [int(_PART_FILE_PATTERN.search(f).group(2)) for f in self._part_files()]
+        return max(last_ids, default=0)
+
+    def _write_part(self, day: str, table: pa.Table) -> str:
+        """Writes one part file atomically (temp file + rename) and returns its path."""
+        day_dir = self._day_dir(day)
+        os.makedirs(day_dir, exist_ok=True)
+        ids = table.column("id")
+        name = f"part-{pc.min(ids).as_py():012d}-{pc.max(ids).as_py():012d}.parquet"
+        tmp_path = os.path.join(day_dir, f".{name}.tmp")
+        final_path = os.path.join(day_dir, name)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, final_path)
+        return final_path
+
+    # --- Ingestion ---
+
+    def ingest_new_events(self, on_batch: Optional[Callable[[pd.DataFrame], None]] = None) -> int:
+        """
+        Appends every StructuredMemory event newer than the high-water mark.
+        Each appended batch is also passed to 'on_batch' (as 'id', 'timestamp',
+        'source' and 'type' columns), so consumers never read the rows twice.
+        Returns the row count.
+        """
+        structured = get_memory_core().structured
+        ingested, touched_days = 0, set()
+        while True:
+            rows = structured.get_events_since(self.last_event_id, limit=INGEST_BATCH_SIZE)
+            if not rows:
+                break
+            days, df = self._append_rows(rows)
+            touched_days.update(days)
+            if on_batch is not None:
+                on_batch(df.drop(columns="details"))
+            ingested += len(rows)
+            if len(rows) < INGEST_BATCH_SIZE:
+                break
+
+        for day in touched_days:
+            if len(self._part_files(day)) >= COMPACT_AFTER_FILES:
+                self.compact_day(day)
+        return ingested
+
+    def _append_rows(self, rows: list) -> tuple[List[str], pd.DataFrame]:
+        """Writes the rows to their day partitions. Returns the days touched and the rows as a DataFrame."""
+        ids, timestamps, sources, types, details = zip(*rows)
+        df = pd.DataFrame({
+            "id": ids,
+            "timestamp": pd.to_datetime(timestamps, format="ISO8601"),
+            "source": sources,
+            "type": types,
+            "details": details,
+        })
+        # ISO timestamps start with the date, which is all the partition key needs
+        days = [ts[:10] for ts in timestamps]
+        rows_by_day: Dict[str, List[int]] = defaultdict(list)
+        for i, day in enumerate(days):
+            rows_by_day[day].append(i)
+
+        table = pa.Table.from_pandas(df, schema=_SCHEMA, preserve_index=False)
+        for day, indices in rows_by_day.items():
+            self._write_part(day, table.take(indices))
+        self.last_event_id = ids[-1]
+        return list(rows_by_day), df
+
+    def compact_day(self, day: str):
+        """Merges all part files of one day into a single file."""
+        files = self._part_files(day)
+        if len(files) < 2:
+            return
+        merged = pa.concat_tables([pq.read_table(f, schema=_SCHEMA) for f in files])
+        merged_path = self._write_part(day, merged)
+        for f in files:
+            if f != merged_path:
+                os.remove(f)
+
+    # --- Queries ---
+
+    def count_by_day(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> Dict[str, int]:
+        """Event counts per day, read from Parquet footers without touching any column data."""
+        counts: Dict[str, int] = defaultdict(int)
+        for f in self._part_files():
+            day = os.path.basename(os.path.dirname(f))[len("day="):]
+            if (start and day < start.isoformat()) or (end and day > end.isoformat()):
+                continue
+            counts[day] += pq.ParquetFile(f).metadata.num_rows
+        return dict(sorted(counts.items()))
+
+    def scan(self, columns: Optional[List[str]] = None,
+             start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None) -> pa.Table:
+        """
+        Reads the requested columns for events in [start, end).
+
+        Day partitions outside the range are pruned before any file is opened.
+        """
+        files = self._part_files()
+        if not files:
+            return _SCHEMA.empty_table().select(columns or _SCHEMA.names)
+
+        dataset = ds.dataset(files, schema=_DATASET_SCHEMA, format="parquet",
+                             partitioning=_PARTITIONING, partition_base_dir=self.store_path)
+        conditions = []
+        if start:
+            conditions += [ds.field("day") >= start.date().isoformat(),
+                           ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us"))]
+        if end:
+            conditions += [ds.field("day") <= end.date().isoformat(),
+                           ds.field("timestamp") < pa.scalar(end, pa.timestamp("us"))]
+        expression = functools.reduce(operator.and_, conditions) if conditions else None
+        return dataset.to_table(columns=columns or _SCHEMA.names, filter=expression)
+
+    def count_by(self, column: str, start: Optional[datetime.datetime] = None,
+                 end: Optional[datetime.datetime] = None) -> Dict[str, int]:
+        """Event counts grouped by a single column (e.g. 'source' or 'type')."""
+        table = self.scan(columns=[column], start=start, end=end)
+        if table.num_rows == 0:
+            return {}
+        counts = pc.value_counts(table.column(column))
+        return {item["values"].as_py(): item["counts"].as_py() for item in counts}
+
+event_store = ColumnarEventStore()
@@ -0,0 +1,357 @@
+# File: modules/insightcloud/health_history.py
+
+import os
+import time
+import json
+import array
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from observability.metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DB_PATH = 'memorycore/dbs/structured/module_health.db'
+PROBE_HISTORY_SIZE = 2048          # Probe samples kept in memory per module (~5.7 h at a 10 s interval)
+TRANSITION_HISTORY_SIZE = 256      # Status transitions kept in memory per module
+ROLLUP_BUCKET_SECONDS = 300        # Persisted probe rollups are 5-minute buckets
+ROLLUP_RETENTION_SECONDS = 30 * 86400
+FLUSH_INTERVAL_SECONDS = 60.0
+# Upper bounds (ms) of the latency histogram stored with every rollup bucket
+LATENCY_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Statuses that count as the module being up, and those that are neither up nor down
+UP_STATUSES = {"Healthy"}
+UNOBSERVED_STATUSES = {"Unknown"}
+
+def _histogram_percentile(counts: List[int], maximum: float, p: float) -> Optional[float]:
+    """Approximates a percentile as the upper bound of the bucket it falls in."""
+    total = sum(counts)
+    if not total:
+        return None
+    target, cumulative = p * total, 0
+    for bound, count in zip(LATENCY_BOUNDS_MS, counts):
+        cumulative += count
+        if cumulative > target:
+            return float(min(bound, maximum))
+    return round(maximum, 3)
+
+def _iso(ts: float) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+class ProbeRing:
+    """
+    The most recent probe results of one module in fixed-size arrays
+    (timestamp, latency, success): constant memory, O(1) to record.
+    """
+    def __init__(self, capacity: int = PROBE_HISTORY_SIZE):
+        self.capacity = capacity
+        self._timestamps = array.array('d', bytes(8 * capacity))
+        self._latencies_ms = array.array('d', bytes(8 * capacity))
+        self._ok = bytearray(capacity)
+        self._next = 0
+        self.size = 0
+
+    def record(self, ts: float, latency_ms: float, ok: bool):
+        self._timestamps[self._next] = ts
+        self._latencies_ms[self._next] = latency_ms
+        self._ok[self._next] = ok
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    @property
+    def oldest_timestamp(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return self._timestamps[(self._next - self.size) % self.capacity]
+
+    def since(self, start: float) -> List[Tuple[float, float, bool]]:
+        """(timestamp, latency_ms, ok) of the samples recorded at or after 'start', oldest first."""
+        samples = []
+        for offset in range(self.size):
+            index = (self._next - self.size + offset) % self.capacity
+            if self._timestamps[index] >= start:
+                samples.append((self._timestamps[index], self._latencies_ms[index], bool(self._ok[index])))
+        return samples
+
+
+class _RollupBucket:
+    __slots__ = ("probes", "failures", "latency_sum_ms", "latency_max_ms", "histogram")
+
+    def __init__(self):
+        self.probes = 0
+        self.failures = 0
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.histogram = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+    def add(self, latency_ms: float, ok: bool):
+        self.probes += 1
+        if not ok:
+            self.failures += 1
+            return
+        self.latency_sum_ms += latency_ms
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+        index = next((i for i, bound in enumerate(LATENCY_BOUNDS_MS) if latency_ms <= bound), len(LATENCY_BOUNDS_MS))
+        self.histogram[index] += 1
+
+
+class HealthHistory:
+    """
+    Probe latency and status-transition history for every monitored module.
+
+    Recent history lives in per-module ring buffers. Probe results are also
+    rolled up into 5-minute buckets (count, failures, latency histogram) and,
+    with every transition, written to SQLite by a background flush, so
+    windows longer than the rings (or from before a restart) are answered
+    from the rollups.
+    """
+    def __init__(self, db_path: str = HISTORY_DB_PATH):
+        self.db_path = db_path
+        self.probes: Dict[str, ProbeRing] = {}
+        self.transitions: Dict[str, deque] = {}
+        self._open_buckets: Dict[Tuple[str, int], _RollupBucket] = {}
+        self._pending_transitions: List[Tuple[str, float, str, str]] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    # --- Recording (called from the health checker; O(1), no I/O) ---
+
+    def record_probe(self, module: str, latency_ms: float, ok: bool, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        ring = self.probes.get(module)
+        if ring is None:
+            ring = self.probes[module] = ProbeRing()
+        ring.record(now, latency_ms, ok)
+        bucket_start = int(now // ROLLUP_BUCKET_SECONDS) * ROLLUP_BUCKET_SECONDS
+        bucket = self._open_buckets.get((module, bucket_start))
+        if bucket is None:
+            bucket = self._open_buckets[(module, bucket_start)] = _RollupBucket()
+        bucket.add(latency_ms, ok)
+
+    def record_transition(self, module: str, status: str, previous_status: str, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        history = self.transitions.get(module)
+        if history is None:
+            history = self.transitions[module] = deque(maxlen=TRANSITION_HISTORY_SIZE)
+        history.append((now, status))
+        self._pending_transitions.append((module, now, status, previous_status))
+
+    # --- Persistence ---
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS probe_rollups (
+                        module TEXT NOT NULL,
+                        bucket_start INTEGER NOT NULL,
+                        probes INTEGER NOT NULL,
+                        failures INTEGER NOT NULL,
+                        latency_sum_ms REAL NOT NULL,
+                        latency_max_ms REAL NOT NULL,
+                        latency_histogram TEXT NOT NULL,
+                        PRIMARY KEY (module, bucket_start)
+                    )
+                """)
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS status_transitions (
+                        module TEXT NOT NULL,
+                        ts REAL NOT NULL,
+                        status TEXT NOT NULL,
+                        previous_status TEXT NOT NULL
+                    )
+                """)
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_transitions_module_ts ON status_transitions (module, ts)")
+        return self._conn
+
+    def _take_pending(self, now: float) -> Tuple[list, list, list]:
+        """
+        Snapshots what needs writing. Runs on the event loop, so it never races
+        with record_probe()/record_transition().
+        """
+        current_start = int(now // ROLLUP_BUCKET_SECONDS) * ROLLUP_BUCKET_SECONDS
+        rows = [(module, start, b.probes, b.failures, b.latency_sum_ms, b.latency_max_ms, json.dumps(b.histogram))
+                for (module, start), b in self._open_buckets.items()]
+        # Ended buckets are dropped once written; the current one is rewritten on every flush
+        ended = [key for key in self._open_buckets if key[1] < current_start]
+        transitions, self._pending_transitions = self._pending_transitions, []
+        return rows, transitions, ended
+
+    def _write(self, rows: list, transitions: list, now: float):
+        """Writes rollup buckets and transitions in one transaction and applies retention."""
+        with self._db_lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO probe_rollups VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany("INSERT INTO status_transitions VALUES (?, ?, ?, ?)", transitions)
+                conn.execute("DELETE FROM probe_rollups WHERE bucket_start < ?", (now - ROLLUP_RETENTION_SECONDS,))
+                conn.execute("DELETE FROM status_transitions WHERE ts < ?", (now - ROLLUP_RETENTION_SECONDS,))
+
+    def flush(self, now: Optional[float] = None):
+        """Persists the open rollup buckets and pending transitions (blocking)."""
+        now = time.time() if now is None else now
+        rows, transitions, ended = self._take_pending(now)
+        self._write(rows, transitions, now)
+        self._drop_buckets(ended)
+
+    def _drop_buckets(self, keys: list):
+        for key in keys:
+            self._open_buckets.pop(key, None)
+
+    async def flush_async(self):
+        """Like flush(), with the SQLite write done off the event loop."""
+        now = time.time()
+        rows, transitions, ended = self._take_pending(now)
+        try:
+            await asyncio.to_thread(self._write, rows, transitions, now)
+        except sqlite3.Error as e:
+            # Nothing is lost: the buckets are still in memory and the transitions are queued again
+            self._pending_transitions[:0] = transitions
+            logger.error("Could not persist module health history: %s", e)
+            return
+        self._drop_buckets(ended)
+
+    async def run_flusher(self):
+        """Periodically persists history until cancelled, then flushes once more."""
+        try:
+            while True:
+                await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+                await self.flush_async()
+        finally:
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error("Could not persist module health history on shutdown: %s", e)
+
+    def _query(self, sql: str, params: tuple) -> list:
+        if self._conn is None and not os.path.exists(self.db_path):
+            return []
+        with self._db_lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    # --- Queries (run in the threadpool; the in-memory history is read, never modified) ---
+
+    def _ring_covers(self, oldest: float, full: bool, start: float, table: str, column: str, module: str) -> bool:
+        """
+        Whether a ring holds everything in the window: it reaches back past the
+        window start, or it has never wrapped and nothing older was persisted
+        (e.g. by a previous run).
+        """
+        if oldest <= start:
+            return True
+        if full:
+            return False
+        return not self._query(f"SELECT 1 FROM {table} WHERE module = ? AND {column} < ? LIMIT 1", (module, oldest))
+
+    def _latency(self, module: str, start: float, now: float) -> dict:
+        ring = self.probes.get(module)
+        if ring is not None and ring.size and self._ring_covers(ring.oldest_timestamp, ring.size == ring.capacity, start,
+                                                                  "probe_rollups", "bucket_start", module):
+            samples = ring.since(start)
+            ok_latencies = sorted(latency for _, latency, ok in samples if ok)
+            return {
+                "probes": len(samples),
+                "failures": sum(1 for _, _, ok in samples if not ok),
+                "latency_ms_p50": percentile(ok_latencies, 0.50),
+                "latency_ms_p95": percentile(ok_latencies, 0.95),
+                "latency_ms_max": round(ok_latencies[-1], 3) if ok_latencies else None,
+                "latency_source": "probes",
+            }
+
+        # The window reaches past the ring: merge persisted and still-open rollup buckets
+        first_bucket = int(start // ROLLUP_BUCKET_SECONDS) * ROLLUP_BUCKET_SECONDS
+        merged: Dict[int, tuple] = {
+            bucket_start: (probes, failures, latency_max, json.loads(histogram))
+            for bucket_start, probes, failures, latency_max, histogram in self._query(
+                "SELECT bucket_start, probes, failures, latency_max_ms, latency_histogram FROM probe_rollups "
+                "WHERE module = ? AND bucket_start >= ?", (module, first_bucket))
+        }
+        for (name, bucket_start), b in list(self._open_buckets.items()):
+            if name == module and bucket_start >= first_bucket:
+                merged[bucket_start] = (b.probes, b.failures, b.latency_max_ms, b.histogram)
+
+        histogram = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        probes = failures = 0
+        latency_max = 0.0
+        for bucket_probes, bucket_failures, bucket_max, bucket_histogram in merged.values():
+            probes += bucket_probes
+            failures += bucket_failures
+            latency_max = max(latency_max, bucket_max)
+            histogram = [a + b for a, b in zip(histogram, bucket_histogram)]
+        return {
+            "probes": probes,
+            "failures": failures,
+            "latency_ms_p50": _histogram_percentile(histogram, latency_max, 0.50),
+            "latency_ms_p95": _histogram_percentile(histogram, latency_max, 0.95),
+            "latency_ms_max": round(latency_max, 3) if sum(histogram) else None,
+            "latency_source": "rollups",
+        }
+
+    def _timeline(self, module: str, start: float) -> List[Tuple[float, str]]:
+        """Transitions in the window, preceded by the last one before it (the status at 'start')."""
+        # A copy: summaries are computed in the threadpool while the event loop records transitions
+        history = list(self.transitions.get(module, ()))
+        if history and self._ring_covers(history[0][0], len(history) == TRANSITION_HISTORY_SIZE, start,
+                                         "status_transitions", "ts", module):
+            before = [entry for entry in history if entry[0] <= start][-1:]
+            return before + [entry for entry in history if entry[0] > start]
+
+        rows = self._query(
+            "SELECT ts, status FROM (SELECT ts, status FROM status_transitions WHERE module = ? AND ts <= ? "
+            "ORDER BY ts DESC LIMIT 1) UNION ALL SELECT ts, status FROM status_transitions WHERE module = ? AND ts > ? "
+            "ORDER BY ts", (module, start, module, start))
+        timeline = [(ts, status) for ts, status in rows]
+        latest = timeline[-1][0] if timeline else float("-inf")
+        # Transitions not flushed yet
+        timeline += [entry for entry in history if entry[0] > max(start, latest)]
+        return timeline
+
+    def _availability(self, module: str, start: float, now: float) -> dict:
+        timeline = self._timeline(module, start)
+        up_seconds = observed_seconds = 0.0
+        outages = []
+        for index, (ts, status) in enumerate(timeline):
+            begin = max(ts, start)
+            end = timeline[index + 1][0] if index + 1 < len(timeline) else now
+            if end <= begin or status in UNOBSERVED_STATUSES:
+                continue
+            observed_seconds += end - begin
+            if status in UP_STATUSES:
+                up_seconds += end - begin
+            elif outages and outages[-1]["_end"] == begin:
+                # Consecutive non-healthy statuses (e.g. Unresponsive -> Unreachable) are one outage
+                outages[-1]["_end"] = end
+                outages[-1]["statuses"].append(status)
+            else:
+                outages.append({"_start": begin, "_end": end, "statuses": [status]})
+
+        return {
+            "uptime_percent": round(100 * up_seconds / observed_seconds, 3) if observed_seconds else None,
+            "observed_seconds": round(observed_seconds, 1),
+            "outages": [{
+                "start": _iso(outage["_start"]),
+                "end": _iso(outage["_end"]) if outage["_end"] < now else None,
+                "duration_seconds": round(outage["_end"] - outage["_start"], 1),
+                "statuses": outage["statuses"],
+            } for outage in outages],
+        }
+
+    def summary(self, module: str, window_seconds: float, now: Optional[float] = None) -> dict:
+        """p50/p95 probe latency, uptime percentage and outage intervals of one module over the window."""
+        now = time.time() if now is None else now
+        start = now - window_seconds
+        return {
+            "module": module,
+            "window_seconds": window_seconds,
+            **self._latency(module, start, now),
+            **self._availability(module, start, now),
+        }
+
+health_history = HealthHistory()
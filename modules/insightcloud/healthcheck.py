@@ -1,45 +1,125 @@
 # File: modules/insightcloud/healthcheck.py
 
 import time
+import random
 import asyncio
+import logging
 import httpx
-from typing import Dict, List
+from typing import Dict, List, Optional
+from .broadcast import live_broadcaster
+from .health_history import health_history
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_INTERVAL_SECONDS = 20.0   # For server modules that do not set their own 'interval'
+CHECK_JITTER_RATIO = 0.2                # Each wait is randomised by +/-20% so probes never align
+MAX_BACKOFF_SECONDS = 300.0             # Ceiling for the back-off of an unreachable module
+STARTUP_SPREAD_SECONDS = 2.0            # First probes are spread over this window after startup
+STALE_SWEEP_INTERVAL_SECONDS = 5.0      # How often heartbeat-driven modules are checked for staleness
+PROBE_TIMEOUT_SECONDS = 5.0
+
+def next_check_delay(interval: float, consecutive_failures: int, jitter_ratio: float = CHECK_JITTER_RATIO) -> float:
+    """
+    Seconds until a module's next probe: its interval, doubled for every
+    consecutive failure up to MAX_BACKOFF_SECONDS, with random jitter.
+    """
+    delay = min(interval * (2 ** consecutive_failures), max(interval, MAX_BACKOFF_SECONDS))
+    return delay * random.uniform(1 - jitter_ratio, 1 + jitter_ratio)
+
 
 class HealthCheck:
     """
     Proactively and passively tracks the health of all NeuraCity modules.
-    This is the definitive, robust, and final implementation.
+
+    Each server module is probed on its own schedule (interval, jitter and
+    exponential back-off while it is down) against a lightweight /health
+    endpoint. Heartbeat-driven modules are marked stale by a background sweep.
+    Every status transition is computed in the background, logged and
+    published on the live stream, so get_status() only copies prepared state.
+    Transitions are not published to Redis: this process's own listener would
+    receive them back and broadcast them a second time.
     """
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(HealthCheck, cls).__new__(cls)
             cls.registered_modules: Dict[str, dict] = {
-                'neuranlp_agent': {"type": "server", "url": "http://localhost:8000/health", "last_seen": 0.0, "status": "Unknown"},
-                'reflex_system':  {"type": "server", "url": "http://localhost:8001/", "last_seen": 0.0, "status": "Unknown"},
-                'insightcloud':   {"type": "server", "url": "http://localhost:8002/docs", "last_seen": 0.0, "status": "Unknown"},
+                'neuranlp_agent': {"type": "server", "url": "http://localhost:8000/health", "interval": 30.0, "last_seen": 0.0, "status": "Unknown"},
+                'reflex_system':  {"type": "server", "url": "http://localhost:8001/health", "interval": 10.0, "last_seen": 0.0, "status": "Unknown"},
+                # InsightCloud is this process: it is healthy for as long as it can answer
+                'insightcloud':   {"type": "self", "last_seen": 0.0, "status": "Unknown"},
                 'cv_watchtower':  {"type": "event_driven", "last_seen": 0.0, "status": "Unknown"},
                 'iot_pulsenet':   {"type": "event_driven", "last_seen": 0.0, "status": "Unknown"}
             }
-            cls.check_interval_seconds = 20
+            cls.check_interval_seconds = DEFAULT_CHECK_INTERVAL_SECONDS
             cls.unhealthy_threshold_seconds = 65.0
             # Note: For Python < 3.10, Union[httpx.AsyncClient, None] is the more formal type hint
             cls.http_client: httpx.AsyncClient | None = None
+            cls._snapshot: Dict[str, dict] = {}
+            cls._status_list: List[Dict] = []
+            cls._instance._rebuild_snapshot()
         return cls._instance
 
     def initialize_client(self):
         """Creates the persistent HTTP client for active checks."""
         if self.http_client is None:
-            self.http_client = httpx.AsyncClient(timeout=5.0)
-            print("[HealthCheck] HTTP client initialized.")
+            self.http_client = httpx.AsyncClient(timeout=PROBE_TIMEOUT_SECONDS)
+            logger.info("HTTP client initialized.")
 
     async def close_client(self):
         """Gracefully closes the HTTP client on shutdown."""
         if self.http_client:
             await self.http_client.aclose()
             self.http_client = None
-            print("[HealthCheck] HTTP client closed.")
+            logger.info("HTTP client closed.")
+
+    # --- State ---
+
+    def _rebuild_snapshot(self):
+        """Builds one reusable status entry per module; later updates touch only that entry."""
+        self._snapshot = {
+            name: {"module": name, "status": details["status"], "last_seen_iso": self._format_last_seen(details["last_seen"])}
+            for name, details in self.registered_modules.items()
+        }
+        self._status_list = list(self._snapshot.values())
+
+    @staticmethod
+    def _format_last_seen(last_seen: float) -> str:
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(last_seen)) if last_seen > 0 else "Never"
+
+    def _mark_seen(self, module_name: str, now: Optional[float] = None):
+        now = now or time.time()
+        self.registered_modules[module_name]["last_seen"] = now
+        entry = self._snapshot.get(module_name)
+        if entry is not None:
+            entry["last_seen_iso"] = self._format_last_seen(now)
+
+    def _set_status(self, module_name: str, new_status: str, reason: str):
+        """Records a status and, if it changed, logs and publishes the transition."""
+        module = self.registered_modules[module_name]
+        previous = module["status"]
+        if previous == new_status:
+            return
+        module["status"] = new_status
+        health_history.record_transition(module_name, new_status, previous)
+        entry = self._snapshot.get(module_name)
+        if entry is None:
+            self._rebuild_snapshot()
+        else:
+            entry["status"] = new_status
+
+        log = logger.warning if new_status != "Healthy" else logger.info
+        log("Status change for %s: %s -> %s (%s).", module_name, previous, new_status, reason,
+            extra={"module_name": module_name, "status": new_status, "previous_status": previous})
+        live_broadcaster.publish_event({
+            "event_type": "MODULE_STATUS_CHANGED",
+            "source": "insightcloud",
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "payload": {"module": module_name, "status": new_status, "previous_status": previous, "reason": reason},
+        })
+
+    # --- Passive (heartbeat) updates ---
 
     def ping_from_event(self, module_name: str):
         """
@@ -47,55 +127,65 @@ class HealthCheck:
         for script-based modules, or from the Redis listener for passive updates.
         """
         if module_name in self.registered_modules:
-            module = self.registered_modules[module_name]
-            if module["status"] != "Healthy":
-                print(f"[HealthCheck] Status for {module_name} is now Healthy (via ping).")
-            module["last_seen"] = time.time()
-            module["status"] = "Healthy"
-            
-    async def _check_endpoint(self, module_name: str, url: str):
-        """Asynchronously checks a single server module's health endpoint."""
-        if not self.http_client: return
-
-        current_status = self.registered_modules[module_name]["status"]
-        new_status = current_status
+            self._mark_seen(module_name)
+            self._set_status(module_name, "Healthy", "ping")
+
+    def sweep_stale(self, now: Optional[float] = None):
+        """Marks modules whose last sign of life is older than their threshold as stale."""
+        now = now or time.time()
+        for module_name, details in self.registered_modules.items():
+            if details["type"] == "self":
+                self._mark_seen(module_name, now)
+                self._set_status(module_name, "Healthy", "running")
+                continue
+            threshold = max(self.unhealthy_threshold_seconds, 3 * details.get("interval", 0.0))
+            if details["status"] == "Healthy" and (now - details["last_seen"]) > threshold:
+                self._set_status(module_name, "Unhealthy (Stale)", f"no heartbeat for {now - details['last_seen']:.0f}s")
+
+    # --- Active probes ---
+
+    async def _check_endpoint(self, module_name: str, url: str) -> bool:
+        """Probes a single server module's health endpoint. Returns True if it is healthy."""
+        if not self.http_client: return False
+
+        started = time.perf_counter()
         try:
             response = await self.http_client.get(url)
             new_status = "Healthy" if 200 <= response.status_code < 400 else "Unresponsive"
-        except httpx.RequestError:
-            new_status = "Unreachable"
-        
-        if current_status != new_status:
-             print(f"[HealthCheck] Status change for {module_name}: {new_status}")
+            reason = f"HTTP {response.status_code}"
+        except httpx.RequestError as e:
+            new_status, reason = "Unreachable", type(e).__name__
+        health_history.record_probe(module_name, (time.perf_counter() - started) * 1000, new_status == "Healthy")
 
-        self.registered_modules[module_name]["status"] = new_status
         if new_status == "Healthy":
-            self.registered_modules[module_name]["last_seen"] = time.time()
+            self._mark_seen(module_name)
+        self._set_status(module_name, new_status, reason)
+        return new_status == "Healthy"
 
-    async def start_background_checker(self):
-        """The main loop for the proactive (server-pinging) health checker."""
-        print("[HealthCheck] Starting background active health checker task...")
+    async def _probe_loop(self, module_name: str):
+        """Probes one server module forever on its own jittered, backed-off schedule."""
+        details = self.registered_modules[module_name]
+        interval = details.get("interval", self.check_interval_seconds)
+        failures = 0
+        await asyncio.sleep(random.uniform(0, STARTUP_SPREAD_SECONDS))
         while True:
-            await asyncio.sleep(self.check_interval_seconds)
-            print("[HealthCheck] Running scheduled health checks for server modules...")
-            tasks = [self._check_endpoint(name, details["url"]) 
-                     for name, details in self.registered_modules.items() if details["type"] == "server"]
-            await asyncio.gather(*tasks)
+            healthy = await self._check_endpoint(module_name, details["url"])
+            failures = 0 if healthy else failures + 1
+            await asyncio.sleep(next_check_delay(interval, failures))
+
+    async def _stale_sweeper(self):
+        while True:
+            self.sweep_stale()
+            await asyncio.sleep(STALE_SWEEP_INTERVAL_SECONDS)
+
+    async def start_background_checker(self):
+        """Runs the per-module probe loops, the staleness sweep and the history flush until cancelled."""
+        logger.info("Starting background active health checker task...")
+        loops = [self._probe_loop(name) for name, details in self.registered_modules.items() if details["type"] == "server"]
+        await asyncio.gather(self._stale_sweeper(), health_history.run_flusher(), *loops)
 
     def get_status(self) -> List[Dict]:
-        """Returns the current health status of all registered modules."""
-        current_time = time.time()
-        for module_name, details in self.registered_modules.items():
-            if (current_time - details["last_seen"]) > self.unhealthy_threshold_seconds and details["status"] == "Healthy":
-                print(f"[HealthCheck] Status for {module_name} has become Stale.")
-                details["status"] = "Unhealthy (Stale)"
-        
-        return [
-            {
-                "module": name,
-                "status": details["status"],
-                "last_seen_iso": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(details["last_seen"])) if details["last_seen"] > 0 else "Never"
-            } for name, details in self.registered_modules.items()
-        ]
-
-health_checker = HealthCheck()
\ No newline at end of file
+        """Returns a copy of the current health status of all registered modules (precomputed)."""
+        return [dict(entry) for entry in self._status_list]
+
+health_checker = HealthCheck()
@@ -0,0 +1,84 @@
+# File: modules/insightcloud/materialized.py
+
+import datetime
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Hashable
+
+from fastapi import Request, Response
+
+MAX_MATERIALIZED_RESULTS = 256
+
+@dataclass
+class MaterializedResult:
+    generation: int
+    body: bytes
+    etag: str
+    last_modified: datetime.datetime
+
+
+class MaterializedResults:
+    """
+    Serialized endpoint results, computed at most once per cache generation.
+
+    Each result carries a content-hash ETag and the time its content last
+    changed, so dashboards that poll can be answered with 304 Not Modified.
+    """
+    def __init__(self, max_entries: int = MAX_MATERIALIZED_RESULTS):
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Hashable, MaterializedResult]" = OrderedDict()
+        # Endpoints call get() from the threadpool; compute() itself runs outside the lock
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: int, compute: Callable[[], Any]) -> MaterializedResult:
+        """Returns the result for 'key', recomputing it only if the generation has moved on."""
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None and result.generation == generation:
+                self._results.move_to_end(key)
+                return result
+        body = json.dumps(compute(), default=str).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if result is not None and result.etag == etag:
+            # Same content as before: keep the original Last-Modified time
+            last_modified = result.last_modified
+        else:
+            last_modified = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        result = MaterializedResult(generation, body, etag, last_modified)
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+def conditional_response(request: Request, result: MaterializedResult) -> Response:
+    """Builds a JSON response, or a 304 if the client's copy is still current."""
+    headers = {
+        "ETag": result.etag,
+        "Last-Modified": format_datetime(result.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        client_etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if result.etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers=headers)
+    elif (if_modified_since := request.headers.get("if-modified-since")) is not None:
+        try:
+            if result.last_modified <= parsedate_to_datetime(if_modified_since):
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return Response(content=result.body, media_type="application/json", headers=headers)
+
+materialized_results = MaterializedResults()
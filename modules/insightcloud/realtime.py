@@ -2,14 +2,32 @@
 
 import asyncio
 import json
-import aioredis
+import logging
+import os
+import socket
+from redis import asyncio as aioredis
 from collections import Counter
 from .healthcheck import health_checker
+from .broadcast import live_broadcaster
+from .sliding_window import SlidingWindowMetrics
 
 REDIS_HOST = "localhost"
 REDIS_PORT = 6379
 EVENT_CHANNEL = "campus_notifications"
 
+# --- Event Transport (must match reflex_system's NEURACITY_EVENT_TRANSPORT) ---
+EVENT_TRANSPORT = os.getenv("NEURACITY_EVENT_TRANSPORT", "pubsub")
+EVENT_STREAM = "campus_events"
+CONSUMER_GROUP = "insightcloud"
+# A stable consumer name lets a restarted instance re-read its own unacknowledged entries
+CONSUMER_NAME = os.getenv("INSIGHTCLOUD_CONSUMER_NAME", f"insightcloud-{socket.gethostname()}")
+STREAM_READ_COUNT = 100
+STREAM_BLOCK_MS = 5000
+STREAM_RETRY_MIN_SECONDS = 1    # Back-off after a failed read, doubled up to the maximum
+STREAM_RETRY_MAX_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
 class RealtimeAnalytics:
     """Manages the Redis subscription and updates live analytics data."""
     _instance = None
@@ -20,53 +38,146 @@ class RealtimeAnalytics:
             cls.live_event_count: int = 0
             cls.live_event_types: Counter = Counter()
             cls.last_event: dict = {}
+            cls.window_metrics = SlidingWindowMetrics()
+            cls.stream_last_id: str = "0"
         return cls._instance
 
     async def register_with_reflex(self):
         """Starts the Redis subscription and returns the background task handle."""
-        print("[Realtime] Starting Redis subscription...")
+        logger.info("Starting Redis subscription...")
         try:
             self.redis = await aioredis.from_url(f"redis://{REDIS_HOST}:{REDIS_PORT}")
+            if EVENT_TRANSPORT == "streams":
+                await self.ensure_consumer_group()
+                task = asyncio.create_task(self._stream_listener())
+                logger.info("Successfully joined group '%s' on Redis stream: '%s'", CONSUMER_GROUP, EVENT_STREAM)
+                return task
+
             self.pubsub = self.redis.pubsub()
             await self.pubsub.subscribe(EVENT_CHANNEL)
             
             task = asyncio.create_task(self._event_listener())
-            print(f"[Realtime] Successfully subscribed to Redis channel: '{EVENT_CHANNEL}'")
+            logger.info("Successfully subscribed to Redis channel: '%s'", EVENT_CHANNEL)
             return task
         except Exception as e:
-            print(f"[Realtime] FATAL: Could not subscribe to Redis. Live analytics disabled. {e}")
+            logger.error("Could not subscribe to Redis. Live analytics disabled. %s", e)
             return None
 
+    def _process_event(self, raw_message):
+        """Updates all live statistics for one event received from Redis."""
+        try:
+            event_data = json.loads(raw_message)
+            event_type = event_data.get("event_type", "unknown")
+            
+            # 1. Update live stats
+            self.live_event_count += 1
+            self.live_event_types[event_type] += 1
+            self.last_event = event_data
+
+            # Events on the bus are published by reflex_system unless they say otherwise
+            event_payload = event_data.get('payload', {})
+            self.window_metrics.record(
+                event_type,
+                event_data.get("source", "reflex_system"),
+                event_payload.get("camera_id")
+            )
+
+            # 2. Hand the event to the live stream for the next coalesced push
+            live_broadcaster.publish_event(event_data)
+            
+            # --- THE ONLY CHANGE IS HERE ---
+            # For any event that contains a camera_id, we know cv_watchtower
+            # must be alive. We safely put its name in the ping queue.
+            if "camera_id" in event_payload:
+                health_checker.ping_from_event('cv_watchtower')
+            # --- END CHANGE ---
+            
+            logger.debug("Received live event: '%s'.", event_type, extra={"event_type": event_type})
+
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning("Could not parse message from Redis: %s", e)
+
     async def _event_listener(self):
         """The core loop that listens for messages from Redis."""
-        print("[Realtime] Event listener is now running in the background.")
+        logger.info("Event listener is now running in the background.")
         try:
             async for message in self.pubsub.listen():
                 if message["type"] == "message":
-                    try:
-                        event_data = json.loads(message["data"])
-                        event_type = event_data.get("event_type", "unknown")
-                        
-                        # 1. Update live stats
-                        self.live_event_count += 1
-                        self.live_event_types[event_type] += 1
-                        self.last_event = event_data
-                        
-                        # --- THE ONLY CHANGE IS HERE ---
-                        # For any event that contains a camera_id, we know cv_watchtower
-                        # must be alive. We safely put its name in the ping queue.
-                        event_payload = event_data.get('payload', {})
-                        if "camera_id" in event_payload:
-                            health_checker.ping_from_event('cv_watchtower')
-                        # --- END CHANGE ---
-                        
-                        print(f"[Realtime] Received live event: '{event_type}'.")
-
-                    except (json.JSONDecodeError, KeyError) as e:
-                        print(f"[Realtime] WARNING: Could not parse message from Redis: {e}")
+                    self._process_event(message["data"])
 
         except asyncio.CancelledError:
-            print("[Realtime] Event listener is shutting down.")
+            logger.info("Event listener is shutting down.")
+        finally:
+            if hasattr(self, 'redis') and self.redis:
+                await self.redis.close()
+
+    # --- Redis Streams transport ---
+
+    async def ensure_consumer_group(self):
+        """Creates the consumer group (and the stream) if they do not exist yet."""
+        try:
+            await self.redis.xgroup_create(EVENT_STREAM, CONSUMER_GROUP, id="$", mkstream=True)
+        except aioredis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read_stream_batch(self, block_ms: int | None = STREAM_BLOCK_MS) -> int:
+        """
+        Reads, processes and acknowledges one batch of stream entries.
+
+        Starts from id '0', i.e. entries delivered to this consumer before a
+        restart but never acknowledged, then switches to new entries ('>').
+        Returns the number of entries handled.
+        """
+        response = await self.redis.xreadgroup(
+            CONSUMER_GROUP, CONSUMER_NAME, {EVENT_STREAM: self.stream_last_id},
+            count=STREAM_READ_COUNT, block=None if self.stream_last_id == "0" else block_ms
+        )
+        entries = response[0][1] if response else []
+        if not entries:
+            if self.stream_last_id == "0":
+                self.stream_last_id = ">"  # Backlog replayed; continue with new entries
+            return 0
+
+        for _entry_id, fields in entries:
+            # Entries trimmed away while pending come back without fields; they are just acknowledged
+            if fields and b"data" in fields:
+                self._process_event(fields[b"data"])
+        await self.redis.xack(EVENT_STREAM, CONSUMER_GROUP, *[entry_id for entry_id, _ in entries])
+        return len(entries)
+
+    async def _stream_listener(self):
+        """The core loop that consumes the Redis stream through the consumer group."""
+        logger.info("Stream listener is now running in the background.")
+        retry_seconds = STREAM_RETRY_MIN_SECONDS
+        try:
+            while True:
+                try:
+                    await self.read_stream_batch()
+                    retry_seconds = STREAM_RETRY_MIN_SECONDS
+                    continue
+                except aioredis.ConnectionError as e:
+                    logger.warning("Lost connection to Redis stream, retrying in %ss. %s", retry_seconds, e)
+                    self.stream_last_id = "0"  # Re-read anything delivered but not acknowledged
+                except aioredis.ResponseError as e:
+                    if "NOGROUP" not in str(e):
+                        logger.error("Redis stream read failed, retrying in %ss. %s", retry_seconds, e)
+                    else:
+                        # The stream or its group was deleted (e.g. FLUSHALL); recreate and start over
+                        logger.warning("Consumer group '%s' is missing; recreating it.", CONSUMER_GROUP)
+                        self.stream_last_id = "0"
+                        try:
+                            await self.ensure_consumer_group()
+                        except Exception as group_error:
+                            logger.error("Could not recreate consumer group '%s'. %s", CONSUMER_GROUP, group_error)
+                except Exception:
+                    # Never let one bad batch end live analytics for the life of the process
+                    logger.exception("Stream listener failed, retrying in %ss.", retry_seconds)
+                await asyncio.sleep(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, STREAM_RETRY_MAX_SECONDS)
+
+        except asyncio.CancelledError:
+            logger.info("Stream listener is shutting down.")
         finally:
             if hasattr(self, 'redis') and self.redis:
                 await self.redis.close()
@@ -79,4 +190,8 @@ class RealtimeAnalytics:
             "most_recent_event": self.last_event
         }
 
+    def get_rates(self, window_seconds: float = 60, top_k: int = 5) -> dict:
+        """Returns live event rates over a sliding window of up to one day."""
+        return self.window_metrics.summary(window_seconds, top_k)
+
 live_analytics = RealtimeAnalytics()
\ No newline at end of file
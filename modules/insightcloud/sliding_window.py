@@ -0,0 +1,102 @@
+# File: modules/insightcloud/sliding_window.py
+
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# (bucket width in seconds, number of buckets): per-second for the last minute,
+# per-minute for the last hour and per-hour for the last day.
+RESOLUTIONS: List[Tuple[int, int]] = [(1, 60), (60, 60), (3600, 24)]
+MAX_WINDOW_SECONDS = max(width * count for width, count in RESOLUTIONS)
+
+
+class TimeBucketedCounter:
+    """
+    Event counts in a fixed ring of time buckets.
+
+    Each slot remembers which absolute bucket it holds, so a stale slot is
+    reset lazily when it is reused. Recording is O(1); a window query is
+    O(buckets).
+    """
+    def __init__(self, bucket_seconds: int, num_buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self._bucket_ids = [-1] * num_buckets
+        self._totals = [0] * num_buckets
+        self._keys = [Counter() for _ in range(num_buckets)]
+
+    @property
+    def span_seconds(self) -> int:
+        return self.bucket_seconds * self.num_buckets
+
+    def record(self, keys: Tuple, now: float):
+        bucket_id = int(now // self.bucket_seconds)
+        slot = bucket_id % self.num_buckets
+        if self._bucket_ids[slot] != bucket_id:
+            self._bucket_ids[slot] = bucket_id
+            self._totals[slot] = 0
+            self._keys[slot].clear()
+        self._totals[slot] += 1
+        self._keys[slot].update(keys)
+
+    def _live_slots(self, window_seconds: float, now: float):
+        current = int(now // self.bucket_seconds)
+        oldest = current - max(1, round(window_seconds / self.bucket_seconds)) + 1
+        for slot, bucket_id in enumerate(self._bucket_ids):
+            if oldest <= bucket_id <= current:
+                yield slot
+
+    def total(self, window_seconds: float, now: float) -> int:
+        return sum(self._totals[slot] for slot in self._live_slots(window_seconds, now))
+
+    def key_counts(self, window_seconds: float, now: float) -> Counter:
+        counts = Counter()
+        for slot in self._live_slots(window_seconds, now):
+            counts.update(self._keys[slot])
+        return counts
+
+
+class SlidingWindowMetrics:
+    """
+    Live event rates over the last minute, hour or day, broken down by event
+    type, source module and camera, in constant memory per active key.
+    """
+    def __init__(self):
+        self.counters = [TimeBucketedCounter(width, count) for width, count in RESOLUTIONS]
+
+    def record(self, event_type: str, source: str, camera_id: Optional[str] = None, now: Optional[float] = None):
+        """Counts one event in every resolution."""
+        now = time.time() if now is None else now
+        keys = [("type", event_type), ("source", source)]
+        if camera_id:
+            keys.append(("camera", camera_id))
+        for counter in self.counters:
+            counter.record(keys, now)
+
+    def _counter_for(self, window_seconds: float) -> TimeBucketedCounter:
+        """The finest resolution whose span covers the window."""
+        for counter in self.counters:
+            if window_seconds <= counter.span_seconds:
+                return counter
+        return self.counters[-1]
+
+    def summary(self, window_seconds: float = 60, top_k: int = 5, now: Optional[float] = None) -> Dict:
+        """Events/sec, the top-K event types and per-camera and per-source rates over the window."""
+        now = time.time() if now is None else now
+        window_seconds = min(window_seconds, MAX_WINDOW_SECONDS)
+        counter = self._counter_for(window_seconds)
+        key_counts = counter.key_counts(window_seconds, now)
+        total = counter.total(window_seconds, now)
+
+        def by_dimension(dimension: str) -> Counter:
+            return Counter({key: count for (dim, key), count in key_counts.items() if dim == dimension})
+
+        return {
+            "window_seconds": window_seconds,
+            "bucket_seconds": counter.bucket_seconds,
+            "events": total,
+            "events_per_second": round(total / window_seconds, 4),
+            "top_event_types": [{"event_type": key, "count": count} for key, count in by_dimension("type").most_common(top_k)],
+            "events_per_second_by_source": {key: round(count / window_seconds, 4) for key, count in by_dimension("source").items()},
+            "events_per_second_by_camera": {key: round(count / window_seconds, 4) for key, count in by_dimension("camera").items()},
+        }
@@ -2,15 +2,128 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.llms import Ollama
 from langchain.prompts import PromptTemplate
-from langchain.agents import Tool, AgentExecutor, create_react_agent
+from langchain.agents import Tool, AgentExecutor
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.tools import render_text_description
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
 from .utils import config, api_triggers
+from .semantic_cache import SemanticCache
+from .intent_router import IntentRouter
+from .streaming import FinalAnswerFilter
+from .llm_pool import LLMBackend, LLMPool
+from .prompt_budget import PromptBudget, AGENT_PROMPT_TOKENS, count_tokens
 from memorycore.memory_manager import get_memory_core
+from observability.metrics import histogram
+import asyncio
 import logging
+import time
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
 logging.basicConfig(level=config.LOGGING_LEVEL)
 
+BACKEND_INFO_KEY = "llm_backend"   # generation_info key naming the pool backend that served a call
+
+AGENT_QUERY_SECONDS = histogram(
+    "neuracity_agent_query_seconds", "End-to-end latency of one agent query (all reasoning steps and tools).", ["llm", "outcome"]
+)
+LLM_CALL_SECONDS = histogram("neuracity_llm_call_seconds", "Latency of a single LLM completion within an agent run.", ["llm"])
+AGENT_FIRST_TOKEN_SECONDS = histogram(
+    "neuracity_agent_first_token_seconds", "Time from a streamed query's start to its first answer token.", ["route"]
+)
+
+
+def _served_by(response) -> Optional[str]:
+    """The pool backend PooledLLM recorded in a completion's generation_info, if any."""
+    try:
+        return (response.generations[0][0].generation_info or {}).get(BACKEND_INFO_KEY)
+    except (AttributeError, IndexError):
+        return None
+
+
+class LLMTimingCallback(BaseCallbackHandler):
+    """
+    Observes the latency of every LLM call the agent makes, labelled with the
+    backend that served it, and adds up the prompt tokens of one query.
+    """
+    def __init__(self):
+        self._started = {}
+        self.prompt_tokens = 0
+        self.llm_calls = 0
+        self.backend: Optional[str] = None   # Backend of the latest completed call
+
+    @property
+    def source(self) -> str:
+        """The backend that produced the answer (the last LLM call), for results and metric labels."""
+        return self.backend or "none"
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+        self.llm_calls += 1
+        self.prompt_tokens += sum(count_tokens(prompt) for prompt in prompts)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+        self.llm_calls += 1
+        self.prompt_tokens += sum(count_tokens(str(message.content)) for batch in messages for message in batch)
+
+    def report(self, route: str) -> dict:
+        """Records this query's prompt size and returns the fields added to its result."""
+        AGENT_PROMPT_TOKENS.labels(route=route).observe(self.prompt_tokens)
+        return {"prompt_tokens": self.prompt_tokens, "llm_calls": self.llm_calls}
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.backend = _served_by(response) or self.backend
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_CALL_SECONDS.labels(llm=self.source).observe(time.perf_counter() - started)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+class PooledLLM(LLM):
+    """
+    Exposes an LLMPool as a LangChain LLM, so the ReAct agent, ainvoke and
+    astream go through the pool's timeouts, circuit breakers and hedging.
+    Each generation's generation_info names the backend that served it,
+    which is how LLMTimingCallback learns it after a failover or a hedge.
+    """
+    pool: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "neuracity_llm_pool"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        # Required by LLM. The pool is async-only: a sync invoke() would need its own event loop
+        raise NotImplementedError("PooledLLM is async-only; use ainvoke() or astream().")
+
+    @staticmethod
+    def _result(completions) -> LLMResult:
+        return LLMResult(generations=[
+            [Generation(text=completion.text, generation_info={BACKEND_INFO_KEY: completion.backend})]
+            for completion in completions
+        ])
+
+    async def _agenerate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> LLMResult:
+        return self._result([await self.pool.acomplete(prompt, stop) for prompt in prompts])
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        first = True
+        async for completion in self.pool.astream(prompt, stop):
+            # Only the first chunk carries the backend: LangChain concatenates string values when merging chunks
+            chunk = GenerationChunk(text=completion.text,
+                                    generation_info={BACKEND_INFO_KEY: completion.backend} if first else None)
+            first = False
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(completion.text, chunk=chunk)
+            yield chunk
+
 MANUAL_REACT_PROMPT_TEMPLATE = """
 {base_prompt}
 
@@ -35,55 +148,109 @@ Question: {input}
 Thought:{agent_scratchpad}
 """
 
+INSUFFICIENT_CONTEXT = "INSUFFICIENT_CONTEXT"
+FAQ_PROMPT_TEMPLATE = """
+{base_prompt}
+
+Answer the question using only the context below, in a few sentences.
+If the context does not contain the answer, reply with exactly: """ + INSUFFICIENT_CONTEXT + """
+
+Context:
+{context}
+
+Question: {question}
+Answer:"""
+
 class AgentCore:
     def __init__(self):
         self.memory_core = get_memory_core()
 
-        self.llm, self.source = self._initialize_llms()
+        self.llm = self._initialize_llms()
+        # Bounds retrieved passages and the scratchpad so long sessions don't grow the prompt
+        self.budget = PromptBudget()
         self.tools = self._setup_tools()
+        # Repeated informational questions are answered without running the agent
+        self.response_cache = SemanticCache(
+            embed=self.memory_core.vector.embedding_function,
+            document_paths=config.DOCUMENT_SOURCES,
+            on_documents_changed=self.memory_core.load_external_documents
+        )
         
+        # Clear-cut emergencies and FAQs skip the ReAct loop
+        self.router = IntentRouter(embed=self.memory_core.vector.embedding_function)
+
         with open("./modules/neuranlp_agent/prompts/base_prompt.txt") as f:
             base_prompt_text = f.read()
+        self.faq_prompt = PromptTemplate.from_template(FAQ_PROMPT_TEMPLATE).partial(base_prompt=base_prompt_text)
 
         self.prompt = PromptTemplate.from_template(MANUAL_REACT_PROMPT_TEMPLATE).partial(
             base_prompt=base_prompt_text
         )
 
-        agent = create_react_agent(self.llm, self.tools, self.prompt)
+        # As create_react_agent() builds it, but with a scratchpad that stays within budget
+        prompt = self.prompt.partial(
+            tools=render_text_description(self.tools), tool_names=", ".join(tool.name for tool in self.tools)
+        )
+        agent = (
+            RunnablePassthrough.assign(agent_scratchpad=lambda x: self.budget.format_scratchpad(x["intermediate_steps"]))
+            | prompt
+            | self.llm.bind(stop=["\nObservation"])
+            | ReActSingleInputOutputParser()
+        )
         self.agent_executor = AgentExecutor(
             agent=agent, 
             tools=self.tools, 
             verbose=True,
+            max_iterations=config.AGENT_MAX_ITERATIONS,
+            max_execution_time=config.AGENT_MAX_EXECUTION_SECONDS,
             handle_parsing_errors="I'm sorry, I had trouble understanding my own thoughts. Could you please rephrase?"
         )
 
     def _initialize_llms(self):
-        """Initializes Gemini and Ollama models with a fallback mechanism."""
+        """
+        Puts Gemini (if it can be configured) and the local Ollama model behind an
+        LLMPool. Gemini is preferred; Ollama takes over when Gemini fails, times
+        out or has its circuit open, and is raced against Gemini when it is slow.
+        """
+        backends = []
         try:
             safety_settings = {
                 HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
             }
 
-            llm = ChatGoogleGenerativeAI(
+            gemini = ChatGoogleGenerativeAI(
                 model="gemini-2.5-pro", # Use the stable gemini-pro model name
                 google_api_key=config.GEMINI_API_KEY, 
                 convert_system_message_to_human=True,
-                safety_settings=safety_settings
+                safety_settings=safety_settings,
+                max_output_tokens=config.LLM_MAX_OUTPUT_TOKENS
             )
+            backends.append(LLMBackend.from_langchain("gemini", gemini, priority=0,
+                                                      timeout_seconds=config.GEMINI_TIMEOUT_SECONDS))
             logging.info("Successfully initialized Gemini Pro with custom safety settings.")
-            return llm, "gemini"
         except Exception as e:
-            logging.warning(f"Failed to initialize Gemini, falling back to Ollama: {e}")
-            llm = Ollama(base_url=config.OLLAMA_BASE_URL, model=config.OLLAMA_MODEL)
-            logging.info(f"Using Ollama with model {config.OLLAMA_MODEL}.")
-            return llm, "ollama"
+            logging.warning("Failed to initialize Gemini, using Ollama only: %s", e)
+
+        ollama = Ollama(base_url=config.OLLAMA_BASE_URL, model=config.OLLAMA_MODEL, num_predict=config.LLM_MAX_OUTPUT_TOKENS)
+        backends.append(LLMBackend.from_langchain("ollama", ollama, priority=1, hedge_target=True,
+                                                  timeout_seconds=config.OLLAMA_TIMEOUT_SECONDS))
+        logging.info("Using Ollama with model %s.", config.OLLAMA_MODEL)
+
+        self.llm_pool = LLMPool(backends)
+        return PooledLLM(pool=self.llm_pool)
+
+    def _search_memory(self, query: str) -> str:
+        """Vector memory search, de-duplicated and truncated to the retrieval budget."""
+        return self.budget.format_passages(self.memory_core.vector.query(query))
 
     def _setup_tools(self):
         """Sets up the tools available to the agent."""
         tools = [
             Tool(
                 name="SearchSharedVectorMemory", 
-                func=self.memory_core.vector.query, 
+                func=self._search_memory, 
+                # ChromaDB is blocking; the async path runs it in a worker thread
+                coroutine=lambda query: asyncio.to_thread(self._search_memory, query),
                 description="Use for semantic search of conversations and documents. Ideal for answering 'who', 'what', 'where', 'how' questions based on past knowledge."
             ),
             
@@ -92,6 +259,7 @@ class AgentCore:
             # This robustly tells the agent that the function expects a simple string input.
             Tool.from_function(
                 func=api_triggers.call_security,
+                coroutine=api_triggers.acall_security,
                 name="CallSecurity",
                 description="Use this tool to dispatch security to a specified location in case of an emergency. The input must be ONLY the location as a string (e.g., 'Main Library')."
             ),
@@ -99,6 +267,7 @@ class AgentCore:
             Tool(
                 name="SendCampusAnnouncement", 
                 func=api_triggers.send_announcement, 
+                coroutine=api_triggers.asend_announcement,
                 description="Use this tool to send a campus-wide announcement. This is for major alerts and requires authorization. The input is the message string."
             ),
             Tool.from_function(
@@ -106,36 +275,186 @@ class AgentCore:
                     department=input_str.split(',')[0].strip(),
                     message=''.join(input_str.split(',')[1:]).strip()
                 ),
+                coroutine=lambda input_str: api_triggers.anotify_admin(
+                    department=input_str.split(',')[0].strip(),
+                    message=''.join(input_str.split(',')[1:]).strip()
+                ),
                 name="NotifyDepartmentAdmin",
                 description="Use this tool to send a notification to a specific department's admin. The input must be a single comma-separated string of two values: the target department and the message. Example: 'IT, The Wi-Fi in the main auditorium is down.'"
             )
         ]
         return tools
 
-    def run_query(self, query: str):
-        """Processes a query through the agent."""
+    async def arun_query(self, query: str):
+        """
+        Processes a query through the agent without blocking the event loop:
+        LLM calls use ainvoke, action tools use the pooled async HTTP client and
+        blocking memory calls run in worker threads.
+        """
+        started = time.perf_counter()
+        callback = LLMTimingCallback()
         try:
-            response = self.agent_executor.invoke({"input": query})
-
-            convo_text = f"User query: {query}\nAI response: {response['output']}"
-            metadata = {"query": query}
-            self.memory_core.vector.add(
-                source='neuranlp_agent',
-                type='conversation',
-                text_content=convo_text,
-                metadata=metadata
+            response = await self.agent_executor.ainvoke(
+                {"input": query}, config={"callbacks": [callback]}
             )
-            
-            return {"response": response['output'], "source": self.source}
+
+            await self._aremember(query, response['output'])
+
+            AGENT_QUERY_SECONDS.labels(llm=callback.source, outcome="success").observe(time.perf_counter() - started)
+            return {"response": response['output'], "source": callback.source, **callback.report("agent")}
         except Exception as e:
-            logging.error(f"Error running agent query: {e}")
+            AGENT_QUERY_SECONDS.labels(llm=callback.source, outcome="error").observe(time.perf_counter() - started)
+            logging.error("Error running agent query: %s", e)
             return {"response": "I'm sorry, I encountered an error and couldn't process your request.", "source": "error"}
 
 
+    async def _aremember(self, query: str, answer: str):
+        """Stores the exchange in vector memory from a worker thread."""
+        await asyncio.to_thread(
+            self.memory_core.vector.add,
+            source='neuranlp_agent',
+            type='conversation',
+            text_content=f"User query: {query}\nAI response: {answer}",
+            metadata={"query": query}
+        )
+
+    async def astream_query(self, query: str) -> AsyncIterator[Tuple[str, Optional[dict]]]:
+        """
+        Runs the agent and yields (event, data) as it works: ("status", ...)
+        when a tool is called, ("token", ...) for each piece of the final
+        answer as the LLM produces it, and finally ("done", result).
+        """
+        started = time.perf_counter()
+        answer_filter = FinalAnswerFilter()
+        callback = LLMTimingCallback()
+        first_token = True
+        output = None
+        try:
+            async for event in self.agent_executor.astream_events(
+                {"input": query}, config={"callbacks": [callback]}, version="v2"
+            ):
+                kind = event["event"]
+                if kind in ("on_chat_model_start", "on_llm_start"):
+                    answer_filter.reset()
+                elif kind in ("on_chat_model_stream", "on_llm_stream"):
+                    chunk = event["data"].get("chunk")
+                    text = answer_filter.feed(str(getattr(chunk, "content", None) or getattr(chunk, "text", None) or ""))
+                    if text:
+                        if first_token:
+                            AGENT_FIRST_TOKEN_SECONDS.labels(route="agent").observe(time.perf_counter() - started)
+                            first_token = False
+                        yield "token", {"text": text}
+                elif kind == "on_tool_start":
+                    yield "status", {"stage": "tool", "tool": event["name"], "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    yield "status", {"stage": "thinking"}
+                elif kind == "on_chain_end" and event.get("parent_ids") == []:
+                    output = (event["data"].get("output") or {}).get("output")
+        except Exception as e:
+            AGENT_QUERY_SECONDS.labels(llm=callback.source, outcome="error").observe(time.perf_counter() - started)
+            logging.error("Error streaming agent query: %s", e)
+            yield "done", {"response": "I'm sorry, I encountered an error and couldn't process your request.", "source": "error"}
+            return
+
+        if output is None:
+            output = "I'm sorry, I couldn't find an answer."
+        await self._aremember(query, output)
+        AGENT_QUERY_SECONDS.labels(llm=callback.source, outcome="success").observe(time.perf_counter() - started)
+        yield "done", {"response": output, "source": callback.source, **callback.report("agent")}
+
+    async def astream_from_documents(self, query: str) -> AsyncIterator[Tuple[str, Optional[dict]]]:
+        """
+        Streaming form of answer_from_documents(). Tokens are held back until it
+        is clear the model is not replying INSUFFICIENT_CONTEXT; in that case
+        nothing is emitted and ("done", None) tells the caller to fall back.
+        """
+        started = time.perf_counter()
+        try:
+            context = await asyncio.to_thread(self.memory_core.vector.query, query)
+            if not context:
+                yield "done", None
+                return
+            prompt = self.faq_prompt.format(context=self.budget.format_passages(context), question=query)
+            held, released, parts = "", False, []
+            callback = LLMTimingCallback()
+            async for chunk in self.llm.astream(prompt, config={"callbacks": [callback]}):
+                text = str(getattr(chunk, "content", chunk))
+                parts.append(text)
+                if released:
+                    yield "token", {"text": text}
+                    continue
+                held += text
+                if INSUFFICIENT_CONTEXT in held:
+                    yield "done", None
+                    return
+                if len(held.lstrip()) > len(INSUFFICIENT_CONTEXT):
+                    released = True
+                    AGENT_FIRST_TOKEN_SECONDS.labels(route="faq").observe(time.perf_counter() - started)
+                    yield "token", {"text": held.lstrip()}
+        except Exception as e:
+            logging.warning("FAQ fast path failed, falling back to the agent: %s", e)
+            yield "done", None
+            return
+
+        answer = "".join(parts).strip()
+        if not answer or INSUFFICIENT_CONTEXT in answer:
+            yield "done", None
+            return
+        if not released:
+            yield "token", {"text": answer}
+        AGENT_QUERY_SECONDS.labels(llm=callback.source, outcome="faq").observe(time.perf_counter() - started)
+        yield "done", {"response": answer, "source": callback.source, **callback.report("faq")}
+
+    async def dispatch_emergency(self, query: str, location: str | None):
+        """Fast path: dispatches security straight away, with no LLM round trip."""
+        started = time.perf_counter()
+        target = location or f"Unspecified location (reported via NeuraNLP: '{query[:120]}')"
+        result = await api_triggers.acall_security(target)
+        AGENT_QUERY_SECONDS.labels(llm="none", outcome="emergency").observe(time.perf_counter() - started)
+        if "error" in result:
+            return {"response": "I could not reach campus security automatically. Please call the campus emergency line now.",
+                    "source": "error"}
+        where = f"to {location}" if location else "; please tell me your exact location so they can find you"
+        return {"response": f"Security has been dispatched{where}. Stay with the person if it is safe to do so.",
+                "source": "fast_path"}
+
+    async def answer_from_documents(self, query: str):
+        """
+        Fast path: one vector-memory retrieval and a single LLM call. Returns None
+        if the retrieved context does not answer the question, so the caller can
+        fall back to the full agent.
+        """
+        started = time.perf_counter()
+        try:
+            context = await asyncio.to_thread(self.memory_core.vector.query, query)
+            if not context:
+                return None
+            prompt = self.faq_prompt.format(context=self.budget.format_passages(context), question=query)
+            callback = LLMTimingCallback()
+            message = await self.llm.ainvoke(prompt, config={"callbacks": [callback]})
+            answer = str(getattr(message, "content", message)).strip()
+        except Exception as e:
+            logging.warning("FAQ fast path failed, falling back to the agent: %s", e)
+            return None
+        if not answer or INSUFFICIENT_CONTEXT in answer:
+            return None
+        AGENT_QUERY_SECONDS.labels(llm=callback.source, outcome="faq").observe(time.perf_counter() - started)
+        return {"response": answer, "source": callback.source, **callback.report("faq")}
+
+
 def initialize_agent():
     """Initializes agent and loads documents into the shared MemoryCore."""
     core = get_memory_core()
     core.load_external_documents(config.DOCUMENT_SOURCES)
     return AgentCore()
 
-agent_core = initialize_agent()
\ No newline at end of file
+# --- The Singleton Pattern ---
+# Building the agent loads documents and the LLMs, so it happens on first use, not at import.
+_agent_core_instance = None
+
+def get_agent_core():
+    """Gets the single, shared instance of the AgentCore."""
+    global _agent_core_instance
+    if _agent_core_instance is None:
+        _agent_core_instance = initialize_agent()
+    return _agent_core_instance
@@ -0,0 +1,66 @@
+# File: modules/neuranlp_agent/audio.py
+
+import io
+import subprocess
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000          # What Whisper expects
+FFMPEG_TIMEOUT_SECONDS = 30
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+class AudioDecodeError(Exception):
+    """The upload could not be decoded into audio."""
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """
+    Decodes an uploaded clip into mono float32 samples in [-1, 1] at 16 kHz,
+    entirely in memory. PCM WAV already at 16 kHz is read directly; anything
+    else (MP3, OGG, WebM, other rates) is piped through ffmpeg's stdin/stdout.
+    """
+    if not data:
+        raise AudioDecodeError("The audio upload is empty.")
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        samples = _decode_wav(data)
+        if samples is not None:
+            return samples
+    return _decode_ffmpeg(data)
+
+
+def _decode_wav(data: bytes):
+    """Reads 16 kHz PCM WAV with numpy; None if it needs resampling or is not plain PCM."""
+    try:
+        with wave.open(io.BytesIO(data)) as clip:
+            if clip.getframerate() != SAMPLE_RATE or clip.getsampwidth() not in _PCM_DTYPES:
+                return None
+            channels, width = clip.getnchannels(), clip.getsampwidth()
+            frames = clip.readframes(clip.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    samples = np.frombuffer(frames, dtype=_PCM_DTYPES[width]).astype(np.float32)
+    if width == 1:
+        samples = (samples - 128.0) / 128.0      # 8-bit WAV is unsigned
+    else:
+        samples /= float(2 ** (8 * width - 1))
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _decode_ffmpeg(data: bytes) -> np.ndarray:
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0",
+        "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+    try:
+        result = subprocess.run(command, input=data, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS, check=True)
+    except FileNotFoundError:
+        raise AudioDecodeError("ffmpeg is not installed; only 16 kHz PCM WAV can be decoded without it.")
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError("Decoding the audio took too long.")
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(f"ffmpeg could not decode the audio: {e.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,90 @@
+# File: modules/neuranlp_agent/concurrency.py
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from .utils import config
+from observability.metrics import counter, histogram, percentile
+
+AGENT_QUEUE_WAIT_SECONDS = histogram("neuracity_agent_queue_wait_seconds", "Time a query waited for a free agent slot.")
+AGENT_QUERIES_REJECTED = counter("neuracity_agent_queries_rejected_total", "Queries turned away because the agent was saturated.", ["reason"])
+
+
+class AgentBusy(Exception):
+    """No agent slot became free: the wait queue is full or the wait timed out."""
+    def __init__(self, message: str, retry_after_seconds: int = 5):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class QueryLimiter:
+    """
+    Caps how many agent runs execute at once. Further queries wait, in arrival
+    order, in a bounded queue; when the queue is full or a query has waited
+    too long it is rejected with AgentBusy instead of piling up.
+    """
+    def __init__(self, max_concurrency: int = config.AGENT_MAX_CONCURRENCY,
+                 max_queued: int = config.AGENT_MAX_QUEUED,
+                 queue_timeout_seconds: float = config.AGENT_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queued = max_queued
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_ms: deque = deque(maxlen=1000)
+
+    @property
+    def saturated(self) -> bool:
+        """True if a new query would be rejected without waiting."""
+        return self._semaphore.locked() and self.queued >= self.max_queued
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one agent slot for the duration of the 'async with' block."""
+        if self.saturated:
+            self.rejected += 1
+            AGENT_QUERIES_REJECTED.labels(reason="queue_full").inc()
+            raise AgentBusy(f"The assistant is busy ({self.queued} queries waiting). Please retry shortly.")
+
+        started = time.perf_counter()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            AGENT_QUERIES_REJECTED.labels(reason="queue_timeout").inc()
+            raise AgentBusy(f"No assistant slot became free within {self.queue_timeout_seconds:.0f}s. Please retry shortly.")
+        finally:
+            self.queued -= 1
+
+        waited = time.perf_counter() - started
+        AGENT_QUEUE_WAIT_SECONDS.observe(waited)
+        self.wait_ms.append(waited * 1000)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.wait_ms)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_wait_ms_p50": percentile(ordered, 0.50, default=0.0),
+            "queue_wait_ms_p95": percentile(ordered, 0.95, default=0.0),
+        }
+
+query_limiter = QueryLimiter()
@@ -0,0 +1,168 @@
+# File: modules/neuranlp_agent/intent_router.py
+
+import asyncio
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .utils import config
+from .semantic_cache import is_action_query
+from observability.metrics import counter
+
+AGENT_ROUTES = counter("neuracity_agent_routes_total", "Routing decisions for incoming queries.", ["route"])
+
+# --- Routes ---
+EMERGENCY = "emergency"   # Dispatch security directly, no LLM involved
+FAQ = "faq"               # One retrieval and one LLM call
+AGENT = "agent"           # The full ReAct agent
+
+# Clear-cut emergencies need both an incident happening now and a request for help.
+# Matching is deliberately narrow: anything else goes to the agent.
+INCIDENT_PATTERN = re.compile(
+    r"\b(faint(?:ed|ing|s)?|passed out|collaps(?:ed|es|ing)|(?:is|are|went) unconscious|not breathing|"
+    r"having a seizure|heart attack|(?:is|are) (?:badly )?(?:bleeding|injured|hurt)|"
+    r"on fire|caught fire|there(?:'s| is) a fire|smoke (?:is )?coming|"
+    r"(?:there(?:'s| is) a|started a|in a) fight|(?:are|is) fighting|"
+    r"(?:has|with|carrying|holding) a (?:gun|knife|weapon)|intruder|(?:being|got|was just) (?:attacked|assaulted))\b",
+    re.IGNORECASE
+)
+HELP_REQUEST_PATTERN = re.compile(
+    r"\b(call (?:for )?help|call security|call (?:an )?ambulance|call the police|send (?:security|help|someone)|"
+    r"get help|need help|please help|help us|help!)",
+    re.IGNORECASE
+)
+# Mentions of an emergency that are not one happening now (drills, history, procedures)
+NOT_AN_EMERGENCY_PATTERN = re.compile(
+    r"\b(drill|practice|test|exercise|yesterday|last (?:week|month|year)|was there|did|history|"
+    r"how (?:do|to|should)|what (?:is|are|should)|policy|procedure|extinguisher|exit)\b",
+    re.IGNORECASE
+)
+LOCATION_PATTERN = re.compile(
+    r"\b(?:at|in|near|outside|inside|behind|by)\s+(?:the\s+)?(?!an?\s)([\w' -]{2,40}?)\s*(?=[.,!?;]|$|\band\b|\bcall\b|\bplease\b)",
+    re.IGNORECASE
+)
+QUESTION_PATTERN = re.compile(r"^\s*(where|when|what|who|which|how|is|are|does|do|can|could)\b", re.IGNORECASE)
+
+# Labelled examples for the embedding classifier (nearest centroid)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    EMERGENCY: [
+        "I saw a student faint. Call for help.",
+        "There is a fire in the building.",
+        "Someone collapsed and is unconscious.",
+        "There is a fight outside the hostel.",
+        "A person is injured and bleeding.",
+        "There is an intruder with a weapon.",
+    ],
+    FAQ: [
+        "Where is Prof. Sharma's office?",
+        "What are the library opening hours?",
+        "Is the AI Club hosting any event today?",
+        "When is the next campus event?",
+        "How do I get to the cafeteria?",
+        "Who is the head of the computer science department?",
+    ],
+    AGENT: [
+        "Notify the facilities department that the water fountain is broken.",
+        "Send a campus announcement about the exam schedule.",
+        "Tell the IT admin that the Wi-Fi is down.",
+        "What happened in Lab C yesterday?",
+    ],
+}
+
+
+class RouteDecision(NamedTuple):
+    route: str
+    confidence: float
+    reason: str
+    location: Optional[str] = None
+
+
+def is_emergency(query: str) -> bool:
+    """
+    An incident happening now plus a request for help. Questions never
+    qualify: a dispatch without any LLM check must not fire on
+    "Where is the fire station?".
+    """
+    if QUESTION_PATTERN.search(query) or NOT_AN_EMERGENCY_PATTERN.search(query):
+        return False
+    return bool(INCIDENT_PATTERN.search(query) and HELP_REQUEST_PATTERN.search(query))
+
+
+def extract_location(query: str) -> Optional[str]:
+    match = LOCATION_PATTERN.search(query)
+    return match.group(1).strip() if match else None
+
+
+class IntentRouter:
+    """
+    Decides, before the agent runs, whether a query can take a fast path.
+
+    Emergencies are recognised by rules only, since they trigger a dispatch
+    without any LLM in the loop. Informational questions are recognised by a
+    small nearest-centroid classifier over the embedding model the semantic
+    cache already uses. Everything that is not clear-cut goes to the agent.
+    """
+    def __init__(self, embed: Callable[[List[str]], Sequence[Sequence[float]]],
+                 faq_threshold: float = config.INTENT_FAQ_THRESHOLD,
+                 margin: float = config.INTENT_MARGIN,
+                 enabled: bool = config.INTENT_ROUTER_ENABLED):
+        self.embed = embed
+        self.faq_threshold = faq_threshold
+        self.margin = margin
+        self.enabled = enabled
+        self._labels: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+
+    def _fit(self):
+        """Embeds the labelled examples once and keeps one normalised centroid per intent."""
+        labels, centroids = [], []
+        for label, examples in INTENT_EXAMPLES.items():
+            vectors = np.asarray(self.embed(examples), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+            centroid = vectors.mean(axis=0)
+            labels.append(label)
+            centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+        self._labels, self._centroids = labels, np.stack(centroids)
+
+    def classify_rules(self, query: str) -> Optional[RouteDecision]:
+        """
+        The rule-based part alone: no embedding, so it is safe to run before
+        anything else. None when the rules do not decide.
+        """
+        if not self.enabled:
+            return None
+        if is_emergency(query):
+            return self._count(RouteDecision(EMERGENCY, 1.0, "emergency rule", extract_location(query)))
+        if is_action_query(query) or not QUESTION_PATTERN.search(query):
+            return self._count(RouteDecision(AGENT, 1.0, "needs the agent's tools or reasoning"))
+        return None
+
+    async def classify(self, query: str, vector: Optional[np.ndarray] = None) -> RouteDecision:
+        """
+        Routes a query. 'vector' is the query's normalised embedding if the
+        caller already has one (e.g. from the semantic cache lookup).
+        """
+        if not self.enabled:
+            return self._count(RouteDecision(AGENT, 1.0, "router disabled"))
+        decision = self.classify_rules(query)
+        if decision is not None:
+            return decision
+
+        if self._centroids is None:
+            await asyncio.to_thread(self._fit)
+        if vector is None:
+            vector = np.asarray((await asyncio.to_thread(self.embed, [query]))[0], dtype=np.float32)
+            vector = vector / max(np.linalg.norm(vector), 1e-12)
+        similarities = self._centroids @ vector
+        order = np.argsort(similarities)[::-1]
+        best, runner_up = order[0], order[1]
+        score, margin = float(similarities[best]), float(similarities[best] - similarities[runner_up])
+        if self._labels[best] == FAQ and score >= self.faq_threshold and margin >= self.margin:
+            return self._count(RouteDecision(FAQ, score, f"classifier (margin {margin:.2f})"))
+        return self._count(RouteDecision(AGENT, score, f"ambiguous: closest to '{self._labels[best]}'"))
+
+    @staticmethod
+    def _count(decision: RouteDecision) -> RouteDecision:
+        AGENT_ROUTES.labels(route=decision.route).inc()
+        return decision
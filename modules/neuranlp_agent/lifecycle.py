@@ -0,0 +1,91 @@
+# File: modules/neuranlp_agent/lifecycle.py
+
+import asyncio
+import importlib
+import logging
+import time
+from typing import Optional
+
+from .utils import config
+from observability.metrics import histogram
+
+AGENT_STARTUP_SECONDS = histogram("neuracity_agent_startup_seconds", "Time to import and build the agent, by phase.", ["phase"])
+
+
+class AgentWarmup:
+    """
+    Builds the AgentCore off the event loop, once.
+
+    Importing agent_core pulls in LangChain and the Google SDK, and building
+    it indexes the documents into Chroma and sets up the LLMs. None of that
+    happens at import time any more: the FastAPI lifespan starts it in the
+    background (or the first query does), /health answers meanwhile, and
+    every caller awaits the same build.
+    """
+    def __init__(self, module: str = "modules.neuranlp_agent.agent_core"):
+        self.module = module
+        self.state = "cold"   # cold -> warming -> ready | failed
+        self.error: Optional[str] = None
+        self.timings = {}
+        self._task: Optional[asyncio.Task] = None
+        self._agent = None
+
+    @property
+    def ready(self) -> bool:
+        return self._agent is not None
+
+    def record(self, phase: str, seconds: float):
+        self.timings[f"{phase}_seconds"] = round(seconds, 3)
+        AGENT_STARTUP_SECONDS.labels(phase=phase).observe(seconds)
+
+    def _build(self):
+        started = time.perf_counter()
+        agent_module = importlib.import_module(self.module)
+        imported = time.perf_counter()
+        agent = agent_module.get_agent_core()
+        self.record("import", imported - started)
+        self.record("build", time.perf_counter() - imported)
+        return agent
+
+    async def _warm(self):
+        self.state = "warming"
+        try:
+            self._agent = await asyncio.to_thread(self._build)
+        except Exception as e:
+            self.state, self.error = "failed", str(e)
+            logging.exception("Agent warm-up failed")
+            raise
+        self.state = "ready"
+        logging.info("Agent ready (import %.2fs, build %.2fs).",
+                     self.timings["import_seconds"], self.timings["build_seconds"])
+        return self._agent
+
+    def start(self) -> asyncio.Task:
+        """Starts the build in the background if it is not running or done. A failed build is retried."""
+        if self._task is None or (self._task.done() and not self.ready):
+            self._task = asyncio.get_running_loop().create_task(self._warm())
+            # A background warm-up's failure is logged in _warm(); don't let asyncio warn about it too
+            self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._task
+
+    async def get(self):
+        """The AgentCore, building it first if necessary."""
+        if self._agent is not None:
+            return self._agent
+        return await asyncio.shield(self.start())
+
+    def peek(self):
+        """The AgentCore if it is built, else None. Never triggers a build."""
+        return self._agent
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "error": self.error, **self.timings}
+
+
+agent_warmup = AgentWarmup()
+
+
+async def warm_up_on_startup():
+    """Called from the lifespan: starts the background build unless disabled."""
+    if config.AGENT_WARMUP_ON_STARTUP:
+        agent_warmup.start()
@@ -0,0 +1,285 @@
+# File: modules/neuranlp_agent/llm_pool.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional
+
+from .utils import config
+from observability.metrics import counter, histogram, percentile
+
+LLM_BACKEND_SECONDS = histogram("neuracity_llm_backend_seconds", "Latency of successful completions per LLM backend.", ["backend"])
+LLM_BACKEND_CALLS = counter("neuracity_llm_backend_calls_total", "LLM backend calls by outcome.", ["backend", "outcome"])
+
+LATENCY_EWMA_ALPHA = 0.2   # Weight of the newest sample in a backend's smoothed latency
+
+CompleteFn = Callable[[str, Optional[List[str]]], Awaitable[str]]
+StreamFn = Callable[[str, Optional[List[str]]], AsyncIterator[str]]
+
+
+class AllBackendsUnavailable(Exception):
+    """Every LLM backend failed, timed out or has its circuit open."""
+
+
+class Completion(NamedTuple):
+    """Completion text (or one streamed chunk of it) and the backend that actually produced it."""
+    text: str
+    backend: str
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend after consecutive failures. After a cool-down one
+    trial call is let through (half-open): success closes the circuit, failure
+    opens it again for twice as long, up to max_reset_seconds.
+    """
+    def __init__(self, failure_threshold: int = config.LLM_BREAKER_FAILURES,
+                 reset_seconds: float = config.LLM_BREAKER_RESET_SECONDS,
+                 max_reset_seconds: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_reset_seconds = reset_seconds
+        self.max_reset_seconds = max_reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.reset_seconds = reset_seconds
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now. Claims the single trial call when half-open."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.reset_seconds = self.base_reset_seconds
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight:
+            # The trial failed: stay open, for longer
+            self.reset_seconds = min(self.reset_seconds * 2, self.max_reset_seconds)
+            self.opened_at = self.clock()
+        elif self.failures >= self.failure_threshold and self.opened_at is None:
+            self.opened_at = self.clock()
+        self._trial_in_flight = False
+
+    def release(self):
+        """Gives back a claimed trial that ended without a verdict (e.g. it was cancelled)."""
+        self._trial_in_flight = False
+
+
+class LLMBackend:
+    """One model behind the pool, with its own timeout, breaker and latency record."""
+    def __init__(self, name: str, complete: CompleteFn, stream: Optional[StreamFn] = None,
+                 priority: int = 0, timeout_seconds: float = config.LLM_TIMEOUT_SECONDS,
+                 slow_after_seconds: float = config.LLM_SLOW_AFTER_SECONDS, hedge_target: bool = False,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.complete = complete
+        self.stream = stream
+        self.priority = priority
+        self.timeout_seconds = timeout_seconds
+        self.slow_after_seconds = slow_after_seconds
+        self.hedge_target = hedge_target      # May be raced against a slow primary
+        self.breaker = breaker or CircuitBreaker()
+        self.latency_ewma: Optional[float] = None
+        self.recent_seconds: deque = deque(maxlen=200)
+
+    @classmethod
+    def from_langchain(cls, name: str, llm, **kwargs) -> "LLMBackend":
+        """Adapts a LangChain chat model or LLM; chat messages are reduced to their text."""
+        async def complete(prompt: str, stop: Optional[List[str]]) -> str:
+            result = await llm.ainvoke(prompt, stop=stop)
+            return str(getattr(result, "content", result))
+
+        async def stream(prompt: str, stop: Optional[List[str]]) -> AsyncIterator[str]:
+            async for chunk in llm.astream(prompt, stop=stop):
+                yield str(getattr(chunk, "content", chunk))
+
+        return cls(name, complete, stream, **kwargs)
+
+    @property
+    def degraded(self) -> bool:
+        return self.latency_ewma is not None and self.latency_ewma > self.slow_after_seconds
+
+    def record_latency(self, seconds: float):
+        self.recent_seconds.append(seconds)
+        self.latency_ewma = seconds if self.latency_ewma is None else (
+            LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * self.latency_ewma
+        )
+
+    def snapshot(self) -> dict:
+        ordered_ms = sorted(seconds * 1000 for seconds in self.recent_seconds)
+        return {
+            "name": self.name,
+            "priority": self.priority,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "degraded": self.degraded,
+            "latency_ms_ewma": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "latency_ms_p50": percentile(ordered_ms, 0.50, digits=1),
+            "latency_ms_p95": percentile(ordered_ms, 0.95, digits=1),
+        }
+
+
+class LLMPool:
+    """
+    Routes each completion to the best available backend.
+
+    Backends are tried in priority order, except that one whose smoothed
+    latency is above its slow threshold is moved behind healthy ones, and one
+    whose circuit is open is skipped. Every call has a timeout; a failure or
+    timeout fails over to the next backend. If the chosen backend has not
+    answered after hedge_after_seconds, the request is also sent to a hedge
+    target (the local model) and whichever answers first wins.
+    """
+    def __init__(self, backends: List[LLMBackend], hedge_enabled: bool = config.LLM_HEDGE_ENABLED,
+                 hedge_after_seconds: float = config.LLM_HEDGE_AFTER_SECONDS):
+        if not backends:
+            raise ValueError("LLMPool needs at least one backend.")
+        self.backends = backends
+        self.hedge_enabled = hedge_enabled
+        self.hedge_after_seconds = hedge_after_seconds
+        self.hedges_started = 0
+        self.hedges_won = 0
+
+    def ordered(self) -> List[LLMBackend]:
+        """Backends in the order they should be tried, open circuits excluded."""
+        candidates = [b for b in self.backends if b.breaker.state != "open"]
+        return sorted(candidates, key=lambda b: (b.degraded, b.priority))
+
+    async def _attempt(self, backend: LLMBackend, prompt: str, stop: Optional[List[str]]) -> str:
+        """One call with the backend's timeout, recorded in its breaker and metrics."""
+        if not backend.breaker.allow():
+            raise AllBackendsUnavailable(f"Circuit for '{backend.name}' is open.")
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(backend.complete(prompt, stop), backend.timeout_seconds)
+        except asyncio.CancelledError:
+            # Lost a hedge race: no verdict on the backend
+            backend.breaker.release()
+            LLM_BACKEND_CALLS.labels(backend=backend.name, outcome="cancelled").inc()
+            raise
+        except Exception as e:
+            backend.breaker.record_failure()
+            outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+            LLM_BACKEND_CALLS.labels(backend=backend.name, outcome=outcome).inc()
+            logging.warning("LLM backend '%s' failed (%s): %s", backend.name, outcome, str(e) or type(e).__name__)
+            raise
+        elapsed = time.perf_counter() - started
+        backend.breaker.record_success()
+        backend.record_latency(elapsed)
+        LLM_BACKEND_SECONDS.labels(backend=backend.name).observe(elapsed)
+        LLM_BACKEND_CALLS.labels(backend=backend.name, outcome="success").inc()
+        return result
+
+    async def acomplete(self, prompt: str, stop: Optional[List[str]] = None) -> Completion:
+        """
+        Completes a prompt with failover and, if the first choice is slow, a
+        hedged request. The result names the backend that served it.
+        """
+        candidates = self.ordered()
+        errors = []
+        while candidates:
+            backend = candidates.pop(0)
+            hedge = next((b for b in candidates if b.hedge_target), None) if self.hedge_enabled else None
+            tried = [backend]
+            try:
+                if hedge is None:
+                    return Completion(await self._attempt(backend, prompt, stop), backend.name)
+                return await self._hedged(backend, hedge, prompt, stop, tried)
+            except Exception as e:
+                errors.append(f"{backend.name}: {str(e) or type(e).__name__}")
+                # A hedge that already failed is not tried again
+                candidates = [b for b in candidates if b not in tried]
+        raise AllBackendsUnavailable("; ".join(errors) or "No LLM backend is available.")
+
+    async def _hedged(self, primary: LLMBackend, hedge: LLMBackend, prompt: str,
+                      stop: Optional[List[str]], tried: List[LLMBackend]) -> Completion:
+        """Sends the request to 'hedge' as well if 'primary' has not answered in time; the first answer wins."""
+        primary_task = asyncio.ensure_future(self._attempt(primary, prompt, stop))
+        done, _ = await asyncio.wait({primary_task}, timeout=self.hedge_after_seconds)
+        if done:
+            return Completion(primary_task.result(), primary.name)
+
+        self.hedges_started += 1
+        tried.append(hedge)
+        hedge_task = asyncio.ensure_future(self._attempt(hedge, prompt, stop))
+        try:
+            pending = {primary_task, hedge_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.hedges_won += 1
+                            return Completion(task.result(), hedge.name)
+                        return Completion(task.result(), primary.name)
+            # Both failed: surface the primary's error
+            return Completion(primary_task.result(), primary.name)
+        finally:
+            for task in (primary_task, hedge_task):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(primary_task, hedge_task, return_exceptions=True)
+
+    async def astream(self, prompt: str, stop: Optional[List[str]] = None) -> AsyncIterator[Completion]:
+        """
+        Streams a completion as chunks tagged with the serving backend. Fails
+        over only until the first chunk arrives: the first chunk must come
+        within the backend's timeout.
+        """
+        errors = []
+        for backend in self.ordered():
+            if backend.stream is None or not backend.breaker.allow():
+                continue
+            started = time.perf_counter()
+            iterator = backend.stream(prompt, stop).__aiter__()
+            try:
+                first = await asyncio.wait_for(iterator.__anext__(), backend.timeout_seconds)
+            except StopAsyncIteration:
+                first = None
+            except asyncio.CancelledError:
+                # The client went away before the first chunk: no verdict on the backend
+                backend.breaker.release()
+                LLM_BACKEND_CALLS.labels(backend=backend.name, outcome="cancelled").inc()
+                raise
+            except Exception as e:
+                backend.breaker.record_failure()
+                LLM_BACKEND_CALLS.labels(backend=backend.name, outcome="error").inc()
+                errors.append(f"{backend.name}: {str(e) or type(e).__name__}")
+                continue
+            backend.breaker.record_success()
+            backend.record_latency(time.perf_counter() - started)
+            LLM_BACKEND_CALLS.labels(backend=backend.name, outcome="success").inc()
+            if first is not None:
+                yield Completion(first, backend.name)
+                async for chunk in iterator:
+                    yield Completion(chunk, backend.name)
+            return
+        raise AllBackendsUnavailable("; ".join(errors) or "No LLM backend is available.")
+
+    def snapshot(self) -> dict:
+        return {
+            "order": [b.name for b in self.ordered()],
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_after_seconds": self.hedge_after_seconds,
+            "hedges_started": self.hedges_started,
+            "hedges_won": self.hedges_won,
+            "backends": [b.snapshot() for b in self.backends],
+        }
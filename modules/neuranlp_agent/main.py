@@ -1,25 +1,57 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-from .agent_core import agent_core
+from contextlib import asynccontextmanager
+from .lifecycle import agent_warmup, warm_up_on_startup
+from .concurrency import query_limiter, AgentBusy
+from .intent_router import EMERGENCY, FAQ
+from .audio import AudioDecodeError
+from .transcription import transcription_service, TranscriptionBusy
 # MODIFIED: Import the GETTER function, not the object itself
 from .voice_handler import get_voice_handler 
-from .utils import config
+from .utils import config, api_triggers
+from observability.http import instrument_app, format_sse, SSE_HEADERS
+from observability.logs import configure_logging
+import asyncio
+import base64
 import logging
-import os
 
-logging.basicConfig(level=config.LOGGING_LEVEL)
+configure_logging("neuranlp_agent", level=config.LOGGING_LEVEL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The agent builds in the background; /health answers in the meantime
+    await warm_up_on_startup()
+    if config.WHISPER_PRELOAD:
+        # Load the Whisper replicas now rather than on the first voice request
+        warm_whisper = asyncio.create_task(transcription_service.start())
+        warm_whisper.add_done_callback(lambda task: task.cancelled() or task.exception())
+    yield
+    # Close the pooled HTTP client used by the agent's action tools
+    await api_triggers.close_http_client()
+    await transcription_service.stop()
 
 app = FastAPI(
     title="NeuraNLP Agent",
     description="The AI assistant agent for the NeuraCity smart campus.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+# Request latency histograms and GET /metrics
+instrument_app(app)
 
 class QueryResponse(BaseModel):
     response: str
     source: str
     audio_output: Optional[str] = None
+    audio_mime: Optional[str] = None   # e.g. audio/mpeg (gTTS) or audio/wav (offline engines)
+    cached: bool = False
+    route: str = "agent"
+    prompt_tokens: Optional[int] = None   # Sent to the LLM for this query; None if no LLM was called
 
 @app.post("/query", response_model=QueryResponse)
 async def handle_query(query: str = Form(...), mode: str = Form("text"), file: Optional[UploadFile] = File(None)):
@@ -28,44 +60,221 @@ async def handle_query(query: str = Form(...), mode: str = Form("text"), file: O
     - mode: 'text' for text-based interaction, 'voice' for voice-based interaction.
     - file: The audio file (e.g., WAV, MP3) if mode is 'voice'.
     """
-    # MODIFIED: Get the handler instance at the start of the request
-    voice_handler = get_voice_handler() 
-
-    # --- THE REST OF YOUR LOGIC IS IDENTICAL ---
     user_query = query
 
     if mode == "voice":
         if not file:
             raise HTTPException(status_code=400, detail="Voice file is required for voice mode.")
+        voice_handler = get_voice_handler()
         
-        temp_file_path = f"temp_{file.filename}"
         try:
-            with open(temp_file_path, "wb") as buffer:
-                buffer.write(await file.read())
-            
-            user_query = voice_handler.voice_to_text(temp_file_path)
-            
+            # Decoded in memory, then transcribed in a batch with other concurrent clips
+            user_query = await voice_handler.atranscribe(await file.read())
+        except AudioDecodeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except TranscriptionBusy as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error processing voice input: {str(e)}")
-        finally:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
 
     if not user_query:
         raise HTTPException(status_code=400, detail="Query cannot be empty.")
 
-    result = agent_core.run_query(user_query)
+    result = await answer_query(user_query)
 
-    audio_output = None
+    audio_output, audio_mime = None, None
     if mode == "voice" and result and "error" not in result.get("response", "").lower():
-        audio_output = voice_handler.text_to_voice(result["response"])
+        audio_output, audio_mime = await asyncio.to_thread(voice_handler.text_to_voice, result["response"])
     
-    return QueryResponse(response=result["response"], source=result["source"], audio_output=audio_output)
+    return QueryResponse(response=result["response"], source=result["source"], audio_output=audio_output or None,
+                         audio_mime=audio_mime or None, cached=result.get("cached", False), route=result.get("route", "agent"),
+                         prompt_tokens=result.get("prompt_tokens"))
+
+
+async def _ready_agent():
+    """The agent for endpoints that answer queries: waits for warm-up, and 503 if it failed."""
+    try:
+        return await agent_warmup.get()
+    except Exception:
+        raise HTTPException(status_code=503, detail=f"The agent is {agent_warmup.state}.", headers={"Retry-After": "5"})
+
+
+async def answer_query(user_query: str) -> dict:
+    """
+    Answers one query by the cheapest path that can: an emergency dispatch
+    (rules only, never queued behind other queries), the semantic cache, a
+    single retrieval-plus-LLM call for clear FAQs, and finally the full agent.
+    """
+    agent_core = await _ready_agent()
+    router, cache = agent_core.router, agent_core.response_cache
+    decision = router.classify_rules(user_query)
+    if decision is not None and decision.route == EMERGENCY:
+        return {**await agent_core.dispatch_emergency(user_query, decision.location), "route": EMERGENCY}
+
+    cached, query_vector = await cache.lookup(user_query)
+    if cached is not None:
+        return {"response": cached.response, "source": cached.source, "cached": True, "route": "cache"}
+    if decision is None:
+        decision = await router.classify(user_query, query_vector)
+
+    # At most AGENT_MAX_CONCURRENCY LLM-backed answers at once; the rest wait their turn
+    try:
+        async with query_limiter.slot():
+            result = None
+            if decision.route == FAQ:
+                result = await agent_core.answer_from_documents(user_query)
+                if result is not None:
+                    result["route"] = FAQ
+            if result is None:
+                result = await agent_core.arun_query(user_query)
+    except AgentBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after_seconds)})
+    logging.info("Query answered via %s: %s prompt tokens in %s LLM call(s).", result.get("route", "agent"),
+                 result.get("prompt_tokens"), result.get("llm_calls"))
+    await cache.store(user_query, result["response"], result["source"], query_vector)
+    return result
+
+
+@app.post("/query/stream")
+async def handle_query_stream(query: str = Form(...)):
+    """
+    Streams the answer to a text query as Server-Sent Events:
+    - status: progress, e.g. {"stage": "tool", "tool": "CallSecurity"}
+    - token: a piece of the final answer, as soon as the LLM produces it
+    - done: the complete result (same fields as /query)
+    - error: the query could not be served, e.g. the agent is saturated
+    """
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    if query_limiter.saturated:
+        raise HTTPException(status_code=503, detail="The assistant is busy. Please retry shortly.", headers={"Retry-After": "5"})
+    return StreamingResponse(stream_answer(query), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def stream_answer(user_query: str):
+    """
+    The streaming counterpart of answer_query(), with the same routing. Once
+    the stream has started a failure can no longer change the status code, so
+    it ends the stream with an 'error' event instead.
+    """
+    try:
+        async for event in _stream_answer_events(user_query):
+            yield event
+    except AgentBusy as e:
+        yield format_sse("error", {"detail": str(e), "retry_after_seconds": e.retry_after_seconds})
+    except Exception as e:
+        logging.error("Streaming answer failed: %s", e)
+        yield format_sse("error", {"detail": "The query could not be answered."})
+
+
+async def _stream_answer_events(user_query: str):
+    if not agent_warmup.ready:
+        yield format_sse("status", {"stage": "warming_up"})
+    agent_core = await agent_warmup.get()
+    router, cache = agent_core.router, agent_core.response_cache
+    yield format_sse("status", {"stage": "routing"})
+    decision = router.classify_rules(user_query)
+    if decision is not None and decision.route == EMERGENCY:
+        result = await agent_core.dispatch_emergency(user_query, decision.location)
+        yield format_sse("done", {**result, "route": EMERGENCY, "cached": False})
+        return
+
+    cached, query_vector = await cache.lookup(user_query)
+    if cached is not None:
+        yield format_sse("done", {"response": cached.response, "source": cached.source, "route": "cache", "cached": True})
+        return
+    if decision is None:
+        decision = await router.classify(user_query, query_vector)
+
+    async with query_limiter.slot():
+        yield format_sse("status", {"stage": "thinking"})
+        result, route = None, FAQ
+        if decision.route == FAQ:
+            async for event, data in agent_core.astream_from_documents(user_query):
+                if event == "done":
+                    result = data
+                else:
+                    yield format_sse(event, data)
+        if result is None:
+            route = "agent"
+            async for event, data in agent_core.astream_query(user_query):
+                if event == "done":
+                    result = data
+                else:
+                    yield format_sse(event, data)
+    await cache.store(user_query, result["response"], result["source"], query_vector)
+    yield format_sse("done", {**result, "route": route, "cached": False})
+
+
+@app.post("/speak/stream")
+async def handle_speak_stream(text: str = Form(...)):
+    """
+    Speaks a text as Server-Sent Events, one 'audio' event per sentence
+    ({"index", "text", "mime", "audio": base64}) as soon as it is synthesized,
+    then 'done'. Pair it with /query/stream to start talking before the whole
+    answer has been synthesized.
+    """
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty.")
+    synthesizer = get_voice_handler().synthesizer
+
+    async def events():
+        try:
+            async for index, sentence, audio, mime in synthesizer.stream(text):
+                yield format_sse("audio", {"index": index, "text": sentence, "mime": mime,
+                                           "audio": base64.b64encode(audio).decode("ascii")})
+        except Exception as e:
+            logging.error("Streaming speech failed: %s", e)
+            yield format_sse("error", {"detail": "Speech could not be synthesized."})
+            return
+        yield format_sse("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    """Answers as soon as the server is up; 'agent' says whether warm-up has finished."""
+    return {"status": "ok", "agent": agent_warmup.snapshot()}
+
+
+def _built_agent():
+    """The agent for endpoints that only report on it: 503 while it is still warming up."""
+    agent_core = agent_warmup.peek()
+    if agent_core is None:
+        raise HTTPException(status_code=503, detail=f"The agent is {agent_warmup.state}.", headers={"Retry-After": "5"})
+    return agent_core
+
+
+@app.get("/stats/concurrency")
+def get_concurrency_stats():
+    """Active and queued agent runs, rejections and queue-wait percentiles."""
+    return query_limiter.snapshot()
+
+
+@app.get("/stats/voice")
+def get_voice_stats():
+    """Whisper pool state, queue depth and batching, and the TTS engines and audio cache."""
+    return {"transcription": transcription_service.snapshot(), "tts": get_voice_handler().synthesizer.snapshot()}
+
+
+@app.get("/stats/cache")
+def get_cache_stats():
+    """Semantic response cache size, hit rate and bypass/invalidation counts."""
+    return _built_agent().response_cache.snapshot()
+
+
+@app.get("/stats/llm")
+def get_llm_stats():
+    """LLM backend order, circuit states, latency percentiles and hedging counts."""
+    return _built_agent().llm_pool.snapshot()
+
+
+@app.post("/system/cache/invalidate")
+def invalidate_cache():
+    """Drops every cached answer, e.g. after knowledge that is not in the document files changed."""
+    _built_agent().response_cache.invalidate("manual")
+    return {"status": "invalidated"}
 
 
 @app.get("/sample_queries")
@@ -82,6 +291,11 @@ def get_sample_queries():
     }
 
 
+# Everything heavy is deferred to the warm-up, so this should stay well under a second
+agent_warmup.record("server_import", time.perf_counter() - _IMPORT_STARTED)
+logging.info("neuranlp_agent imported in %.2fs.", agent_warmup.timings["server_import_seconds"])
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=config.HOST, port=config.PORT, reload=True)
\ No newline at end of file
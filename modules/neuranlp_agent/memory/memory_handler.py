@@ -54,6 +54,14 @@ class MemoryHandler:
             except Exception as e:
                 logging.error(f"Failed to load document {doc_path}: {e}")
 
-# Initialize and load documents
-memory_handler = MemoryHandler()
-memory_handler.load_documents(config.DOCUMENT_SOURCES)
\ No newline at end of file
+# --- The Singleton Pattern ---
+# Opening the Chroma DB and indexing documents happens on first use, not at import.
+_memory_handler_instance = None
+
+def get_memory_handler():
+    """Gets the single, shared MemoryHandler, with the documents loaded."""
+    global _memory_handler_instance
+    if _memory_handler_instance is None:
+        _memory_handler_instance = MemoryHandler()
+        _memory_handler_instance.load_documents(config.DOCUMENT_SOURCES)
+    return _memory_handler_instance
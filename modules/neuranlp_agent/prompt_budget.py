@@ -0,0 +1,135 @@
+# File: modules/neuranlp_agent/prompt_budget.py
+
+import logging
+import math
+import re
+from typing import List, Optional, Sequence, Set, Tuple
+
+from .utils import config
+from observability.metrics import histogram
+
+AGENT_PROMPT_TOKENS = histogram(
+    "neuracity_agent_prompt_tokens", "Prompt tokens sent to the LLM per query (all calls), by route.", ["route"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+
+CHARS_PER_TOKEN = 4   # Rough average for English text with both Gemini's and Mistral's tokenizers
+SHINGLE_SIZE = 3      # Words per shingle when comparing passages for near-duplicates
+ELLIPSIS = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """A tokenizer-free estimate, cheap enough to use while building every prompt."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+_encoding = None
+_encoding_failed = False
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:   # Not installed, or its BPE file cannot be downloaded
+            _encoding_failed = True
+            logging.info("tiktoken unavailable (%s); prompt token counts are estimated.", e)
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Tokens as counted by tiktoken's cl100k_base when available, else estimate_tokens()."""
+    encoding: Optional[object] = _get_encoding()
+    return len(encoding.encode(text)) if encoding is not None else estimate_tokens(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text to about max_tokens, preferring a sentence end, else a word boundary."""
+    text = text.strip()
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    cut = max(head.rfind(". "), head.rfind(".\n"), head.rfind("? "), head.rfind("! "))
+    if cut >= limit // 2:
+        return head[:cut + 1]
+    cut = head.rfind(" ")
+    return (head[:cut] if cut > 0 else head).rstrip(",;: ") + ELLIPSIS
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+class PromptBudget:
+    """
+    Keeps the ReAct agent's prompt from growing without bound.
+
+    Retrieved passages are de-duplicated (exact and near-duplicate, by word
+    shingle overlap), each truncated, and cut off at a total budget. In the
+    scratchpad the most recent steps are kept verbatim, while earlier ones
+    are compressed to their action and a short observation; if that is still
+    over budget, the oldest steps are dropped.
+    """
+    def __init__(self, passage_tokens: int = config.PASSAGE_MAX_TOKENS,
+                 retrieval_tokens: int = config.RETRIEVAL_TOKEN_BUDGET,
+                 scratchpad_tokens: int = config.SCRATCHPAD_TOKEN_BUDGET,
+                 keep_recent_steps: int = config.SCRATCHPAD_KEEP_RECENT_STEPS,
+                 summary_tokens: int = 40, duplicate_threshold: float = 0.8):
+        self.passage_tokens = passage_tokens
+        self.retrieval_tokens = retrieval_tokens
+        self.scratchpad_tokens = scratchpad_tokens
+        self.keep_recent_steps = keep_recent_steps
+        self.summary_tokens = summary_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+    def select_passages(self, passages: Sequence[str]) -> List[str]:
+        """The distinct passages, truncated, in retrieval order, within the retrieval budget."""
+        selected, seen, used = [], [], 0
+        for passage in passages:
+            if not passage or not passage.strip():
+                continue
+            shingles = _shingles(passage)
+            if any(len(shingles & other) / max(1, len(shingles | other)) >= self.duplicate_threshold for other in seen):
+                continue
+            text = truncate_to_tokens(passage, self.passage_tokens)
+            cost = estimate_tokens(text)
+            if selected and used + cost > self.retrieval_tokens:
+                break
+            seen.append(shingles)
+            selected.append(text)
+            used += cost
+        return selected
+
+    def format_passages(self, passages: Sequence[str]) -> str:
+        """Selected passages as the text the LLM sees, numbered so it can tell them apart."""
+        selected = self.select_passages(passages)
+        if not selected:
+            return "No relevant information found in memory."
+        return "\n\n".join(f"[{i}] {text}" for i, text in enumerate(selected, 1))
+
+    def format_scratchpad(self, intermediate_steps) -> str:
+        """
+        Drop-in replacement for LangChain's format_log_to_str: 'intermediate_steps'
+        is a list of (AgentAction, observation) pairs.
+        """
+        recent_from = max(0, len(intermediate_steps) - self.keep_recent_steps)
+        parts = []
+        for index, (action, observation) in enumerate(intermediate_steps):
+            if index >= recent_from:
+                parts.append(f"{action.log}\nObservation: {observation}\nThought: ")
+            else:
+                summary = truncate_to_tokens(str(observation), self.summary_tokens)
+                parts.append(f"Action: {action.tool}\nAction Input: {action.tool_input}\nObservation: {summary}\nThought: ")
+
+        # Still too long: drop the oldest steps, but never the latest one
+        dropped = 0
+        while len(parts) > 1 and estimate_tokens("".join(parts)) > self.scratchpad_tokens:
+            parts.pop(0)
+            dropped += 1
+        if dropped:
+            parts.insert(0, f"(Earlier {dropped} step(s) omitted.)\nThought: ")
+        return "".join(parts)
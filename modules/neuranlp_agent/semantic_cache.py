@@ -0,0 +1,207 @@
+# File: modules/neuranlp_agent/semantic_cache.py
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .utils import config
+from observability.metrics import counter
+
+SEMANTIC_CACHE_LOOKUPS = counter("neuracity_agent_cache_lookups_total", "Semantic response cache lookups by outcome.", ["outcome"])
+
+DOCUMENT_CHECK_INTERVAL_SECONDS = 10.0   # How often the knowledge-base files are checked for changes
+TIME_SENSITIVE_TTL_SECONDS = 300         # Answers about "today", "now", ... go stale quickly
+
+# Queries that may trigger a real-world action are never answered from the cache
+ACTION_QUERY_PATTERN = re.compile(
+    r"\b(security|emergency|help|call|dispatch|announce\w*|announcement|alert|notify|notification|broadcast|"
+    r"fire|smoke|faint\w*|collaps\w*|unconscious|seizure|bleeding|injur\w*|attack\w*|assault\w*|fight\w*|"
+    r"weapon|gun|knife|intruder|police|ambulance|evacuat\w*|send|report)\b",
+    re.IGNORECASE
+)
+TIME_SENSITIVE_PATTERN = re.compile(r"\b(today|tonight|now|currently|right now|yesterday|tomorrow|this (morning|afternoon|evening|week))\b", re.IGNORECASE)
+
+def normalize_query(query: str) -> str:
+    """Lower-cased, whitespace-collapsed text without trailing punctuation: the exact-match key."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+def is_action_query(query: str) -> bool:
+    return bool(ACTION_QUERY_PATTERN.search(query))
+
+
+class CachedResponse:
+    __slots__ = ("query", "response", "source", "vector", "expires_at", "hits")
+
+    def __init__(self, query: str, response: str, source: str, vector: np.ndarray, expires_at: float):
+        self.query = query
+        self.response = response
+        self.source = source
+        self.vector = vector
+        self.expires_at = expires_at
+        self.hits = 0
+
+
+class SemanticCache:
+    """
+    Agent answers keyed by the embedding of the question.
+
+    A new question is answered from the cache if it is textually identical
+    (no embedding needed) or its embedding's cosine similarity to a cached
+    question is at least the threshold. Entries expire after a TTL (shorter
+    for time-sensitive questions), the least recently used are evicted when
+    full, and everything is dropped when a knowledge-base document changes.
+    Questions that may trigger an action bypass the cache entirely.
+    """
+    def __init__(self, embed: Callable[[List[str]], Sequence[Sequence[float]]],
+                 document_paths: Sequence[str] = (),
+                 on_documents_changed: Optional[Callable[[List[str]], None]] = None,
+                 threshold: float = config.SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: float = config.SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = config.SEMANTIC_CACHE_MAX_ENTRIES,
+                 enabled: bool = config.SEMANTIC_CACHE_ENABLED,
+                 clock: Callable[[], float] = time.monotonic):
+        self.embed = embed
+        self.document_paths = list(document_paths)
+        self.on_documents_changed = on_documents_changed
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.clock = clock
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        # Stacked, normalised vectors of the entries, rebuilt only when the set of entries changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._document_stamps = self._stat_documents()
+        self._next_document_check = 0.0
+        self.stats: Dict[str, int] = {"hits": 0, "semantic_hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0}
+
+    # --- Public API ---
+
+    async def lookup(self, query: str) -> Tuple[Optional[CachedResponse], Optional[np.ndarray]]:
+        """
+        Returns (cached answer or None, the query's embedding). Pass the
+        embedding on to store() so a miss is not embedded twice.
+        """
+        if not self.enabled or is_action_query(query):
+            self._count("bypassed")
+            return None, None
+        await self._check_documents()
+
+        key = normalize_query(query)
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            return self._hit(key, entry, "hits"), None
+
+        vector = await self._embed(query)
+        match = self._nearest(vector, now)
+        if match is not None:
+            return self._hit(match, self._entries[match], "semantic_hits"), vector
+        self._count("misses")
+        return None, vector
+
+    async def store(self, query: str, response: str, source: str, vector: Optional[np.ndarray] = None):
+        """Caches an agent answer. Action queries and error answers are never stored."""
+        if not self.enabled or source == "error" or is_action_query(query):
+            return
+        if vector is None:
+            vector = await self._embed(query)
+        ttl = TIME_SENSITIVE_TTL_SECONDS if TIME_SENSITIVE_PATTERN.search(query) else self.ttl_seconds
+        key = normalize_query(query)
+        self._entries[key] = CachedResponse(query, response, source, vector, self.clock() + ttl)
+        self._entries.move_to_end(key)
+        self._evict()
+        self._matrix = None
+
+    def invalidate(self, reason: str = "manual"):
+        """Drops every cached answer."""
+        if self._entries:
+            logging.info("Semantic cache invalidated (%s); dropped %d answer(s).", reason, len(self._entries))
+        self._entries.clear()
+        self._matrix = None
+        self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "hit_rate": round((self.stats["hits"] + self.stats["semantic_hits"]) / lookups, 4) if lookups else 0.0,
+            **self.stats,
+        }
+
+    # --- Internals ---
+
+    def _count(self, outcome: str):
+        self.stats[outcome] += 1
+        SEMANTIC_CACHE_LOOKUPS.labels(outcome=outcome).inc()
+
+    def _hit(self, key: str, entry: CachedResponse, outcome: str) -> CachedResponse:
+        entry.hits += 1
+        self._entries.move_to_end(key)
+        self._count(outcome)
+        return entry
+
+    async def _embed(self, text: str) -> np.ndarray:
+        # The embedding model is CPU-bound; keep it off the event loop
+        vector = np.asarray((await asyncio.to_thread(self.embed, [text]))[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _nearest(self, vector: np.ndarray, now: float) -> Optional[str]:
+        """The key of the most similar live entry at or above the threshold."""
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key].vector for key in self._matrix_keys])
+        similarities = self._matrix @ vector
+        for index in np.argsort(similarities)[::-1]:
+            if similarities[index] < self.threshold:
+                return None
+            key = self._matrix_keys[index]
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                return key
+        return None
+
+    def _evict(self):
+        now = self.clock()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _stat_documents(self) -> Dict[str, Tuple[float, int]]:
+        stamps = {}
+        for path in self.document_paths:
+            try:
+                stat = os.stat(path)
+                stamps[path] = (stat.st_mtime, stat.st_size)
+            except OSError:
+                stamps[path] = (0.0, -1)
+        return stamps
+
+    async def _check_documents(self):
+        """Invalidates the cache (and re-indexes) when a knowledge-base document was edited."""
+        now = self.clock()
+        if now < self._next_document_check:
+            return
+        self._next_document_check = now + DOCUMENT_CHECK_INTERVAL_SECONDS
+        stamps = self._stat_documents()
+        changed = [path for path, stamp in stamps.items() if self._document_stamps.get(path) != stamp]
+        if not changed:
+            return
+        self._document_stamps = stamps
+        self.invalidate(f"documents changed: {', '.join(os.path.basename(path) for path in changed)}")
+        if self.on_documents_changed is not None:
+            await asyncio.to_thread(self.on_documents_changed, changed)
@@ -0,0 +1,42 @@
+# File: modules/neuranlp_agent/streaming.py
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class FinalAnswerFilter:
+    """
+    Passes through only the part of a ReAct completion after 'Final Answer:'.
+
+    The agent's LLM output is mostly Thought/Action text that users should
+    not see; this sees the tokens as they arrive and starts emitting as soon
+    as the marker has gone by, even if it was split across tokens. Call
+    reset() when a new LLM call starts.
+    """
+    def __init__(self, marker: str = FINAL_ANSWER_MARKER):
+        self.marker = marker
+        self.reset()
+
+    def reset(self):
+        self._pending = ""
+        self._streaming = False
+        self._emitted = False
+
+    @property
+    def streaming(self) -> bool:
+        return self._streaming
+
+    def feed(self, text: str) -> str:
+        """Returns the text to show for this token (often empty)."""
+        if not self._streaming:
+            self._pending += text
+            index = self._pending.find(self.marker)
+            if index == -1:
+                # Only a tail that could still be the start of the marker needs keeping
+                self._pending = self._pending[-(len(self.marker) - 1):]
+                return ""
+            self._streaming = True
+            text, self._pending = self._pending[index + len(self.marker):], ""
+        if not self._emitted:
+            text = text.lstrip()
+            self._emitted = bool(text)
+        return text
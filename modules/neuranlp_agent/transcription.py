@@ -0,0 +1,228 @@
+# File: modules/neuranlp_agent/transcription.py
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .utils import config
+from observability.metrics import counter, histogram
+
+TRANSCRIPTION_SECONDS = histogram(
+    "neuracity_voice_transcription_seconds", "Per-clip transcription latency by phase (queue wait, batched inference, total).", ["phase"]
+)
+TRANSCRIPTION_BATCH_SIZE = histogram(
+    "neuracity_voice_transcription_batch_size", "Clips decoded together in one Whisper batch.", buckets=(1, 2, 4, 8, 16, 32)
+)
+TRANSCRIPTIONS = counter("neuracity_voice_transcriptions_total", "Transcription requests by outcome.", ["outcome"])
+
+BATCH_POLL_SECONDS = 0.005   # How often a filling batch checks the queue for more clips
+
+
+class TranscriptionBusy(Exception):
+    """The transcription queue is full."""
+
+
+def load_whisper_model(model_size: str, precision: str):
+    """Loads a Whisper model for the requested CPU precision: 'fp32' or 'int8' (dynamic quantization)."""
+    import torch
+    import whisper
+
+    model = whisper.load_model(model_size)
+    if model.device.type != "cpu":
+        return model
+    model = model.float()
+    if precision == "int8":
+        # Linear layers dominate Whisper's CPU time; int8 weights roughly halve it
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def whisper_transcribe_batch(model, clips: List[np.ndarray]) -> List[str]:
+    """
+    Transcribes several clips with one batched decode. Clips of up to 30 s
+    (Whisper's window, and the usual voice query) are decoded together;
+    longer ones fall back to model.transcribe() one by one.
+    """
+    import torch
+    import whisper
+
+    texts: List[Optional[str]] = [None] * len(clips)
+    fp16 = model.device.type == "cuda"
+    short = [i for i, clip in enumerate(clips) if len(clip) <= whisper.audio.N_SAMPLES]
+    for i in range(len(clips)):
+        if i not in short:
+            texts[i] = model.transcribe(clips[i], fp16=fp16, language=config.WHISPER_LANGUAGE)["text"].strip()
+    if short:
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(clips[i])), model.dims.n_mels).to(model.device)
+            for i in short
+        ])
+        options = whisper.DecodingOptions(language=config.WHISPER_LANGUAGE, fp16=fp16, without_timestamps=True)
+        for i, result in zip(short, whisper.decode(model, mels, options)):
+            texts[i] = result.text.strip()
+    return texts
+
+
+class _Clip:
+    __slots__ = ("samples", "future", "enqueued_at")
+
+    def __init__(self, samples: np.ndarray, future: asyncio.Future):
+        self.samples = samples
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class TranscriptionService:
+    """
+    A warm pool of Whisper models fed from one queue.
+
+    Each replica has its own worker thread. A replica that picks up a clip
+    waits up to batch_window_seconds for more to arrive and transcribes up
+    to max_batch of them in a single forward pass, so a burst of voice
+    queries costs little more than one. The models are loaded by start(),
+    which the server's lifespan calls so the first user does not wait.
+    """
+    def __init__(self, model_size: str = config.WHISPER_MODEL_SIZE,
+                 precision: str = config.WHISPER_PRECISION,
+                 replicas: int = config.WHISPER_REPLICAS,
+                 max_batch: int = config.WHISPER_MAX_BATCH,
+                 batch_window_seconds: float = config.WHISPER_BATCH_WINDOW_MS / 1000,
+                 max_queued: int = config.WHISPER_MAX_QUEUED,
+                 load_model: Callable = load_whisper_model,
+                 transcribe_batch: Callable = whisper_transcribe_batch):
+        self.model_size = model_size
+        self.precision = precision
+        self.replicas = max(1, replicas)
+        self.max_batch = max(1, max_batch)
+        self.batch_window_seconds = batch_window_seconds
+        self.max_queued = max_queued
+        self.load_model = load_model
+        self.transcribe_batch = transcribe_batch
+        self.state = "cold"   # cold -> loading -> ready | failed
+        self.load_seconds: Optional[float] = None
+        self.completed = 0
+        self.batches = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._executors: List[ThreadPoolExecutor] = []
+        self._starting: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Loads the models and starts the workers, once; concurrent callers wait for the same load."""
+        if self._starting is None or (self._starting.done() and self.state == "failed"):
+            self._starting = asyncio.get_running_loop().create_task(self._start())
+        await asyncio.shield(self._starting)
+
+    async def _start(self):
+        self.state = "loading"
+        started = time.perf_counter()
+        self._executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"whisper-{i}") for i in range(self.replicas)]
+        loop = asyncio.get_running_loop()
+        try:
+            models = await asyncio.gather(*(
+                loop.run_in_executor(executor, self.load_model, self.model_size, self.precision) for executor in self._executors
+            ))
+        except Exception:
+            self.state = "failed"
+            logging.exception("Loading Whisper '%s' failed", self.model_size)
+            self._shutdown_executors()
+            raise
+        self.load_seconds = time.perf_counter() - started
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._workers = [loop.create_task(self._worker(i, model)) for i, model in enumerate(models)]
+        self.state = "ready"
+        logging.info("Whisper '%s' (%s) ready: %d replica(s) in %.2fs.", self.model_size, self.precision,
+                     self.replicas, self.load_seconds)
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._shutdown_executors()
+        self._starting, self.state = None, "cold"
+
+    def _shutdown_executors(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors = []
+
+    async def transcribe(self, samples: np.ndarray) -> str:
+        """Queues one 16 kHz float32 clip and returns its text. Raises TranscriptionBusy if the queue is full."""
+        await self.start()
+        clip = _Clip(samples, asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(clip)
+        except asyncio.QueueFull:
+            TRANSCRIPTIONS.labels(outcome="rejected").inc()
+            raise TranscriptionBusy(f"{self.max_queued} voice clips are already waiting to be transcribed.")
+        return await clip.future
+
+    async def _collect(self, first: _Clip) -> List[_Clip]:
+        """Gathers more queued clips behind 'first' until the batch is full or the window closes."""
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window_seconds
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, BATCH_POLL_SECONDS))
+        # Callers that gave up (e.g. disconnected) are not worth transcribing
+        return [clip for clip in batch if not clip.future.done()]
+
+    async def _worker(self, replica: int, model):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(await self._queue.get())
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                texts = await loop.run_in_executor(
+                    self._executors[replica], self.transcribe_batch, model, [clip.samples for clip in batch]
+                )
+            except Exception as e:
+                logging.error("Whisper batch of %d clip(s) failed: %s", len(batch), e)
+                TRANSCRIPTIONS.labels(outcome="error").inc(len(batch))
+                for clip in batch:
+                    if not clip.future.done():
+                        clip.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            self.batches += 1
+            TRANSCRIPTION_BATCH_SIZE.observe(len(batch))
+            for clip, text in zip(batch, texts):
+                self.completed += 1
+                TRANSCRIPTIONS.labels(outcome="success").inc()
+                TRANSCRIPTION_SECONDS.labels(phase="queue_wait").observe(started - clip.enqueued_at)
+                TRANSCRIPTION_SECONDS.labels(phase="inference").observe(finished - started)
+                TRANSCRIPTION_SECONDS.labels(phase="total").observe(finished - clip.enqueued_at)
+                if not clip.future.done():
+                    clip.future.set_result(text)
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "model_size": self.model_size,
+            "precision": self.precision,
+            "replicas": self.replicas,
+            "max_batch": self.max_batch,
+            "batch_window_ms": round(self.batch_window_seconds * 1000, 1),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "completed": self.completed,
+            "batches": self.batches,
+            "mean_batch_size": round(self.completed / self.batches, 2) if self.batches else None,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+        }
+
+
+transcription_service = TranscriptionService()
@@ -0,0 +1,320 @@
+# File: modules/neuranlp_agent/tts.py
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .utils import config
+from observability.metrics import counter, histogram
+
+TTS_SYNTHESIS_SECONDS = histogram("neuracity_tts_synthesis_seconds", "Time to synthesize one text or sentence, by engine.", ["engine"])
+TTS_CACHE_LOOKUPS = counter("neuracity_tts_cache_lookups_total", "Text-to-speech audio cache lookups by outcome.", ["outcome"])
+
+TTS_SUBPROCESS_TIMEOUT_SECONDS = 30
+PIPER_SAMPLE_RATE = 22050
+MAX_SENTENCE_CHARS = 300
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+class TTSError(Exception):
+    """Speech could not be synthesized."""
+
+
+class TTSEngine:
+    """Turns text into audio bytes. Subclasses set name, mime and extension."""
+    name = "base"
+    mime = "application/octet-stream"
+    extension = "bin"
+    offline = False
+
+    @property
+    def voice_id(self) -> str:
+        """Identifies the voice, so cached audio from another voice is never reused."""
+        return self.name
+
+    def available(self) -> bool:
+        return True
+
+    def synthesize(self, text: str) -> bytes:
+        raise NotImplementedError
+
+
+class GTTSEngine(TTSEngine):
+    """Google Translate's TTS. Needs network access."""
+    name, mime, extension = "gtts", "audio/mpeg", "mp3"
+
+    def __init__(self, lang: str = "en"):
+        self.lang = lang
+
+    @property
+    def voice_id(self) -> str:
+        return f"gtts:{self.lang}"
+
+    def synthesize(self, text: str) -> bytes:
+        from gtts import gTTS
+        fp = io.BytesIO()
+        gTTS(text=text, lang=self.lang).write_to_fp(fp)
+        return fp.getvalue()
+
+
+def _run(command: List[str], text: str) -> bytes:
+    try:
+        result = subprocess.run(command, input=text.encode("utf-8"), capture_output=True,
+                                timeout=TTS_SUBPROCESS_TIMEOUT_SECONDS, check=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        raise TTSError(f"{command[0]} failed: {e}")
+    return result.stdout
+
+
+class PiperEngine(TTSEngine):
+    """Piper neural TTS, fully offline. Raw PCM from its stdout is wrapped into a WAV in memory."""
+    name, mime, extension, offline = "piper", "audio/wav", "wav", True
+
+    def __init__(self, model_path: Optional[str] = config.PIPER_MODEL_PATH, executable: str = "piper"):
+        self.model_path = model_path
+        self.executable = executable
+
+    @property
+    def voice_id(self) -> str:
+        return f"piper:{os.path.basename(self.model_path or '')}"
+
+    def available(self) -> bool:
+        return bool(self.model_path) and os.path.exists(self.model_path) and shutil.which(self.executable) is not None
+
+    def synthesize(self, text: str) -> bytes:
+        pcm = _run([self.executable, "--model", self.model_path, "--output_raw"], text)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as clip:
+            clip.setnchannels(1)
+            clip.setsampwidth(2)
+            clip.setframerate(PIPER_SAMPLE_RATE)
+            clip.writeframes(pcm)
+        return buffer.getvalue()
+
+
+class EspeakEngine(TTSEngine):
+    """eSpeak NG, fully offline and lightweight; robotic but always installable."""
+    name, mime, extension, offline = "espeak", "audio/wav", "wav", True
+
+    def __init__(self, voice: str = "en"):
+        self.voice = voice
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak") or "espeak-ng"
+
+    @property
+    def voice_id(self) -> str:
+        return f"espeak:{self.voice}"
+
+    def available(self) -> bool:
+        return shutil.which(self.executable) is not None
+
+    def synthesize(self, text: str) -> bytes:
+        return _run([self.executable, "-v", self.voice, "--stdin", "--stdout"], text)
+
+
+ENGINES = {"gtts": GTTSEngine, "piper": PiperEngine, "espeak": EspeakEngine}
+
+def create_engine(name: str) -> TTSEngine:
+    try:
+        return ENGINES[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown TTS engine '{name}'. Choose one of: {', '.join(ENGINES)}.")
+
+
+def split_sentences(text: str, max_chars: int = MAX_SENTENCE_CHARS) -> List[str]:
+    """Splits text at sentence ends; overly long sentences are split again at word boundaries."""
+    sentences = []
+    for sentence in SENTENCE_PATTERN.split(text.strip()):
+        sentence = sentence.strip()
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+class AudioCache:
+    """
+    Synthesized audio, content-addressed by a hash of the voice and the text.
+
+    Files live in one directory (written atomically) so they survive restarts;
+    the most recently used are also kept in memory. When the directory grows
+    past max_bytes the least recently used files are removed.
+    """
+    def __init__(self, directory: str = config.TTS_CACHE_DIR, max_bytes: int = config.TTS_CACHE_MAX_MB * 1024 * 1024,
+                 memory_entries: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        os.makedirs(directory, exist_ok=True)
+        # Running total of the directory's size; the directory is only scanned when it goes over
+        self._bytes = sum(size for _, size, _ in self._files())
+
+    @staticmethod
+    def key(voice_id: str, text: str, extension: str) -> str:
+        normalized = re.sub(r"\s+", " ", text).strip()
+        return hashlib.sha256(f"{voice_id}\n{normalized}".encode("utf-8")).hexdigest() + "." + extension
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return self._count("memory_hits", data)
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)   # Marks it recently used for eviction
+        except OSError:
+            return self._count("misses", None)
+        self._remember(key, data)
+        return self._count("disk_hits", data)
+
+    def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        path = os.path.join(self.directory, key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning("Could not write TTS cache file %s: %s", path, e)
+            return
+        with self._lock:
+            self._bytes += len(data)
+            over = self._bytes > self.max_bytes
+        if over:
+            self._enforce_size()
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, outcome: str, data):
+        self.stats[outcome] += 1
+        TTS_CACHE_LOOKUPS.labels(outcome=outcome).inc()
+        return data
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        """(last used, size, path) of every cache file."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.endswith(".tmp")]
+        except OSError:
+            return []
+        files = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _enforce_size(self):
+        """Removes the least recently used files until the directory is at 90% of max_bytes."""
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = total
+
+    def snapshot(self) -> dict:
+        return {"directory": self.directory, "memory_entries": len(self._memory), **self.stats}
+
+
+class SpeechSynthesizer:
+    """
+    Text-to-speech through a configurable engine, with an optional offline
+    fallback engine and the audio cache in front of both.
+    """
+    def __init__(self, engine: TTSEngine, fallback: Optional[TTSEngine] = None, cache: Optional[AudioCache] = None):
+        self.engine = engine
+        self.fallback = fallback
+        self.cache = cache
+
+    def synthesize(self, text: str) -> Tuple[bytes, str]:
+        """Returns (audio, mime type) for the text, from the cache when it was spoken before."""
+        errors = []
+        for engine in filter(None, (self.engine, self.fallback)):
+            key = AudioCache.key(engine.voice_id, text, engine.extension)
+            if self.cache is not None:
+                data = self.cache.get(key)
+                if data is not None:
+                    return data, engine.mime
+            started = time.perf_counter()
+            try:
+                data = engine.synthesize(text)
+            except Exception as e:
+                logging.warning("TTS engine '%s' failed: %s", engine.name, e)
+                errors.append(f"{engine.name}: {e}")
+                continue
+            TTS_SYNTHESIS_SECONDS.labels(engine=engine.name).observe(time.perf_counter() - started)
+            if self.cache is not None:
+                self.cache.put(key, data)
+            return data, engine.mime
+        raise TTSError("; ".join(errors) or "No TTS engine configured.")
+
+    async def stream(self, text: str) -> AsyncIterator[Tuple[int, str, bytes, str]]:
+        """
+        Synthesizes sentence by sentence, yielding (index, sentence, audio, mime)
+        as each is ready; the next sentence is synthesized while the current
+        one is being sent. Sentences are cached individually, so stock phrases
+        inside otherwise new answers are reused.
+        """
+        sentences = split_sentences(text)
+        if not sentences:
+            return
+        pending = asyncio.ensure_future(asyncio.to_thread(self.synthesize, sentences[0]))
+        try:
+            for index, sentence in enumerate(sentences):
+                audio, mime = await pending
+                if index + 1 < len(sentences):
+                    pending = asyncio.ensure_future(asyncio.to_thread(self.synthesize, sentences[index + 1]))
+                yield index, sentence, audio, mime
+        finally:
+            if not pending.done():
+                pending.cancel()
+
+    def snapshot(self) -> dict:
+        return {
+            "engine": self.engine.name,
+            "fallback": self.fallback.name if self.fallback else None,
+            "cache": self.cache.snapshot() if self.cache is not None else None,
+        }
+
+
+def build_synthesizer() -> SpeechSynthesizer:
+    """The synthesizer described by TTS_ENGINE, TTS_FALLBACK_ENGINE and the TTS cache settings."""
+    engine = create_engine(config.TTS_ENGINE)
+    fallback = create_engine(config.TTS_FALLBACK_ENGINE) if config.TTS_FALLBACK_ENGINE else None
+    if fallback is not None and (fallback.name == engine.name or not fallback.available()):
+        fallback = None
+    cache = AudioCache() if config.TTS_CACHE_ENABLED else None
+    return SpeechSynthesizer(engine, fallback, cache)
@@ -1,9 +1,68 @@
 import requests
+import httpx
 from . import config
 import logging
 
 logging.basicConfig(level=config.LOGGING_LEVEL)
 
+# --- Async variants (used by the agent's async path) ---
+# One pooled client for every tool call, so concurrent agent runs reuse
+# keep-alive connections to the ReflexSystem instead of opening new ones.
+_http_client: httpx.AsyncClient | None = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the shared AsyncClient, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=config.REFLEX_API_BASE_URL,
+            timeout=config.REFLEX_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=config.REFLEX_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.REFLEX_HTTP_MAX_CONNECTIONS
+            )
+        )
+    return _http_client
+
+async def close_http_client():
+    """Closes the shared AsyncClient on shutdown."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+async def _apost(path: str, payload: dict, action: str):
+    try:
+        response = await get_http_client().post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPError as e:
+        logging.error("Failed to %s: %s", action, e)
+        return {"error": str(e)}
+
+async def acall_security(location: str):
+    """Dispatches security to a given location without blocking the event loop."""
+    result = await _apost("/actions/call_security", {"location": location}, "call security")
+    if "error" not in result:
+        logging.info("Security dispatched to %s.", location)
+    return result
+
+async def asend_announcement(message: str):
+    """Sends a campus-wide announcement without blocking the event loop."""
+    result = await _apost("/actions/send_announcement", {"message": message}, "send announcement")
+    if "error" not in result:
+        logging.info("Announcement sent: %s", message)
+    return result
+
+async def anotify_admin(department: str, message: str):
+    """Notifies the admin of a specific department without blocking the event loop."""
+    result = await _apost("/actions/notify_admin", {"department": department, "message": message}, "notify admin")
+    if "error" not in result:
+        logging.info("Notification sent to %s admin: %s", department, message)
+    return result
+
+# --- Blocking variants (for synchronous callers) ---
+
 def call_security(location: str):
     """Dispatches security to a given location."""
     try:
@@ -35,4 +94,4 @@ def notify_admin(department: str, message: str):
         return response.json()
     except requests.exceptions.RequestException as e:
         logging.error(f"Failed to notify admin: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
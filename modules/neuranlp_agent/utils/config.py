@@ -29,9 +29,77 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
 REFLEX_API_BASE_URL = os.getenv("REFLEX_API_BASE_URL", "http://localhost:8001/api")
 
+# --- LLM Backend Pool ---
+# Per-call timeouts; a backend that exceeds its timeout or errors fails over to the next
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+OLLAMA_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+# A backend slower than this on average is tried after faster healthy ones
+LLM_SLOW_AFTER_SECONDS = float(os.getenv("LLM_SLOW_AFTER_SECONDS", "10"))
+# Consecutive failures that open a backend's circuit, and the cool-down before a trial call
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# Also ask the local Ollama model when the primary has not answered after this long
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "4"))
+
+# --- Prompt Budget ---
+# Retrieved passages: per-passage and total token limits (near-duplicates are dropped first)
+PASSAGE_MAX_TOKENS = int(os.getenv("PASSAGE_MAX_TOKENS", "150"))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "600"))
+# ReAct scratchpad: the latest steps stay verbatim, earlier ones are compressed, the oldest dropped
+SCRATCHPAD_TOKEN_BUDGET = int(os.getenv("SCRATCHPAD_TOKEN_BUDGET", "1500"))
+SCRATCHPAD_KEEP_RECENT_STEPS = int(os.getenv("SCRATCHPAD_KEEP_RECENT_STEPS", "2"))
+# Hard caps on one agent run and on each completion
+AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "6"))
+AGENT_MAX_EXECUTION_SECONDS = float(os.getenv("AGENT_MAX_EXECUTION_SECONDS", "90"))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "2048"))
+
+# --- Startup ---
+# Build the agent in the background as soon as the server starts; otherwise the first query builds it
+AGENT_WARMUP_ON_STARTUP = os.getenv("AGENT_WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# --- Concurrency Configuration ---
+# Agent runs allowed at once; further queries wait in a bounded queue
+AGENT_MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "8"))
+AGENT_MAX_QUEUED = int(os.getenv("AGENT_MAX_QUEUED", "64"))
+AGENT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("AGENT_QUEUE_TIMEOUT_SECONDS", "30"))
+# Pooled HTTP client used by the agent's action tools
+REFLEX_HTTP_TIMEOUT_SECONDS = float(os.getenv("REFLEX_HTTP_TIMEOUT_SECONDS", "10"))
+REFLEX_HTTP_MAX_CONNECTIONS = int(os.getenv("REFLEX_HTTP_MAX_CONNECTIONS", "20"))
+
+# --- Semantic Response Cache ---
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # Cosine similarity
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(6 * 3600)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+
+# --- Intent Router (fast paths in front of the agent) ---
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+INTENT_FAQ_THRESHOLD = float(os.getenv("INTENT_FAQ_THRESHOLD", "0.55"))  # Minimum similarity to the FAQ centroid
+INTENT_MARGIN = float(os.getenv("INTENT_MARGIN", "0.05"))                # ...and lead over the next intent
+
 # --- Voice and Memory Configuration ---
-# TTS_ENGINE was replaced by gTTS, but we can leave the config for future flexibility.
+# Text-to-speech engine: gtts (online), piper or espeak (both offline)
 TTS_ENGINE = os.getenv("TTS_ENGINE", "gTTS") 
+TTS_FALLBACK_ENGINE = os.getenv("TTS_FALLBACK_ENGINE", "espeak")   # Used if TTS_ENGINE fails; empty for none
+PIPER_MODEL_PATH = os.getenv("PIPER_MODEL_PATH")                   # e.g. .../en_US-lessac-medium.onnx
+# Synthesized audio is cached on disk by a hash of the voice and text
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(AGENT_ROOT_DIR, "memory", "tts_cache"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "200"))
+# Threads that decode voice uploads
+VOICE_WORKERS = int(os.getenv("VOICE_WORKERS", "2"))
+# Whisper: model size (tiny/base/small/...), CPU precision (fp32 or int8) and warm replicas
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+WHISPER_PRECISION = os.getenv("WHISPER_PRECISION", "fp32")
+WHISPER_REPLICAS = int(os.getenv("WHISPER_REPLICAS", "1"))
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE") or None   # None: detect per clip
+WHISPER_PRELOAD = os.getenv("WHISPER_PRELOAD", "true").lower() == "true"
+# Concurrent clips are decoded together: up to WHISPER_MAX_BATCH arriving within the window
+WHISPER_MAX_BATCH = int(os.getenv("WHISPER_MAX_BATCH", "8"))
+WHISPER_BATCH_WINDOW_MS = float(os.getenv("WHISPER_BATCH_WINDOW_MS", "30"))
+WHISPER_MAX_QUEUED = int(os.getenv("WHISPER_MAX_QUEUED", "32"))
 VECTOR_DB_PATH = os.path.join(AGENT_ROOT_DIR, "memory", "vectordb")
 
 # Correct, robust paths to the documents
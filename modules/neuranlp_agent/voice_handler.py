@@ -1,46 +1,39 @@
-import whisper
-from pydub import AudioSegment
-import os
 import base64
-from gtts import gTTS
-import io
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+from .audio import decode_audio
+from .transcription import transcription_service
+from .tts import build_synthesizer
+from .utils import config
 
 class VoiceHandler:
     """A class to handle both Speech-to-Text and Text-to-Speech operations."""
     def __init__(self):
-        print("Initializing VoiceHandler and loading Whisper model...")
-        # Whisper model is loaded only when this class is created
-        self.whisper_model = whisper.load_model("base")
-        print("Whisper model loaded.")
+        # Decoding is CPU-bound (ffmpeg or NumPy); it runs here, off the event loop.
+        # Whisper itself runs in the warm, batching transcription service.
+        self.executor = ThreadPoolExecutor(max_workers=config.VOICE_WORKERS, thread_name_prefix="voice")
+        self.transcriber = transcription_service
+        self.synthesizer = build_synthesizer()
 
-    def voice_to_text(self, audio_file_path: str) -> str:
-        """Converts voice input from an audio file to text using Whisper."""
-        try:
-            sound = AudioSegment.from_file(audio_file_path)
-            wav_path = "temp_audio.wav"
-            sound.export(wav_path, format="wav")
-            result = self.whisper_model.transcribe(wav_path)
-            
-            if os.path.exists(wav_path):
-                os.remove(wav_path)
-                
-            return result.get("text", "")
-        except Exception as e:
-            print(f"Error in voice_to_text: {e}")
-            return ""
+    async def atranscribe(self, audio: bytes) -> str:
+        """Converts an uploaded audio clip to text using Whisper, without touching the disk."""
+        samples = await asyncio.get_running_loop().run_in_executor(self.executor, decode_audio, audio)
+        return await self.transcriber.transcribe(samples)
 
-    def text_to_voice(self, text: str) -> str:
-        """Converts text response to speech using gTTS and returns base64 encoded audio."""
+    def text_to_voice(self, text: str) -> Tuple[str, str]:
+        """
+        Converts a text response to speech. Returns (base64 audio, mime type), or
+        ("", "") if no engine could speak it. Repeated texts come from the cache.
+        """
         try:
-            tts = gTTS(text=text, lang='en')
-            fp = io.BytesIO()
-            tts.write_to_fp(fp)
-            fp.seek(0)
-            encoded_string = base64.b64encode(fp.read()).decode('utf-8')
-            return encoded_string
+            audio, mime = self.synthesizer.synthesize(text)
+            return base64.b64encode(audio).decode('utf-8'), mime
         except Exception as e:
-            print(f"Error in text_to_voice: {e}")
-            return ""
+            logging.error("Error in text_to_voice: %s", e)
+            return "", ""
 
 # --- The Singleton Pattern ---
 # This ensures that the heavy VoiceHandler is created only once, and only when first needed.
@@ -51,4 +44,4 @@ def get_voice_handler():
     global _voice_handler_instance
     if _voice_handler_instance is None:
         _voice_handler_instance = VoiceHandler()
-    return _voice_handler_instance
\ No newline at end of file
+    return _voice_handler_instance
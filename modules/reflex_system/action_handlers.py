@@ -1,59 +1,121 @@
 # File: modules/reflex_system/action_handlers.py
 
 import datetime
+from typing import List, NamedTuple, Optional, Tuple
 from .utils.logger import logger
 from .event_publisher import publisher
+from .audit_log import audit_log
+from .dedup import action_fingerprint, recent_actions, idempotent_actions
 
 # --- MODIFICATION 1 of 1: Import the new unified memory core ---
 from memorycore.memory_manager import get_memory_core
 
 
-SYSTEM_LOG_FILE = "system_action_log.txt"
+class PreparedAction(NamedTuple):
+    """What one action writes to MemoryCore and Redis, and what the caller gets back."""
+    memory_type: str
+    memory_details: dict
+    event_type: str
+    event_payload: dict
+    response: dict
+
 
 def _log_system_action(log_message: str):
-    """Appends a timestamped log message to a system-wide log file."""
-    timestamp = datetime.datetime.now().isoformat()
-    with open(SYSTEM_LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"{timestamp} - {log_message}\n")
+    """Queues a timestamped log message for the system-wide audit log (written in the background)."""
+    audit_log.record(log_message)
 
-async def handle_security_call(location: str) -> dict:
-    """Handles security dispatch, logs action, publishes event, and records to structured MemoryCore."""
-    logger.info(f"ACTION: Security dispatch initiated for location: '{location}'.")
+def _prepare_security_call(location: str) -> PreparedAction:
+    logger.info("ACTION: Security dispatch initiated for location: '%s'.", location)
     _log_system_action(f"[HIGH-PRIORITY SECURITY ALERT] Dispatched to: {location}")
+    return PreparedAction(
+        memory_type="security_alert",
+        memory_details={"location": location, "status": "dispatched"},
+        event_type="SECURITY_ALERT",
+        event_payload={"location": location, "timestamp": datetime.datetime.now().isoformat()},
+        response={"status": "success", "message": "Security team dispatched and event recorded."}
+    )
 
-    # --- ADDED: Record this critical action to the centralized structured memory ---
-    event_details = {"location": location, "status": "dispatched"}
-    get_memory_core().structured.add("reflex_system", "security_alert", event_details)
+def _prepare_announcement(message: str) -> PreparedAction:
+    logger.info("ACTION: Campus announcement being broadcasted: '%s'.", message)
+    _log_system_action(f"[CAMPUS ANNOUNCEMENT] Broadcasted: {message}")
+    return PreparedAction(
+        memory_type="announcement",
+        memory_details={"message_snippet": f"{message[:75]}..."},
+        event_type="CAMPUS_ANNOUNCEMENT",
+        event_payload={"message": message, "timestamp": datetime.datetime.now().isoformat()},
+        response={"status": "success", "message": "Announcement broadcasted and event recorded."}
+    )
 
-    event_payload = {"location": location, "timestamp": datetime.datetime.now().isoformat()}
-    await publisher.publish_event(event_type="SECURITY_ALERT", payload=event_payload)
-    
-    return {"status": "success", "message": "Security team dispatched and event recorded."}
+def _prepare_admin_notification(department: str, message: str) -> PreparedAction:
+    logger.info("ACTION: Notifying admin of '%s' department with message: '%s'.", department, message)
+    _log_system_action(f"[DEPT NOTIFICATION] Sent to {department}: {message}")
+    return PreparedAction(
+        memory_type="admin_notification",
+        memory_details={"department": department, "message_snippet": f"{message[:75]}..."},
+        event_type="ADMIN_NOTIFICATION",
+        event_payload={"department": department, "message": message, "timestamp": datetime.datetime.now().isoformat()},
+        response={"status": "success", "message": "Notification sent and event recorded."}
+    )
 
-async def handle_announcement(message: str) -> dict:
-    """Handles announcement, logs action, publishes event, and records to structured MemoryCore."""
-    logger.info(f"ACTION: Campus announcement being broadcasted: '{message}'.")
-    _log_system_action(f"[CAMPUS ANNOUNCEMENT] Broadcasted: {message}")
+_PREPARERS = {
+    "call_security": _prepare_security_call,
+    "send_announcement": _prepare_announcement,
+    "notify_admin": _prepare_admin_notification,
+}
 
-    # --- ADDED: Record this action to the centralized structured memory ---
-    event_details = {"message_snippet": f"{message[:75]}..."}
-    get_memory_core().structured.add("reflex_system", "announcement", event_details)
+async def _dispatch(prepared: List[PreparedAction]):
+    """Records the actions in MemoryCore in one transaction and publishes them in one round trip."""
+    get_memory_core().structured.add_many(
+        "reflex_system", [(action.memory_type, action.memory_details) for action in prepared]
+    )
+    await publisher.publish_many([(action.event_type, action.event_payload) for action in prepared])
 
-    event_payload = {"message": message, "timestamp": datetime.datetime.now().isoformat()}
-    await publisher.publish_event(event_type="CAMPUS_ANNOUNCEMENT", payload=event_payload)
+async def execute_actions(actions: List[Tuple[str, dict, Optional[str]]]) -> List[dict]:
+    """
+    Executes (action, fields, idempotency_key) requests, coalescing duplicates.
 
-    return {"status": "success", "message": "Announcement broadcasted and event recorded."}
+    An action with an idempotency key that was already seen, or a keyless
+    action identical to one handled within the dedup window, is not executed
+    again: it gets the original outcome plus a duplicate count. All remaining
+    actions are recorded and published together. Raises IdempotencyConflict
+    if a key is reused for a different action.
+    """
+    claims, fresh = [], []
+    try:
+        for action, fields, idempotency_key in actions:
+            fingerprint = action_fingerprint(action, fields)
+            coalescer, key = (idempotent_actions, idempotency_key) if idempotency_key else (recent_actions, fingerprint)
+            entry, is_duplicate = coalescer.claim(key, fingerprint)
+            claims.append((action, entry, is_duplicate))
+            if not is_duplicate:
+                fresh.append((coalescer, key, entry, action, fields))
 
-async def handle_admin_notification(department: str, message: str) -> dict:
-    """Handles admin notification, logs action, publishes event, and records to structured MemoryCore."""
-    logger.info(f"ACTION: Notifying admin of '{department}' department with message: '{message}'.")
-    _log_system_action(f"[DEPT NOTIFICATION] Sent to {department}: {message}")
-    
-    # --- ADDED: Record this action to the centralized structured memory ---
-    event_details = {"department": department, "message_snippet": f"{message[:75]}..."}
-    get_memory_core().structured.add("reflex_system", "admin_notification", event_details)
+        prepared = [_PREPARERS[action](**fields) for _, _, _, action, fields in fresh]
+        if prepared:
+            await _dispatch(prepared)
+    except BaseException as e:
+        # Release the claims so that a retry is executed rather than coalesced into the failure
+        for coalescer, key, entry, _, _ in fresh:
+            coalescer.fail(key, entry, e)
+        raise
+
+    for (coalescer, _, entry, _, _), prepared_action in zip(fresh, prepared):
+        coalescer.complete(entry, prepared_action.response)
 
-    event_payload = {"department": department, "message": message, "timestamp": datetime.datetime.now().isoformat()}
-    await publisher.publish_event(event_type="ADMIN_NOTIFICATION", payload=event_payload)
+    results = []
+    for action, entry, is_duplicate in claims:
+        response = await entry.wait()
+        results.append({**response, "action": action, "deduplicated": is_duplicate, "duplicate_count": entry.duplicates})
+    return results
+
+async def handle_security_call(location: str, idempotency_key: Optional[str] = None) -> dict:
+    """Handles security dispatch, logs action, publishes event, and records to structured MemoryCore."""
+    return (await execute_actions([("call_security", {"location": location}, idempotency_key)]))[0]
 
-    return {"status": "success", "message": "Notification sent and event recorded."}
\ No newline at end of file
+async def handle_announcement(message: str, idempotency_key: Optional[str] = None) -> dict:
+    """Handles announcement, logs action, publishes event, and records to structured MemoryCore."""
+    return (await execute_actions([("send_announcement", {"message": message}, idempotency_key)]))[0]
+
+async def handle_admin_notification(department: str, message: str, idempotency_key: Optional[str] = None) -> dict:
+    """Handles admin notification, logs action, publishes event, and records to structured MemoryCore."""
+    return (await execute_actions([("notify_admin", {"department": department, "message": message}, idempotency_key)]))[0]
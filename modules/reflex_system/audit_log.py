@@ -0,0 +1,149 @@
+# File: modules/reflex_system/audit_log.py
+
+import asyncio
+import datetime
+import glob
+import gzip
+import os
+import shutil
+import threading
+import time
+from typing import List, Optional
+from .utils.logger import logger
+
+SYSTEM_LOG_FILE = "system_action_log.txt"
+AUDIT_QUEUE_SIZE = 10_000
+AUDIT_BATCH_SIZE = 500                      # Max lines written per batch
+AUDIT_ROTATE_MAX_BYTES = 5 * 1024 * 1024    # Rotate once the live file reaches this size...
+AUDIT_ROTATE_INTERVAL_SECONDS = 24 * 3600   # ...or this age (None disables time-based rotation)
+AUDIT_COMPRESS_ARCHIVES = True
+AUDIT_MAX_ARCHIVES = 30
+
+class AuditLogWriter:
+    """
+    Writes the human-readable action audit log from a background task.
+
+    Handlers only enqueue a line. The writer drains whatever has accumulated,
+    appends it in one write from a worker thread and rotates the file by size
+    or age, optionally gzip-compressing the archives.
+    """
+    def __init__(self, path: str = SYSTEM_LOG_FILE, max_bytes: int = AUDIT_ROTATE_MAX_BYTES,
+                 rotate_interval_seconds: Optional[float] = AUDIT_ROTATE_INTERVAL_SECONDS,
+                 compress: bool = AUDIT_COMPRESS_ARCHIVES, max_archives: int = AUDIT_MAX_ARCHIVES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval_seconds = rotate_interval_seconds
+        self.compress = compress
+        self.max_archives = max_archives
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._opened_at = 0.0
+        self._write_lock = threading.Lock()
+
+    # --- Producer side ---
+
+    def record(self, message: str):
+        """Enqueues one timestamped audit line. Never waits for disk I/O while the writer runs."""
+        line = f"{datetime.datetime.now().isoformat()} - {message}\n"
+        if self._task is None or self._task.done():
+            # No background writer (e.g. scripts and tests): write directly
+            self._write_lines([line])
+            return
+        try:
+            self._queue.put_nowait(line)
+        except asyncio.QueueFull:
+            # Never drop audit records: under extreme backlog, fall back to a direct write
+            self._write_lines([line])
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the background writer task."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Audit log writer started for '{self.path}'.")
+
+    async def stop(self):
+        """Stops the writer after flushing every queued line."""
+        if self._task and not self._task.done():
+            # Not cancelled: a cancelled task would also cancel a batch still waiting for a worker thread
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+        if self._queue is not None:
+            remaining = [line for line in self._drain(limit=None) if line is not None]
+            if remaining:
+                await asyncio.to_thread(self._write_lines, remaining)
+        await asyncio.to_thread(self._close)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Everything queued while the previous batch was being written goes out together
+            batch.extend(self._drain(limit=AUDIT_BATCH_SIZE - 1))
+            stopping = batch[-1] is None
+            lines = [line for line in batch if line is not None]
+            if lines:
+                try:
+                    await asyncio.to_thread(self._write_lines, lines)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(lines)} audit log line(s): {e}")
+            if stopping:
+                return
+
+    def _drain(self, limit: Optional[int]) -> List[str]:
+        lines = []
+        while not self._queue.empty() and (limit is None or len(lines) < limit):
+            lines.append(self._queue.get_nowait())
+        return lines
+
+    # --- File handling (runs in a worker thread) ---
+
+    def _write_lines(self, lines: List[str]):
+        with self._write_lock:
+            if self._file is None:
+                self._open()
+            elif self._should_rotate():
+                self._rotate()
+            self._file.write("".join(lines))
+            self._file.flush()
+            if self._should_rotate():
+                self._rotate()
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _close(self):
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _should_rotate(self) -> bool:
+        if self._file.tell() >= self.max_bytes:
+            return True
+        return self.rotate_interval_seconds is not None and time.time() - self._opened_at >= self.rotate_interval_seconds
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if os.path.getsize(self.path) > 0:
+            base, ext = os.path.splitext(self.path)
+            archive = f"{base}.{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{ext}"
+            os.replace(self.path, archive)
+            if self.compress:
+                with open(archive, "rb") as src, gzip.open(f"{archive}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(archive)
+            self._prune_archives(base, ext)
+        self._open()
+
+    def _prune_archives(self, base: str, ext: str):
+        archives = sorted(glob.glob(f"{glob.escape(base)}.*{ext}*"))
+        for old_archive in archives[:-self.max_archives] if self.max_archives else []:
+            os.remove(old_archive)
+
+audit_log = AuditLogWriter()
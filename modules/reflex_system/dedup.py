@@ -0,0 +1,110 @@
+# File: modules/reflex_system/dedup.py
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+from .utils.logger import logger
+
+DEDUP_WINDOW_SECONDS = 30              # Identical keyless actions within this window run once
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600    # How long a client-supplied Idempotency-Key is remembered
+MAX_TRACKED_ACTIONS = 10_000
+
+def action_fingerprint(action: str, fields: dict) -> Tuple[str, str]:
+    """A stable identity for an action and its payload, independent of field order."""
+    return action, json.dumps(fields, sort_keys=True, default=str)
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused for a different action or payload."""
+
+
+class CoalescedAction:
+    """The first execution of an action, shared with every duplicate of it."""
+    __slots__ = ("fingerprint", "future", "result", "expires_at", "duplicates")
+
+    def __init__(self, fingerprint: Hashable, ttl_seconds: float):
+        self.fingerprint = fingerprint
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.result: Optional[dict] = None
+        self.expires_at = time.monotonic() + ttl_seconds
+        self.duplicates = 0
+
+    async def wait(self) -> dict:
+        if self.result is not None:
+            return self.result
+        return await asyncio.shield(self.future)
+
+
+class ActionCoalescer:
+    """
+    Remembers recent actions by key so that a repeat within the TTL is answered
+    with the original outcome instead of being executed again.
+
+    A duplicate that arrives while the first execution is still in flight
+    awaits the same future. Failed executions are forgotten so they can be
+    retried.
+    """
+    def __init__(self, ttl_seconds: float, max_entries: int = MAX_TRACKED_ACTIONS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CoalescedAction]" = OrderedDict()
+        self.coalesced_total = 0
+
+    def claim(self, key: Hashable, fingerprint: Hashable = None) -> Tuple[CoalescedAction, bool]:
+        """
+        Returns (entry, is_duplicate). When is_duplicate is False the caller owns
+        the entry and must call complete() or fail() on it.
+        """
+        self._prune()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyConflict(f"Key '{key}' was already used for a different action.")
+            entry.duplicates += 1
+            self.coalesced_total += 1
+            return entry, True
+
+        entry = CoalescedAction(fingerprint, self.ttl_seconds)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._evict(*self._entries.popitem(last=False))
+        return entry, False
+
+    def complete(self, entry: CoalescedAction, result: dict):
+        entry.result = result
+        if not entry.future.done():
+            entry.future.set_result(result)
+
+    def fail(self, key: Hashable, entry: CoalescedAction, error: BaseException):
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        if entry.future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            entry.future.cancel()
+        else:
+            entry.future.set_exception(error)
+            # Mark the exception retrieved so an un-awaited future does not warn
+            entry.future.exception()
+
+    def _prune(self):
+        # Entries share one TTL, so insertion order is also expiry order
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now or entry.result is None:
+                break
+            self._evict(*self._entries.popitem(last=False))
+
+    def _evict(self, key: Hashable, entry: CoalescedAction):
+        if entry.duplicates:
+            logger.info(f"Coalesced {entry.duplicates} duplicate(s) of action {key} into one dispatch.")
+
+    def clear(self):
+        self._entries.clear()
+
+# Keyless actions are coalesced by content; client keys are remembered for longer
+recent_actions = ActionCoalescer(DEDUP_WINDOW_SECONDS)
+idempotent_actions = ActionCoalescer(IDEMPOTENCY_TTL_SECONDS)
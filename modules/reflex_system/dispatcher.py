@@ -0,0 +1,226 @@
+# File: modules/reflex_system/dispatcher.py
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from .utils.logger import logger
+from .action_handlers import execute_actions
+from observability.metrics import percentile
+
+# --- Priority Lanes (highest first) ---
+LANES = ("security", "announcement", "notification")
+ACTION_LANES = {
+    "call_security": "security",
+    "send_announcement": "announcement",
+    "notify_admin": "notification",
+}
+LANE_QUEUE_SIZES = {"security": 1000, "announcement": 200, "notification": 200}
+
+DISPATCHER_WORKERS = int(os.getenv("REFLEX_DISPATCHER_WORKERS", "4"))
+# Workers that only ever take security jobs, so a backlog of slow lower-priority
+# work can never occupy every worker when an emergency arrives.
+SECURITY_RESERVED_WORKERS = 1
+DISPATCH_BATCH_SIZE = 20     # Queued jobs of one lane a worker executes together
+STOP_TIMEOUT_SECONDS = 10
+RETRY_AFTER_SECONDS = 1      # Suggested back-off for callers rejected by a full lane
+
+ActionRequest = Tuple[str, dict, Optional[str]]
+
+
+class LaneFull(Exception):
+    """A lane's queue is at capacity; the caller should retry later."""
+    def __init__(self, lane: str):
+        super().__init__(f"The '{lane}' action queue is full.")
+        self.lane = lane
+
+
+class LaneStats:
+    """Queue-wait and end-to-end latency plus outcome counters for one lane."""
+    def __init__(self, window: int = 1000):
+        self.wait_ms: deque = deque(maxlen=window)
+        self.total_ms: deque = deque(maxlen=window)
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def record(self, wait_seconds: float, total_seconds: float):
+        self.wait_ms.append(wait_seconds * 1000)
+        self.total_ms.append(total_seconds * 1000)
+        self.completed += 1
+
+    def snapshot(self, depth: int) -> dict:
+        wait_ms, total_ms = sorted(self.wait_ms), sorted(self.total_ms)
+        return {
+            "depth": depth,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_wait_ms_p50": percentile(wait_ms, 0.50, default=0.0),
+            "queue_wait_ms_p95": percentile(wait_ms, 0.95, default=0.0),
+            "latency_ms_p50": percentile(total_ms, 0.50, default=0.0),
+            "latency_ms_p95": percentile(total_ms, 0.95, default=0.0),
+        }
+
+
+class DispatchJob:
+    __slots__ = ("requests", "future", "enqueued_at")
+
+    def __init__(self, requests: List[ActionRequest]):
+        self.requests = requests
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ActionDispatcher:
+    """
+    Runs reflex actions on a fixed pool of workers fed by bounded priority lanes.
+
+    A free worker always takes the highest-priority lane with queued work, and
+    some workers serve only the security lane. A full lane rejects new work
+    (LaneFull) instead of letting latency grow without bound. Until start() is
+    called, submitted jobs run inline in the caller.
+    """
+    def __init__(self, execute: Callable[[List[ActionRequest]], Awaitable[List[dict]]],
+                 workers: int = DISPATCHER_WORKERS, reserved_security_workers: int = SECURITY_RESERVED_WORKERS,
+                 queue_sizes: Dict[str, int] = LANE_QUEUE_SIZES):
+        self.execute = execute
+        self.workers = max(1, workers)
+        self.reserved_security_workers = min(reserved_security_workers, self.workers - 1)
+        self.queue_sizes = queue_sizes
+        self.queues: Dict[str, deque] = {lane: deque() for lane in LANES}
+        self.stats: Dict[str, LaneStats] = {lane: LaneStats() for lane in LANES}
+        self._condition: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def lane_for(self, requests: List[ActionRequest]) -> str:
+        """A job runs in the lane of its most urgent action."""
+        return min((ACTION_LANES[action] for action, _, _ in requests), key=LANES.index)
+
+    async def submit(self, requests: List[ActionRequest]) -> asyncio.Future:
+        """
+        Queues a job and returns a future for its per-action results.
+        Raises LaneFull if the job's lane is at capacity.
+        """
+        lane = self.lane_for(requests)
+        stats = self.stats[lane]
+        if not self.running:
+            future = asyncio.get_running_loop().create_future()
+            started = time.perf_counter()
+            try:
+                future.set_result(await self.execute(requests))
+                stats.record(0.0, time.perf_counter() - started)
+            except Exception as e:
+                stats.failed += 1
+                future.set_exception(e)
+            return future
+
+        if len(self.queues[lane]) >= self.queue_sizes[lane]:
+            stats.rejected += 1
+            raise LaneFull(lane)
+        job = DispatchJob(requests)
+        stats.accepted += 1
+        async with self._condition:
+            self.queues[lane].append(job)
+            # Wake every worker: the first one woken may serve only another lane
+            self._condition.notify_all()
+        return job.future
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the worker pool."""
+        if self.running:
+            return
+        self._stopping = False
+        self._condition = asyncio.Condition()
+        for index in range(self.workers):
+            lanes = ("security",) if index < self.reserved_security_workers else LANES
+            self._tasks.append(asyncio.create_task(self._worker(lanes)))
+        logger.info(f"Action dispatcher started with {self.workers} worker(s) "
+                    f"({self.reserved_security_workers} reserved for security).")
+
+    async def stop(self):
+        """Lets the workers finish the queued jobs, then stops them."""
+        if not self.running:
+            return
+        async with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        _, pending = await asyncio.wait(self._tasks, timeout=STOP_TIMEOUT_SECONDS)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self.queues.values():
+            while queue:
+                job = queue.popleft()
+                if not job.future.done():
+                    job.future.cancel()
+
+    # --- Workers ---
+
+    def _next_lane(self, lanes: Tuple[str, ...]) -> Optional[str]:
+        for lane in lanes:
+            if self.queues[lane]:
+                return lane
+        return None
+
+    async def _worker(self, lanes: Tuple[str, ...]):
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._stopping or self._next_lane(lanes) is not None)
+                lane = self._next_lane(lanes)
+                if lane is None:
+                    return
+                queue = self.queues[lane]
+                jobs = [queue.popleft() for _ in range(min(DISPATCH_BATCH_SIZE, len(queue)))]
+            await self._run_jobs(lane, jobs)
+
+    async def _run_jobs(self, lane: str, jobs: List[DispatchJob]):
+        """Executes several queued jobs of one lane as a single batch."""
+        started = time.perf_counter()
+        stats = self.stats[lane]
+        try:
+            results = await self.execute([request for job in jobs for request in job.requests])
+        except Exception as e:
+            if len(jobs) > 1:
+                # One bad job (e.g. a conflicting idempotency key) must not fail the jobs batched with it
+                for job in jobs:
+                    await self._run_jobs(lane, [job])
+                return
+            logger.error(f"Dispatch of a '{lane}' job failed: {e}")
+            stats.failed += 1
+            job = jobs[0]
+            if not job.future.done():
+                job.future.set_exception(e)
+                # Acknowledged (202) jobs are never awaited; do not warn about an unretrieved exception
+                job.future.exception()
+            return
+
+        finished = time.perf_counter()
+        offset = 0
+        for job in jobs:
+            job_results = results[offset:offset + len(job.requests)]
+            offset += len(job.requests)
+            stats.record(started - job.enqueued_at, finished - job.enqueued_at)
+            if not job.future.done():
+                job.future.set_result(job_results)
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "reserved_security_workers": self.reserved_security_workers,
+            "lanes": {lane: self.stats[lane].snapshot(len(self.queues[lane])) for lane in LANES},
+        }
+
+dispatcher = ActionDispatcher(execute_actions)
@@ -1,23 +1,85 @@
 # File: modules/reflex_system/event_publisher.py
 
 import redis.asyncio as redis
+import asyncio
 import json
+import os
+import time
+from collections import deque
+from typing import Callable, List, Tuple
 from .utils.logger import logger
+from observability.metrics import counter, histogram, percentile
 
 REDIS_HOST = "localhost"
 REDIS_PORT = 6379
 EVENT_CHANNEL = "campus_notifications"
+POOL_MAX_CONNECTIONS = 20
+HEARTBEAT_INTERVAL_SECONDS = 10
+
+# --- Event Transport ---
+# "pubsub": fire-and-forget PUBLISH on EVENT_CHANNEL (default).
+# "streams": durable XADD to EVENT_STREAM, read by consumers through a consumer group.
+# Must match the setting used by insightcloud, hence an environment variable.
+EVENT_TRANSPORT = os.getenv("NEURACITY_EVENT_TRANSPORT", "pubsub")
+EVENT_STREAM = "campus_events"
+STREAM_MAXLEN = 100_000                # Approximate number of entries kept (XADD MAXLEN ~)
+STREAM_BATCH_SIZE = 100                # A batch is flushed as soon as it has this many events...
+STREAM_FLUSH_INTERVAL_SECONDS = 0.005  # ...or after this delay, whichever comes first
+
+REDIS_PUBLISH_SECONDS = histogram(
+    "neuracity_redis_publish_seconds", "Latency of one pipelined Redis publish round trip.", ["command"]
+)
+REDIS_PUBLISHED_EVENTS = counter("neuracity_redis_published_events_total", "Events written to Redis.", ["command"])
+REDIS_PUBLISH_FAILURES = counter("neuracity_redis_publish_failures_total", "Redis publish round trips that failed.", ["command"])
+
+class PublishStats:
+    """Rolling latency and outcome counters for Redis publish round trips."""
+    def __init__(self, window: int = 1000):
+        self.latencies_ms: deque = deque(maxlen=window)
+        self.round_trips = 0
+        self.events_published = 0
+        self.failures = 0
+
+    def record(self, seconds: float, event_count: int):
+        self.latencies_ms.append(seconds * 1000)
+        self.round_trips += 1
+        self.events_published += event_count
+
+    def record_failure(self):
+        self.failures += 1
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self.latencies_ms)
+        return {
+            "round_trips": self.round_trips,
+            "events_published": self.events_published,
+            "failures": self.failures,
+            "latency_ms_p50": percentile(latencies, 0.50, default=0.0),
+            "latency_ms_p95": percentile(latencies, 0.95, default=0.0),
+            "latency_ms_max": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
 
 class EventPublisher:
     _instance = None
     _redis_client = None
+    _connection_pool = None
+    _heartbeat_task = None
+    healthy: bool = False
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(EventPublisher, cls).__new__(cls)
+            instance = cls._instance = super(EventPublisher, cls).__new__(cls)
+            instance.stats = PublishStats()
+            # Pending XADDs of the streams transport and the task that flushes them
+            instance._stream_buffer: list = []
+            instance._stream_flush_task = None
             try:
-                # Add a health check to be more explicit about connection status
-                cls._redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, auto_close_connection_pool=False)
+                # One shared pool for every publish; redis-py re-establishes dropped connections on demand
+                cls._connection_pool = redis.ConnectionPool(
+                    host=REDIS_HOST, port=REDIS_PORT, max_connections=POOL_MAX_CONNECTIONS
+                )
+                cls._redis_client = redis.Redis(connection_pool=cls._connection_pool)
                 logger.info(f"Redis client initialized for {REDIS_HOST}:{REDIS_PORT}")
             except Exception as e:
                 logger.error(f"FATAL: Could not create Redis client: {e}")
@@ -30,28 +92,134 @@ class EventPublisher:
             return False
         try:
             await self._redis_client.ping()
-            logger.info("Redis connection is active.")
             return True
         except Exception as e:
             logger.error(f"Redis connection check failed: {e}")
             return False
 
+    # --- Passive health tracking ---
+
+    def start_heartbeat(self):
+        """Starts the background task that refreshes the health flag between publishes."""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop_heartbeat(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+
+    async def _heartbeat_loop(self):
+        while True:
+            was_healthy = self.healthy
+            self.healthy = await self.check_connection()
+            if self.healthy != was_healthy:
+                logger.info(f"Redis connection is {'active' if self.healthy else 'down'}.")
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+
+    async def _run_pipeline(self, queue_commands: Callable, command: str = "publish") -> list:
+        """
+        Runs the queued commands in one pipelined round trip. If the connection
+        dropped, the pool is reset and the pipeline is retried once.
+        """
+        for attempt in (1, 2):
+            try:
+                started = time.perf_counter()
+                async with self._redis_client.pipeline(transaction=False) as pipe:
+                    command_count = queue_commands(pipe)
+                    results = await pipe.execute()
+                elapsed = time.perf_counter() - started
+                self.stats.record(elapsed, command_count)
+                REDIS_PUBLISH_SECONDS.labels(command=command).observe(elapsed)
+                REDIS_PUBLISHED_EVENTS.labels(command=command).inc(command_count)
+                self.healthy = True
+                return results
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                self.healthy = False
+                if attempt == 2:
+                    REDIS_PUBLISH_FAILURES.labels(command=command).inc()
+                    raise
+                logger.warning(f"Redis connection lost ({e}); reconnecting and retrying once.")
+                await self._connection_pool.disconnect()
+
+    # --- Publishing ---
+
     async def publish_event(self, event_type: str, payload: dict):
-        """Publishes a structured event to the central Redis channel."""
-        if not await self.check_connection():
-            logger.error("Cannot publish event: Redis connection is not active.")
+        """Publishes a structured event to the central Redis channel (or stream)."""
+        await self.publish_many([(event_type, payload)])
+
+    async def publish_many(self, events: List[Tuple[str, dict]]):
+        """Publishes several (event_type, payload) events in a single pipelined round trip."""
+        if not self._redis_client:
+            logger.error("Cannot publish event: Redis client is not available.")
             return
 
-        event_message = {
-            "event_type": event_type,
-            "payload": payload
-        }
+        event_messages = [{"event_type": event_type, "payload": payload} for event_type, payload in events]
+        if EVENT_TRANSPORT == "streams":
+            await asyncio.gather(*[self._append_to_stream(message) for message in event_messages])
+            return
+
+        def queue_publishes(pipe) -> int:
+            for message in event_messages:
+                pipe.publish(EVENT_CHANNEL, json.dumps(message))
+            return len(event_messages)
+
         try:
-            message_json = json.dumps(event_message)
-            # The publish command returns the number of clients that received the message.
-            num_clients = await self._redis_client.publish(EVENT_CHANNEL, message_json)
-            logger.info(f"Published event '{event_type}' to '{EVENT_CHANNEL}'. Message received by {num_clients} client(s).")
+            # Each PUBLISH returns the number of clients that received the message.
+            receivers = await self._run_pipeline(queue_publishes)
+            for message, num_clients in zip(event_messages, receivers):
+                logger.info("Published event '%s' to '%s'. Message received by %s client(s).",
+                            message['event_type'], EVENT_CHANNEL, num_clients)
         except Exception as e:
+            self.stats.record_failure()
             logger.error(f"Failed to publish event to Redis: {e}")
 
-publisher = EventPublisher()
\ No newline at end of file
+    # --- Redis Streams transport ---
+
+    async def _append_to_stream(self, event_message: dict):
+        """
+        Queues an XADD and waits until it has been written. Events published
+        concurrently within one flush interval share a single pipeline round trip.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._stream_buffer.append((event_message, future))
+        if len(self._stream_buffer) >= STREAM_BATCH_SIZE:
+            await self._flush_stream_buffer()
+        elif self._stream_flush_task is None:
+            self._stream_flush_task = asyncio.create_task(self._flush_stream_after_delay())
+        await future
+
+    async def _flush_stream_after_delay(self):
+        await asyncio.sleep(STREAM_FLUSH_INTERVAL_SECONDS)
+        self._stream_flush_task = None
+        await self._flush_stream_buffer()
+
+    async def _flush_stream_buffer(self):
+        batch, self._stream_buffer = self._stream_buffer, []
+        if not batch:
+            return
+
+        def queue_xadds(pipe) -> int:
+            for event_message, _ in batch:
+                pipe.xadd(
+                    EVENT_STREAM,
+                    {"event_type": event_message["event_type"], "data": json.dumps(event_message)},
+                    maxlen=STREAM_MAXLEN,
+                    approximate=True
+                )
+            return len(batch)
+
+        entry_ids = [None] * len(batch)
+        try:
+            entry_ids = await self._run_pipeline(queue_xadds, command="xadd")
+            logger.info("Appended %d event(s) to stream '%s' in one round trip.", len(batch), EVENT_STREAM)
+        except Exception as e:
+            self.stats.record_failure()
+            logger.error(f"Failed to append events to Redis stream: {e}")
+        finally:
+            for (_, future), entry_id in zip(batch, entry_ids):
+                if not future.done():
+                    future.set_result(entry_id)
+
+publisher = EventPublisher()
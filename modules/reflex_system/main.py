@@ -1,44 +1,156 @@
 # File: modules/reflex_system/main.py
 
-from fastapi import FastAPI, APIRouter
-from . import action_handlers
-from .models import LocationPayload, AnnouncementPayload, NotificationPayload
+from typing import Optional
+from fastapi import FastAPI, APIRouter, Header, HTTPException
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from . import event_publisher
+from .event_publisher import publisher
+from .audit_log import audit_log
+from .dedup import IdempotencyConflict, recent_actions, idempotent_actions
+from .dispatcher import dispatcher, LaneFull, RETRY_AFTER_SECONDS
+from .models import LocationPayload, AnnouncementPayload, NotificationPayload, ActionBatch
 from .utils.logger import logger
+from observability.http import instrument_app
+from observability.logs import configure_logging
+
+# Shared non-blocking, structured logging (see observability/logs.py)
+configure_logging("reflex_system")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Starts and stops the background services of the ReflexSystem."""
+    # Keeps the publisher's Redis health flag fresh without a PING before every publish
+    publisher.start_heartbeat()
+    # Handlers only enqueue audit lines; this task writes and rotates the file
+    audit_log.start()
+    # Actions run on a worker pool fed by priority lanes (security first)
+    dispatcher.start()
+    yield
+    await dispatcher.stop()
+    await audit_log.stop()
+    await publisher.stop_heartbeat()
 
 app = FastAPI(
     title="NeuraCity ReflexSystem",
     description="Handles real-world action triggers initiated by AI agents.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+# Request latency histograms and GET /metrics
+instrument_app(app)
 
 # Using an APIRouter is a best practice for modularity.
 # It allows us to version our API easily (e.g., /api/v1).
 router = APIRouter(prefix="/api")
 
+async def _submit(requests: list, wait: bool = True):
+    """
+    Hands actions to the dispatcher. Returns their results, or a 202 queued
+    acknowledgement if 'wait' is False and the job has not run yet.
+    """
+    try:
+        future = await dispatcher.submit(requests)
+    except LaneFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    if not wait and not future.done():
+        lane = dispatcher.lane_for(requests)
+        return JSONResponse(status_code=202, content={
+            "status": "queued", "lane": lane, "queue_depth": len(dispatcher.queues[lane])
+        })
+    try:
+        return await future
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+def _respond_async(prefer: Optional[str]) -> bool:
+    """Whether the caller opted into a 202 acknowledgement with 'Prefer: respond-async'."""
+    return prefer is not None and "respond-async" in prefer.lower()
+
 @router.post("/actions/call_security", status_code=200)
-async def call_security(payload: LocationPayload):
-    """Dispatches security and logs a high-priority incident."""
-    logger.info(f"Received API request to dispatch security to: {payload.location}")
-    return await action_handlers.handle_security_call(payload.location)
+async def call_security(payload: LocationPayload, idempotency_key: Optional[str] = Header(None)):
+    """Dispatches security and logs a high-priority incident. Answers once the dispatch is done."""
+    logger.info("Received API request to dispatch security to: %s", payload.location)
+    results = await _submit([("call_security", {"location": payload.location}, idempotency_key)])
+    return results[0]
 
 @router.post("/actions/send_announcement", status_code=200)
-async def send_announcement(payload: AnnouncementPayload):
-    """Broadcasts a message across campus systems."""
-    logger.info(f"Received API request to send announcement: {payload.message}")
-    return await action_handlers.handle_announcement(payload.message)
+async def send_announcement(payload: AnnouncementPayload, idempotency_key: Optional[str] = Header(None),
+                            prefer: Optional[str] = Header(None)):
+    """
+    Broadcasts a message across campus systems. Answers once the announcement
+    is sent, or 202 as soon as it is queued with 'Prefer: respond-async'.
+    """
+    logger.info("Received API request to send announcement: %s", payload.message)
+    results = await _submit([("send_announcement", {"message": payload.message}, idempotency_key)],
+                            wait=not _respond_async(prefer))
+    return results if isinstance(results, JSONResponse) else results[0]
 
 @router.post("/actions/notify_admin", status_code=200)
-async def notify_admin(payload: NotificationPayload):
-    """Sends a message to a specific department head or service desk."""
-    logger.info(f"Received API request to notify '{payload.department}' admin.")
-    return await action_handlers.handle_admin_notification(payload.department, payload.message)
+async def notify_admin(payload: NotificationPayload, idempotency_key: Optional[str] = Header(None),
+                       prefer: Optional[str] = Header(None)):
+    """
+    Sends a message to a specific department head or service desk. Answers once
+    it is sent, or 202 as soon as it is queued with 'Prefer: respond-async'.
+    """
+    logger.info("Received API request to notify '%s' admin.", payload.department)
+    results = await _submit(
+        [("notify_admin", {"department": payload.department, "message": payload.message}, idempotency_key)],
+        wait=not _respond_async(prefer)
+    )
+    return results if isinstance(results, JSONResponse) else results[0]
+
+@router.post("/actions/batch", status_code=200)
+async def execute_batch(batch: ActionBatch, idempotency_key: Optional[str] = Header(None)):
+    """
+    Executes several actions in one request. Duplicates are coalesced and the
+    rest are recorded and published together. An Idempotency-Key header covers
+    every action that does not carry its own key.
+    """
+    logger.info("Received API request with a batch of %d action(s).", len(batch.actions))
+    requests = []
+    for index, action in enumerate(batch.actions):
+        key = action.idempotency_key or (f"{idempotency_key}:{index}" if idempotency_key else None)
+        requests.append((action.action, action.model_dump(exclude={"action", "idempotency_key"}), key))
+    results = await _submit(requests)
 
+    deduplicated = sum(result["deduplicated"] for result in results)
+    return {
+        "status": "success",
+        "processed": len(results),
+        "dispatched": len(results) - deduplicated,
+        "deduplicated": deduplicated,
+        "results": results,
+    }
 
 @app.get("/", summary="Health Check")
 def read_root():
     """Provides a simple health check for the system."""
     return {"status": "ReflexSystem API is operational."}
 
+@app.get("/health", summary="Liveness Probe")
+def health():
+    """Cheap liveness probe for InsightCloud's health checker; reads only in-memory flags."""
+    return {"status": "ok", "redis_healthy": publisher.healthy}
+
+@app.get("/stats/publisher", summary="Event Publisher Health and Latency")
+def get_publisher_stats():
+    """Reports whether Redis is reachable and the latency of recent publish round trips."""
+    return {"redis_healthy": publisher.healthy, "transport": event_publisher.EVENT_TRANSPORT, **publisher.stats.snapshot()}
+
+@app.get("/stats/actions", summary="Action Deduplication Counters")
+def get_action_stats():
+    """Reports how many duplicate actions were coalesced instead of executed."""
+    return {
+        "coalesced_duplicates": recent_actions.coalesced_total,
+        "idempotent_replays": idempotent_actions.coalesced_total,
+    }
+
+@app.get("/stats/dispatcher", summary="Action Queue Depth and Latency per Priority Lane")
+def get_dispatcher_stats():
+    """Reports queue depth, rejections and queue-wait/end-to-end latency (p50/p95) for each lane."""
+    return dispatcher.snapshot()
+
 # Include the router in the main FastAPI application instance
 app.include_router(router)
 
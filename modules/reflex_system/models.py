@@ -1,3 +1,4 @@
+from typing import Annotated, List, Literal, Optional, Union
 from pydantic import BaseModel, Field
 
 class LocationPayload(BaseModel):
@@ -11,4 +12,29 @@ class AnnouncementPayload(BaseModel):
 class NotificationPayload(BaseModel):
     """Payload for notifying department admins."""
     department: str = Field(..., min_length=2, description="The target department (e.g., IT, Facilities).")
-    message: str = Field(..., min_length=5, description="The message to send to the department admin.")
\ No newline at end of file
+    message: str = Field(..., min_length=5, description="The message to send to the department admin.")
+
+# --- Batch Actions ---
+
+MAX_BATCH_ACTIONS = 100
+
+class SecurityAction(LocationPayload):
+    """A security dispatch inside a batch."""
+    action: Literal["call_security"]
+    idempotency_key: Optional[str] = Field(None, max_length=255, description="Client key; a repeat returns the original outcome.")
+
+class AnnouncementAction(AnnouncementPayload):
+    """A campus announcement inside a batch."""
+    action: Literal["send_announcement"]
+    idempotency_key: Optional[str] = Field(None, max_length=255, description="Client key; a repeat returns the original outcome.")
+
+class NotificationAction(NotificationPayload):
+    """A department notification inside a batch."""
+    action: Literal["notify_admin"]
+    idempotency_key: Optional[str] = Field(None, max_length=255, description="Client key; a repeat returns the original outcome.")
+
+Action = Annotated[Union[SecurityAction, AnnouncementAction, NotificationAction], Field(discriminator="action")]
+
+class ActionBatch(BaseModel):
+    """Payload for submitting several actions in one request."""
+    actions: List[Action] = Field(..., min_length=1, max_length=MAX_BATCH_ACTIONS, description="The actions to execute.")
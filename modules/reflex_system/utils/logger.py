@@ -1,13 +1,5 @@
 import logging
-import sys
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] [%(levelname)s] [ReflexSystem] %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-
-logger = logging.getLogger(__name__)
\ No newline at end of file
+# Handlers and formatting are configured by the app entry point (main.py)
+logger = logging.getLogger("modules.reflex_system")
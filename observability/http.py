@@ -0,0 +1,115 @@
+# File: observability/http.py
+# Request metrics and the /metrics endpoint for NeuraCity's FastAPI services,
+# a tiny standalone exporter for processes without a web server, and the
+# Server-Sent Events encoding shared by the streaming endpoints.
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from .metrics import CONTENT_TYPE, counter, histogram, render_metrics
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Stop proxies from buffering the stream
+
+HTTP_REQUEST_SECONDS = histogram(
+    "neuracity_http_request_duration_seconds",
+    "Time from receiving an HTTP request until the response starts.",
+    ["method", "route", "status"]
+)
+HTTP_REQUESTS_TOTAL = counter(
+    "neuracity_http_requests_total", "HTTP requests served.", ["method", "route", "status"]
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request by route template (so
+    '/health/ping/{module_name}' is one series, not one per module). Latency
+    is measured to the start of the response, which keeps long-lived
+    streaming responses such as SSE from skewing it.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int):
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            labels = {"method": scope["method"], "route": getattr(route, "path", "unmatched"), "status": str(status)}
+            HTTP_REQUEST_SECONDS.labels(**labels).observe(time.perf_counter() - started)
+            HTTP_REQUESTS_TOTAL.labels(**labels).inc()
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            if not recorded:
+                record(500)
+
+
+def instrument_app(app):
+    """Adds request metrics and a Prometheus-compatible GET /metrics endpoint to a FastAPI app."""
+    from fastapi import Response
+
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+    return app
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood the console
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """
+    Serves GET /metrics from a daemon thread. For processes that have no web
+    server of their own, such as cv_watchtower's frame loop.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    except OSError as e:
+        logger.warning("Could not start the metrics exporter on port %s. %s", port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    logger.info("Metrics exporter serving http://%s:%s/metrics", host, port)
+    return server
+
+
+def format_sse(event: str, data: dict) -> bytes:
+    """Encodes one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
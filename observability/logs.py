@@ -0,0 +1,170 @@
+# File: observability/logs.py
+# Shared logging setup for every NeuraCity service: records are handed to a
+# queue and written by a background thread, as structured JSON lines, with
+# repetitive messages rate-limited and per-module levels.
+
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# --- Configuration (environment variables, so every service is tuned the same way) ---
+# NEURACITY_LOG_LEVEL=INFO                      Root level
+# NEURACITY_LOG_LEVELS=modules.cv_watchtower=DEBUG,modules.insightcloud.realtime=WARNING
+# NEURACITY_LOG_FORMAT=json | text
+LOG_LEVEL = os.getenv("NEURACITY_LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("NEURACITY_LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("NEURACITY_LOG_FORMAT", "json")
+LOG_QUEUE_SIZE = 10_000
+
+RATE_LIMIT_INTERVAL_SECONDS = 10.0   # Window in which repeats of one message are counted
+RATE_LIMIT_BURST = 5                 # Repeats let through per window before sampling starts
+RATE_LIMIT_SAMPLE_EVERY = 100        # After the burst, one in this many repeats is let through
+
+# Attributes every LogRecord has; anything else was passed through 'extra=' and is emitted as a field
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including any 'extra' fields."""
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with 'extra' fields appended."""
+    def __init__(self, service: str):
+        super().__init__(f"[%(asctime)s] [%(levelname)s] [{service}] [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = {key: value for key, value in vars(record).items()
+                  if key not in _STANDARD_ATTRIBUTES and not key.startswith("_")}
+        return f"{line} {json.dumps(extras, default=str)}" if extras else line
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets the first few repeats of a message through in each interval, then only
+    a sample of them. A message is identified by its logger and unformatted
+    template, so log with arguments ("Cooldown active for '%s'", event_type)
+    rather than pre-formatted strings for repeats to be recognised. The next
+    record let through carries 'suppressed': the number dropped before it.
+    ERROR and above are never limited.
+    """
+    def __init__(self, interval_seconds: float = RATE_LIMIT_INTERVAL_SECONDS, burst: int = RATE_LIMIT_BURST,
+                 sample_every: int = RATE_LIMIT_SAMPLE_EVERY, max_keys: int = 10_000):
+        super().__init__()
+        self.interval_seconds = interval_seconds
+        self.burst = burst
+        self.sample_every = sample_every
+        self.max_keys = max_keys
+        self._windows: Dict[tuple, list] = {}   # key -> [window_start, seen_in_window, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval_seconds:
+                suppressed = window[2] if window else 0
+                if len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                window = self._windows[key] = [now, 0, suppressed]
+            window[1] += 1
+            seen = window[1]
+            allowed = seen <= self.burst or (seen - self.burst) % self.sample_every == 0
+            if not allowed:
+                window[2] += 1
+                return False
+            suppressed, window[2] = window[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Drops (and counts) records instead of blocking the caller when the queue is full."""
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+def parse_level_overrides(spec: str) -> Dict[str, str]:
+    """Parses 'logger=LEVEL,...' into {logger: LEVEL}."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+def configure_logging(service: str, level: Optional[str] = None, module_levels: Optional[Dict[str, str]] = None,
+                      json_format: Optional[bool] = None) -> logging.Logger:
+    """
+    Routes all logging through one non-blocking queue handler. Callers only
+    enqueue records; a listener thread formats and writes them to stdout.
+    Safe to call more than once: the first call in a process wins.
+    """
+    global _listener
+    with _listener_lock:
+        root = logging.getLogger()
+        if _listener is None:
+            json_format = (LOG_FORMAT.lower() == "json") if json_format is None else json_format
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(JsonFormatter(service) if json_format else TextFormatter(service))
+
+            log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            queue_handler = _NonBlockingQueueHandler(log_queue)
+            queue_handler.addFilter(RateLimitFilter())
+
+            # Replace whatever basicConfig() may have installed earlier
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(queue_handler)
+            root.setLevel(level or LOG_LEVEL)
+
+            _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+
+        overrides = parse_level_overrides(LOG_LEVELS)
+        overrides.update(module_levels or {})
+        for name, logger_level in overrides.items():
+            logging.getLogger(name).setLevel(logger_level)
+    return root
+
@@ -2,8 +2,12 @@
 
 import pytest
 from fastapi.testclient import TestClient
+import asyncio
+import datetime
 import sys
 import os
+from types import SimpleNamespace
+import pandas as pd
 
 # Add project root to path for imports
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -11,6 +15,8 @@ sys.path.insert(0, project_root)
 
 # Import the FastAPI app
 from modules.insightcloud.app import app
+from modules.insightcloud import analytics
+from memorycore.structured_memory import StructuredMemory
 
 client = TestClient(app)
 
@@ -44,4 +50,283 @@ def test_realtime_overview_endpoint():
     assert response.status_code == 200
     data = response.json()
     assert data["live_total_events"] == 0 # Should be 0 on a fresh start
-    assert isinstance(data["live_events_by_type"], dict)
\ No newline at end of file
+    assert isinstance(data["live_events_by_type"], dict)
+
+def _fresh_streaming_state(monkeypatch, store):
+    from modules.insightcloud.anomaly import StreamingAnomalyDetector
+    from modules.insightcloud.rollups import HourlyRollup
+    monkeypatch.setattr(analytics, "event_store", store)
+    monkeypatch.setattr(analytics, "hourly_rollup", HourlyRollup())
+    monkeypatch.setattr(analytics, "anomaly_detector", StreamingAnomalyDetector())
+    monkeypatch.setattr(analytics, "_streaming_seeded", False)
+
+def test_incremental_refresh_feeds_rollups_from_ingested_rows(tmp_path, monkeypatch):
+    """Tests that each refresh ingests only new events and feeds exactly those rows to the rollups."""
+    from modules.insightcloud import event_store as event_store_module
+    structured = StructuredMemory(db_path=str(tmp_path / "events.db"))
+    monkeypatch.setattr(event_store_module, "get_memory_core", lambda: SimpleNamespace(structured=structured))
+    _fresh_streaming_state(monkeypatch, event_store_module.ColumnarEventStore(store_path=str(tmp_path / "columnar")))
+    generation = analytics.CACHE_GENERATION
+
+    structured.add("cv_watchtower", "FALL_DETECTED", {"camera_id": "Fall Cam"})
+    assert asyncio.run(analytics.refresh_data_cache())
+    assert analytics.get_events_by_module() == {"cv_watchtower": 1}
+    assert analytics.CACHE_GENERATION > generation
+
+    structured.add("reflex_system", "security_alert", {"location": "Main Library"})
+    asyncio.run(analytics.refresh_data_cache())
+    assert analytics.get_events_by_module() == {"cv_watchtower": 1, "reflex_system": 1}
+    assert analytics.hourly_rollup.last_event_id == analytics.anomaly_detector.last_event_id == 2
+
+def test_streaming_state_seeds_from_history_once(monkeypatch):
+    """Tests that an empty history is scanned once, not again on every refresh."""
+    from modules.insightcloud.event_store import _SCHEMA
+    scans = []
+
+    def scan(columns):
+        scans.append(columns)
+        return _SCHEMA.empty_table().select(columns)
+
+    _fresh_streaming_state(monkeypatch, SimpleNamespace(scan=scan, ingest_new_events=lambda on_batch: 0))
+    for _ in range(3):
+        analytics._update_streaming_state()
+    assert len(scans) == 1
+
+def test_columnar_event_store_ingests_incrementally(tmp_path, monkeypatch):
+    """Tests that the Parquet store only appends new rows and survives a restart."""
+    from modules.insightcloud import event_store as event_store_module
+    structured = StructuredMemory(db_path=str(tmp_path / "events.db"))
+    monkeypatch.setattr(event_store_module, "get_memory_core", lambda: SimpleNamespace(structured=structured))
+    store = event_store_module.ColumnarEventStore(store_path=str(tmp_path / "columnar"))
+
+    structured.add("cv_watchtower", "FALL_DETECTED", {"camera_id": "Fall Cam"})
+    structured.add("reflex_system", "security_alert", {"location": "Main Library"})
+    assert store.ingest_new_events() == 2
+    assert store.ingest_new_events() == 0
+
+    structured.add("cv_watchtower", "FALL_DETECTED", {"camera_id": "Fall Cam"})
+    assert store.ingest_new_events() == 1
+    assert sum(store.count_by_day().values()) == 3
+    assert store.count_by("source") == {"cv_watchtower": 2, "reflex_system": 1}
+
+    # A fresh instance recovers its high-water mark from the part file names
+    reopened = event_store_module.ColumnarEventStore(store_path=str(tmp_path / "columnar"))
+    assert reopened.last_event_id == 3
+
+def test_streaming_anomaly_detector_flags_spikes_per_scope():
+    """Tests that a spike against the hour-of-week baseline is flagged for every scope."""
+    from modules.insightcloud.anomaly import StreamingAnomalyDetector
+    detector = StreamingAnomalyDetector(min_observations=2)
+    monday_9am = datetime.datetime(2025, 8, 4, 9)
+    event_id = 0
+
+    # Three normal weeks with two events in the Monday 9am slot, then a spike
+    for week, count in enumerate([2, 2, 2, 20]):
+        for _ in range(count):
+            event_id += 1
+            detector.observe(event_id, monday_9am + datetime.timedelta(weeks=week), "cv_watchtower", "FALL_DETECTED")
+    detector.advance_to(monday_9am + datetime.timedelta(weeks=3, hours=1))
+
+    anomalies = detector.get_anomalies()
+    assert {a["scope"] for a in anomalies} == {"all", "source:cv_watchtower", "type:FALL_DETECTED"}
+    assert all(a["event_count"] == 20 for a in anomalies)
+
+    # Replaying an already seen event is a no-op
+    detector.observe(1, monday_9am, "cv_watchtower", "FALL_DETECTED")
+    assert len(detector.get_anomalies()) == 3
+
+def test_stats_endpoints_support_conditional_get():
+    """Tests that materialized /stats results carry an ETag and answer 304 when unchanged."""
+    response = client.get("/stats/events_by_module")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert "last-modified" in response.headers
+
+    cached = client.get("/stats/events_by_module", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+def test_hourly_rollup_granularity_and_range():
+    """Tests that per-day and per-month series and ranges are derived from the hourly rollup."""
+    from modules.insightcloud.rollups import HourlyRollup
+    rollup = HourlyRollup()
+    rollup.update_from_frame(pd.DataFrame({
+        "id": [1, 2, 3],
+        "timestamp": pd.to_datetime(["2025-08-07T10:15:00", "2025-08-07T11:45:00", "2025-08-09T09:00:00"]),
+        "source": ["cv_watchtower", "reflex_system", "cv_watchtower"],
+        "type": ["FALL_DETECTED", "security_alert", "FALL_DETECTED"],
+    }))
+    assert rollup.events_over_time("day") == {"2025-08-07": 2, "2025-08-08": 0, "2025-08-09": 1}
+    assert rollup.events_over_time("month") == {"2025-08": 3}
+    start = datetime.datetime(2025, 8, 8)
+    assert rollup.events_by("source", start=start) == {"cv_watchtower": 1}
+
+def test_stats_accept_utc_range_bounds():
+    """Tests that a 'Z'-suffixed range is converted to the store's local time instead of failing."""
+    for path in ("/stats/events_per_day", "/stats/events_by_module", "/stats/anomalies"):
+        response = client.get(path, params={"start": "2024-05-01T00:00:00Z", "end": "2099-01-01T00:00:00+02:00"})
+        assert response.status_code == 200, path
+
+def test_live_broadcaster_coalesces_and_drops_slow_clients():
+    """Tests that one flush sends a single shared message and that a stalled client is disconnected."""
+    from modules.insightcloud.broadcast import LiveBroadcaster
+    broadcaster = LiveBroadcaster(queue_size=2, drop_limit=3)
+    fast, slow = broadcaster.subscribe(), broadcaster.subscribe()
+
+    broadcaster.publish_event({"event_type": "SECURITY_ALERT"})
+    broadcaster.publish_event({"event_type": "CAMPUS_ANNOUNCEMENT"})
+    broadcaster.flush({"live_total_events_since_startup": 2})
+    fast_messages = [fast.queue.get_nowait(), fast.queue.get_nowait()]
+    assert b"CAMPUS_ANNOUNCEMENT" in fast_messages[0] and b"event: overview" in fast_messages[1]
+
+    # The slow client never reads; after enough drops it only holds the end-of-stream marker
+    for i in range(5):
+        broadcaster.publish_event({"event_type": f"EVENT_{i}"})
+        broadcaster.flush()
+        fast.queue.get_nowait()
+    assert slow.closed and slow.queue.get_nowait() is None
+    assert broadcaster.subscribers == {fast}
+
+def test_sliding_window_metrics_expire_old_buckets():
+    """Tests per-window rates and top-K types, and that events age out of short windows."""
+    from modules.insightcloud.sliding_window import SlidingWindowMetrics
+    metrics = SlidingWindowMetrics()
+    now = 1_700_000_000.0
+    for _ in range(3):
+        metrics.record("FALL_DETECTED", "cv_watchtower", "Fall Cam", now=now - 30)
+    metrics.record("SECURITY_ALERT", "reflex_system", now=now - 5)
+
+    last_minute = metrics.summary(window_seconds=60, now=now)
+    assert last_minute["events"] == 4
+    assert last_minute["top_event_types"][0] == {"event_type": "FALL_DETECTED", "count": 3}
+    assert last_minute["events_per_second_by_camera"] == {"Fall Cam": 0.05}
+
+    assert metrics.summary(window_seconds=10, now=now)["events"] == 1
+    assert metrics.summary(window_seconds=3600, now=now + 120)["events"] == 4
+    assert metrics.summary(window_seconds=60, now=now + 120)["events"] == 0
+
+def test_redis_streams_transport_replays_unacknowledged_events(monkeypatch):
+    """Tests pipelined XADD from reflex_system and consumer-group reads with replay after a restart."""
+    import fakeredis
+    from modules.insightcloud import realtime
+    from modules.reflex_system import event_publisher
+
+    async def scenario():
+        fake_redis = fakeredis.FakeAsyncRedis()
+        monkeypatch.setattr(event_publisher, "EVENT_TRANSPORT", "streams")
+        monkeypatch.setattr(event_publisher.publisher, "_redis_client", fake_redis)
+        consumer = realtime.live_analytics
+        monkeypatch.setattr(consumer, "redis", fake_redis, raising=False)
+        monkeypatch.setattr(consumer, "live_event_count", 0)
+        monkeypatch.setattr(consumer, "stream_last_id", "0")
+        await consumer.ensure_consumer_group()
+
+        # Concurrent publishes are written in one pipeline
+        await asyncio.gather(*[
+            event_publisher.publisher.publish_event("SECURITY_ALERT", {"location": f"Gate {i}"}) for i in range(3)
+        ])
+        assert await fake_redis.xlen(realtime.EVENT_STREAM) == 3
+
+        # Deliver the entries without acknowledging them, as if insightcloud crashed mid-batch
+        await fake_redis.xreadgroup(realtime.CONSUMER_GROUP, realtime.CONSUMER_NAME, {realtime.EVENT_STREAM: ">"})
+
+        # After the "restart" the pending entries are replayed and acknowledged
+        assert await consumer.read_stream_batch() == 3
+        assert consumer.live_event_count == 3
+        assert (await fake_redis.xpending(realtime.EVENT_STREAM, realtime.CONSUMER_GROUP))["pending"] == 0
+        assert await consumer.read_stream_batch() == 0
+        assert consumer.stream_last_id == ">"
+
+    asyncio.run(scenario())
+
+def test_stream_listener_recreates_missing_group_and_survives_errors(monkeypatch):
+    """Tests that a NOGROUP error recreates the consumer group and unexpected errors do not end the listener."""
+    import fakeredis
+    from modules.insightcloud import realtime
+
+    async def scenario():
+        fake_redis = fakeredis.FakeAsyncRedis()
+        consumer = realtime.live_analytics
+        monkeypatch.setattr(consumer, "redis", fake_redis, raising=False)
+        monkeypatch.setattr(realtime, "STREAM_RETRY_MIN_SECONDS", 0)
+        failures = [realtime.aioredis.ResponseError("NOGROUP No such key 'campus_events'"), ValueError("bad batch")]
+        reads = []
+
+        async def read_stream_batch():
+            reads.append(consumer.stream_last_id)
+            if failures:
+                raise failures.pop(0)
+            raise asyncio.CancelledError
+
+        monkeypatch.setattr(consumer, "read_stream_batch", read_stream_batch)
+        monkeypatch.setattr(consumer, "stream_last_id", ">")
+        await consumer._stream_listener()
+        groups = await fake_redis.xinfo_groups(realtime.EVENT_STREAM)
+        return reads, [group["name"] for group in groups]
+
+    reads, groups = asyncio.run(scenario())
+    assert reads == [">", "0", "0"]
+    assert groups == [realtime.CONSUMER_GROUP.encode()]
+
+def test_health_checker_backoff_and_background_transitions(monkeypatch):
+    """Tests probe back-off, stale detection by the sweep, and that transitions are published."""
+    from modules.insightcloud import healthcheck
+    from modules.insightcloud.healthcheck import health_checker, next_check_delay
+
+    assert next_check_delay(10, 0, jitter_ratio=0) == 10
+    assert next_check_delay(10, 3, jitter_ratio=0) == 80
+    assert next_check_delay(10, 20, jitter_ratio=0) == healthcheck.MAX_BACKOFF_SECONDS
+    assert 8 <= next_check_delay(10, 0) <= 12
+
+    published = []
+    monkeypatch.setattr(healthcheck.live_broadcaster, "publish_event", published.append)
+    module = health_checker.registered_modules["iot_pulsenet"]
+    monkeypatch.setitem(module, "status", "Unknown")
+    monkeypatch.setitem(module, "last_seen", 0.0)
+
+    health_checker.ping_from_event("iot_pulsenet")
+    status = health_checker.get_status()
+    entry = next(item for item in status if item["module"] == "iot_pulsenet")
+    assert entry["status"] == "Healthy"
+
+    health_checker.sweep_stale(now=module["last_seen"] + health_checker.unhealthy_threshold_seconds + 1)
+    # get_status() hands out copies: an earlier result is not changed by later transitions
+    entry_now = next(item for item in health_checker.get_status() if item["module"] == "iot_pulsenet")
+    assert entry_now["status"] == "Unhealthy (Stale)" and entry["status"] == "Healthy"
+    status.clear()
+    assert len(health_checker.get_status()) == len(health_checker.registered_modules)
+    transitions = [(e["payload"]["module"], e["payload"]["status"]) for e in published if e["payload"]["module"] == "iot_pulsenet"]
+    assert transitions == [("iot_pulsenet", "Healthy"), ("iot_pulsenet", "Unhealthy (Stale)")]
+    health_checker._rebuild_snapshot()
+
+def test_health_history_latency_uptime_and_outages_survive_restart(tmp_path):
+    """Tests ring-buffer percentiles and outages, then the same answers from persisted rollups."""
+    from modules.insightcloud.health_history import HealthHistory
+    db_path = str(tmp_path / "module_health.db")
+    history = HealthHistory(db_path=db_path)
+    t0 = 1_700_000_100.0
+
+    history.record_transition("reflex_system", "Healthy", "Unknown", now=t0)
+    for i in range(10):
+        history.record_probe("reflex_system", latency_ms=10.0 * (i + 1), ok=True, now=t0 + 10 * i)
+    history.record_transition("reflex_system", "Unresponsive", "Healthy", now=t0 + 600)
+    history.record_transition("reflex_system", "Unreachable", "Unresponsive", now=t0 + 700)
+    history.record_probe("reflex_system", latency_ms=5000.0, ok=False, now=t0 + 700)
+    history.record_transition("reflex_system", "Healthy", "Unreachable", now=t0 + 900)
+
+    summary = history.summary("reflex_system", window_seconds=1200, now=t0 + 1200)
+    assert summary["latency_source"] == "probes"
+    assert (summary["probes"], summary["failures"]) == (11, 1)
+    assert summary["latency_ms_p50"] == 60.0 and summary["latency_ms_p95"] == 100.0
+    assert summary["uptime_percent"] == 75.0
+    assert len(summary["outages"]) == 1
+    assert summary["outages"][0]["duration_seconds"] == 300.0
+    assert summary["outages"][0]["statuses"] == ["Unresponsive", "Unreachable"]
+
+    # A fresh instance (e.g. after a restart) answers from SQLite
+    history.flush(now=t0 + 1200)
+    restarted = HealthHistory(db_path=db_path)
+    persisted = restarted.summary("reflex_system", window_seconds=1200, now=t0 + 1200)
+    assert persisted["latency_source"] == "rollups"
+    assert (persisted["probes"], persisted["failures"]) == (11, 1)
+    assert persisted["latency_ms_p95"] == 100.0
+    assert persisted["uptime_percent"] == 75.0 and persisted["outages"] == summary["outages"]
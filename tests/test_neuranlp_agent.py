@@ -0,0 +1,466 @@
+# File: tests/test_neuranlp_agent.py
+
+import pytest
+import asyncio
+import sys
+import os
+import types
+import time
+import io
+import wave
+import numpy as np
+
+# Add project root to path for imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+import httpx
+from modules.neuranlp_agent.concurrency import QueryLimiter, AgentBusy
+from modules.neuranlp_agent.utils import api_triggers
+from modules.neuranlp_agent.semantic_cache import SemanticCache
+from modules.neuranlp_agent.intent_router import IntentRouter, EMERGENCY, FAQ, AGENT, extract_location
+from modules.neuranlp_agent.streaming import FinalAnswerFilter
+from observability.http import format_sse
+from modules.neuranlp_agent.lifecycle import AgentWarmup
+from modules.neuranlp_agent.prompt_budget import PromptBudget, estimate_tokens
+from modules.neuranlp_agent.tts import AudioCache, SpeechSynthesizer, TTSEngine, TTSError, split_sentences
+from modules.neuranlp_agent.transcription import TranscriptionService, TranscriptionBusy
+from modules.neuranlp_agent.audio import decode_audio, AudioDecodeError, SAMPLE_RATE
+from modules.neuranlp_agent.llm_pool import LLMPool, LLMBackend, CircuitBreaker, AllBackendsUnavailable
+
+# Note: agent_core needs LangChain and a configured LLM, so these tests cover
+# the components around it that do not.
+
+def test_query_limiter_caps_concurrency_and_rejects_overflow():
+    """Tests that excess queries wait in order, a full queue rejects, and a long wait times out."""
+    async def scenario():
+        limiter = QueryLimiter(max_concurrency=2, max_queued=1, queue_timeout_seconds=5)
+        release = asyncio.Event()
+        running, peak = 0, 0
+
+        async def query():
+            nonlocal running, peak
+            async with limiter.slot():
+                running += 1
+                peak = max(peak, running)
+                await release.wait()
+                running -= 1
+
+        tasks = [asyncio.create_task(query()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert (limiter.active, limiter.queued) == (2, 1)
+        with pytest.raises(AgentBusy):
+            async with limiter.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert peak == 2 and limiter.completed == 3 and limiter.rejected == 1
+
+        slow = QueryLimiter(max_concurrency=1, max_queued=5, queue_timeout_seconds=0.05)
+        async with slow.slot():
+            with pytest.raises(AgentBusy):
+                async with slow.slot():
+                    pass
+        assert slow.timed_out == 1 and slow.snapshot()["active"] == 0
+
+    asyncio.run(scenario())
+
+def test_async_triggers_share_one_pooled_client(monkeypatch):
+    """Tests that the async action tools post through the shared client and report HTTP errors."""
+    requests_seen = []
+
+    def handler(request: httpx.Request):
+        requests_seen.append(request.url.path)
+        if request.url.path.endswith("/notify_admin"):
+            return httpx.Response(503)
+        return httpx.Response(200, json={"status": "success"})
+
+    async def scenario():
+        client = httpx.AsyncClient(base_url="http://reflex.test/api", transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(api_triggers, "_http_client", client)
+        results = await asyncio.gather(
+            api_triggers.acall_security("Main Library"),
+            api_triggers.asend_announcement("Drill at noon"),
+            api_triggers.anotify_admin("IT", "Wi-Fi down"),
+        )
+        assert api_triggers.get_http_client() is client
+        await api_triggers.close_http_client()
+        assert client.is_closed
+        return results
+
+    security, announcement, notification = asyncio.run(scenario())
+    assert security == {"status": "success"} and announcement == {"status": "success"}
+    assert "error" in notification
+    assert sorted(requests_seen) == ["/api/actions/call_security", "/api/actions/notify_admin", "/api/actions/send_announcement"]
+
+def _bag_of_words_embedding(texts):
+    """A deterministic stand-in for the embedding model."""
+    vocabulary = ["where", "is", "prof", "sharma", "office", "room", "library", "open", "hours", "club", "event"]
+    return [[float(word in text.lower().replace("?", "").replace("'s", "").split()) for word in vocabulary] for text in texts]
+
+def test_semantic_cache_hits_similar_questions_and_bypasses_actions(tmp_path):
+    """Tests exact and similar hits, misses below the threshold, action bypass, TTL and document invalidation."""
+    document = tmp_path / "campus_faq.txt"
+    document.write_text("Prof. Sharma: Room 204")
+    clock = [1000.0]
+    reloaded = []
+    cache = SemanticCache(_bag_of_words_embedding, document_paths=[str(document)], on_documents_changed=reloaded.extend,
+                          threshold=0.85, ttl_seconds=60, max_entries=10, enabled=True, clock=lambda: clock[0])
+
+    async def scenario():
+        cached, vector = await cache.lookup("Where is Prof. Sharma's office?")
+        assert cached is None
+        await cache.store("Where is Prof. Sharma's office?", "Room 204, Block A.", "gemini", vector)
+
+        exact, _ = await cache.lookup("  where is prof. Sharma's office")
+        similar, _ = await cache.lookup("Where is the office of Prof Sharma?")
+        unrelated, _ = await cache.lookup("Is the library open?")
+        assert exact.response == similar.response == "Room 204, Block A."
+        assert unrelated is None
+
+        # Anything that may trigger an action never touches the cache
+        await cache.store("Call security to Prof Sharma's office", "Security dispatched.", "gemini")
+        action, _ = await cache.lookup("Call security to Prof Sharma's office")
+        assert action is None and cache.stats["bypassed"] == 1 and cache.snapshot()["entries"] == 1
+
+        clock[0] += 61
+        expired, _ = await cache.lookup("Where is Prof. Sharma's office?")
+        assert expired is None
+
+        await cache.store("Where is Prof. Sharma's office?", "Room 204, Block A.", "gemini")
+        document.write_text("Prof. Sharma: Room 310 (moved)")
+        clock[0] += 11
+        stale, _ = await cache.lookup("Where is Prof. Sharma's office?")
+        assert stale is None and reloaded == [str(document)]
+
+    asyncio.run(scenario())
+    assert cache.snapshot()["hits"] == 1 and cache.snapshot()["semantic_hits"] == 1
+
+def _hashed_words_embedding(texts):
+    """Bag of words hashed into a fixed-size vector: similar wording gives similar vectors."""
+    import re, zlib
+    vectors = []
+    for text in texts:
+        vector = [0.0] * 64
+        for word in re.findall(r"[a-z]+", text.lower()):
+            vector[zlib.crc32(word.encode()) % 64] += 1.0
+        vectors.append(vector)
+    return vectors
+
+def test_intent_router_fast_paths_only_clear_cut_queries():
+    """Tests rule-based emergencies with location, FAQ classification, and agent fallback."""
+    router = IntentRouter(_hashed_words_embedding, faq_threshold=0.6, margin=0.05, enabled=True)
+
+    decision = router.classify_rules("There is a fight near the main gate. Call security!")
+    assert decision.route == EMERGENCY and decision.location == "main gate"
+    faint = router.classify_rules("I saw a student faint. Call for help.")
+    assert faint.route == EMERGENCY and faint.location is None
+    # Drills, history and procedures are not emergencies; other actions need the agent
+    assert router.classify_rules("Announce the fire drill at noon").route == AGENT
+    assert router.classify_rules("Notify the facilities department that the fountain is broken.").route == AGENT
+
+    async def scenario():
+        return (await router.classify("Where is the office of Prof. Sharma?"),
+                await router.classify("What is the meaning of life?"))
+    faq, vague = asyncio.run(scenario())
+    assert faq.route == FAQ
+    assert vague.route == AGENT
+
+def test_intent_router_never_dispatches_questions_or_bare_keywords():
+    """Tests that questions mentioning emergency words, and incidents without a call for help, are not dispatched."""
+    router = IntentRouter(_hashed_words_embedding, faq_threshold=0.6, margin=0.05, enabled=True)
+    for query in ("Can you help me find the library?",
+                  "Where is the fire station?",
+                  "Is there a gun club on campus?",
+                  "Is the knife allowed in the cafeteria?",
+                  "Where can I get first aid training on bleeding control?",
+                  "Who do I contact in an emergency?",
+                  "Someone collapsed near the library"):
+        decision = router.classify_rules(query)
+        assert decision is None or decision.route != EMERGENCY, query
+    assert extract_location("Who do I contact in an emergency?") is None
+
+def test_final_answer_filter_streams_only_the_answer():
+    """Tests that ReAct reasoning is hidden and the answer streams even when the marker is split across tokens."""
+    answer_filter = FinalAnswerFilter()
+    tokens = ["Thought: I now know", " the answer.\nFinal ", "Ans", "wer:", " ", "Room 204", ", Block A."]
+    assert "".join(answer_filter.feed(token) for token in tokens) == "Room 204, Block A."
+
+    # A new LLM call inside the same agent run starts hidden again
+    answer_filter.reset()
+    assert answer_filter.feed("Action: SearchSharedVectorMemory") == "" and not answer_filter.streaming
+    assert format_sse("token", {"text": "Hi"}) == b'event: token\ndata: {"text": "Hi"}\n\n'
+
+
+def _stub_llm_server(name, delay=0.0, status=200):
+    """An Ollama-style /api/generate stub served in-process; returns (backend, request log)."""
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(delay)
+        if status != 200:
+            return httpx.Response(status, json={"error": "model overloaded"})
+        return httpx.Response(200, json={"response": f"answer from {name}"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=f"http://{name}")
+
+    async def complete(prompt, stop):
+        response = await client.post("/api/generate", json={"prompt": prompt, "stop": stop})
+        response.raise_for_status()
+        return response.json()["response"]
+
+    return complete, calls
+
+
+def test_llm_pool_hedges_slow_primary_and_fails_over_on_timeout():
+    """Tests that a slow primary is raced by the hedge target, and a timed-out primary fails over."""
+    async def scenario():
+        slow, _ = _stub_llm_server("gemini", delay=1.0)
+        fast, fast_calls = _stub_llm_server("ollama")
+
+        pool = LLMPool([LLMBackend("gemini", slow, priority=0, timeout_seconds=5),
+                        LLMBackend("ollama", fast, priority=1, hedge_target=True)],
+                       hedge_enabled=True, hedge_after_seconds=0.05)
+        # The result names the backend that actually answered, not the preferred one
+        assert await pool.acomplete("Where is the library?") == ("answer from ollama", "ollama")
+        assert (pool.hedges_started, pool.hedges_won) == (1, 1)
+
+        pool = LLMPool([LLMBackend("gemini", slow, priority=0, timeout_seconds=0.05),
+                        LLMBackend("ollama", fast, priority=1)], hedge_enabled=False)
+        assert (await pool.acomplete("Where is the library?")).backend == "ollama"
+        assert pool.backends[0].breaker.failures == 1
+        assert len(fast_calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_llm_pool_circuit_breaker_skips_failing_backend_until_trial_succeeds():
+    """Tests that repeated failures open the circuit, and a successful half-open trial closes it."""
+    async def scenario():
+        now = [0.0]
+        failing, failing_calls = _stub_llm_server("gemini", status=503)
+        healthy, _ = _stub_llm_server("ollama")
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30, clock=lambda: now[0])
+        gemini = LLMBackend("gemini", failing, priority=0, breaker=breaker)
+        pool = LLMPool([gemini, LLMBackend("ollama", healthy, priority=1)], hedge_enabled=False)
+
+        for _ in range(3):
+            assert (await pool.acomplete("hi")).text == "answer from ollama"
+        assert breaker.state == "open"
+        assert len(failing_calls) == 2
+        assert pool.ordered()[0].name == "ollama"
+
+        now[0] = 31.0
+        assert breaker.state == "half_open"
+        gemini.complete, _ = _stub_llm_server("gemini")
+        assert await pool.acomplete("hi") == ("answer from gemini", "gemini")
+        assert breaker.state == "closed"
+
+        # Every backend down
+        pool = LLMPool([LLMBackend("gemini", failing)], hedge_enabled=False)
+        with pytest.raises(AllBackendsUnavailable):
+            await pool.acomplete("hi")
+
+    asyncio.run(scenario())
+
+
+def test_llm_pool_stream_cancelled_before_first_chunk_releases_half_open_trial():
+    """Tests that cancelling a stream during a half-open trial gives the trial back to the breaker."""
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hanging_stream(prompt, stop):
+            started.set()
+            await asyncio.sleep(10)
+            yield "never"
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=lambda: 31.0)
+        breaker.opened_at = 0.0
+        healthy, _ = _stub_llm_server("gemini")
+        pool = LLMPool([LLMBackend("gemini", healthy, stream=hanging_stream, breaker=breaker)],
+                       hedge_enabled=False)
+
+        async def consume():
+            return [chunk async for chunk in pool.astream("hi")]
+
+        task = asyncio.create_task(consume())
+        await started.wait()
+        with pytest.raises(asyncio.CancelledError):
+            task.cancel()
+            await task
+        assert breaker.state == "half_open"
+        assert breaker.allow()
+
+    asyncio.run(scenario())
+
+
+def test_agent_warmup_builds_once_in_background_and_retries_after_failure(monkeypatch):
+    """Tests that concurrent callers share one off-loop build, and a failed build can be retried."""
+    builds = []
+
+    def get_agent_core():
+        time.sleep(0.05)
+        builds.append(1)
+        if len(builds) == 1:
+            raise RuntimeError("Chroma is locked")
+        return "agent"
+
+    monkeypatch.setitem(sys.modules, "fake_agent_core", types.SimpleNamespace(get_agent_core=get_agent_core))
+
+    async def scenario():
+        warmup = AgentWarmup(module="fake_agent_core")
+        assert warmup.peek() is None and warmup.state == "cold"
+        with pytest.raises(RuntimeError):
+            await warmup.get()
+        assert warmup.snapshot()["state"] == "failed"
+
+        warmup.start()
+        await asyncio.sleep(0.01)
+        # The build runs in a worker thread, so the event loop is free meanwhile
+        assert warmup.state == "warming" and not warmup.ready
+        results = await asyncio.gather(*(warmup.get() for _ in range(5)))
+        assert results == ["agent"] * 5
+        assert len(builds) == 2
+        snapshot = warmup.snapshot()
+        assert snapshot["state"] == "ready" and snapshot["build_seconds"] >= 0.05
+
+    asyncio.run(scenario())
+
+
+def _wav_bytes(samples, rate, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as clip:
+        clip.setnchannels(channels)
+        clip.setsampwidth(2)
+        clip.setframerate(rate)
+        clip.writeframes(samples.astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def test_decode_audio_reads_16khz_wav_in_memory(monkeypatch):
+    """Tests that 16 kHz WAV decodes to mono float32 without ffmpeg, and other input goes through the pipe."""
+    stereo = np.array([[16384, -16384], [32767, 32767], [0, 0]] * 100)
+    samples = decode_audio(_wav_bytes(stereo.reshape(-1), SAMPLE_RATE, channels=2))
+    assert samples.dtype == np.float32 and samples.shape == (300,)
+    assert samples[0] == 0.0 and abs(samples[1] - 1.0) < 1e-3
+
+    piped = []
+    def fake_ffmpeg(command, input, **kwargs):
+        piped.append((command, input))
+        return types.SimpleNamespace(stdout=np.array([0, 16384], dtype=np.int16).tobytes())
+    monkeypatch.setattr("modules.neuranlp_agent.audio.subprocess.run", fake_ffmpeg)
+    clip = _wav_bytes(np.zeros(80), 8000)
+    assert decode_audio(clip).tolist() == [0.0, 0.5]
+    assert piped[0][1] == clip and "pipe:0" in piped[0][0]
+
+    with pytest.raises(AudioDecodeError):
+        decode_audio(b"")
+
+
+def test_transcription_service_warms_replicas_and_batches_concurrent_clips():
+    """Tests that models load once at start, concurrent clips share a batch, and a full queue rejects."""
+    loads, batches = [], []
+
+    def load_model(size, precision):
+        loads.append((size, precision))
+        return f"whisper-{size}"
+
+    def transcribe_batch(model, clips):
+        batches.append(len(clips))
+        time.sleep(0.02)
+        return [f"{model}: {len(clip)} samples" for clip in clips]
+
+    async def scenario():
+        service = TranscriptionService(model_size="tiny", precision="int8", replicas=1, max_batch=4,
+                                       batch_window_seconds=0.05, max_queued=8,
+                                       load_model=load_model, transcribe_batch=transcribe_batch)
+        await asyncio.gather(service.start(), service.start())
+        assert loads == [("tiny", "int8")] and service.state == "ready"
+
+        texts = await asyncio.gather(*(service.transcribe(np.zeros(n, dtype=np.float32)) for n in range(1, 6)))
+        assert texts == [f"whisper-tiny: {n} samples" for n in range(1, 6)]
+        assert batches == [4, 1]
+        assert service.snapshot()["mean_batch_size"] == 2.5
+
+        service.max_queued = 1
+        await service.stop()
+        await service.start()
+        first = asyncio.ensure_future(service.transcribe(np.zeros(1, dtype=np.float32)))
+        await asyncio.sleep(0)
+        with pytest.raises(TranscriptionBusy):
+            await asyncio.gather(*(service.transcribe(np.zeros(1, dtype=np.float32)) for _ in range(3)))
+        await first
+        await service.stop()
+
+    asyncio.run(scenario())
+
+
+class _FakeEngine(TTSEngine):
+    name, mime, extension = "fake", "audio/wav", "wav"
+
+    def __init__(self, name="fake", fail=False):
+        self.name, self.fail, self.spoken = name, fail, []
+
+    def synthesize(self, text):
+        self.spoken.append(text)
+        if self.fail:
+            raise TTSError("no network")
+        return f"{self.name}:{text}".encode()
+
+
+def test_speech_synthesizer_caches_audio_and_falls_back_offline(tmp_path):
+    """Tests the content-addressed cache (memory and disk), the fallback engine and sentence streaming."""
+    online, offline = _FakeEngine("online", fail=True), _FakeEngine("offline")
+    cache = AudioCache(directory=str(tmp_path), max_bytes=1024, memory_entries=2)
+    synthesizer = SpeechSynthesizer(online, offline, cache)
+
+    assert synthesizer.synthesize("Sorry, I could not help.") == (b"offline:Sorry, I could not help.", "audio/wav")
+    assert synthesizer.synthesize("Sorry,  I could not help. ")[0] == b"offline:Sorry, I could not help."
+    assert offline.spoken == ["Sorry, I could not help."]
+    assert cache.stats["memory_hits"] == 1
+
+    # A restart keeps the files: a fresh cache finds them on disk
+    fresh = AudioCache(directory=str(tmp_path))
+    assert SpeechSynthesizer(_FakeEngine("offline"), cache=fresh).synthesize("Sorry, I could not help.")[0].startswith(b"offline")
+    assert fresh.stats["disk_hits"] == 1
+
+    assert split_sentences("The library opens at 9. It closes at 5!\nBring your ID") == [
+        "The library opens at 9.", "It closes at 5!", "Bring your ID"
+    ]
+
+    async def collect():
+        return [(index, sentence, audio) async for index, sentence, audio, _ in synthesizer.stream("Hello there. Sorry, I could not help.")]
+    chunks = asyncio.run(collect())
+    assert chunks == [(0, "Hello there.", b"offline:Hello there."), (1, "Sorry, I could not help.", b"offline:Sorry, I could not help.")]
+    assert offline.spoken.count("Sorry, I could not help.") == 1
+
+    # The directory is kept under max_bytes
+    for n in range(100):
+        cache.put(AudioCache.key("v", str(n), "wav"), b"x" * 100)
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 1024
+
+
+def test_prompt_budget_dedupes_passages_and_compresses_scratchpad():
+    """Tests passage de-duplication, truncation and budget, and scratchpad compression of older steps."""
+    budget = PromptBudget(passage_tokens=30, retrieval_tokens=50, scratchpad_tokens=120, keep_recent_steps=1, summary_tokens=5)
+    office = "Prof. Sharma's office is in Block B, room 204, on the second floor of the science building."
+    passages = [office, office.upper() + " Visitors welcome.", "The library opens at 9 am. " * 10, "Cafeteria hours are 8 to 8."]
+    selected = budget.select_passages(passages)
+    assert len(selected) == 2 and selected[0] == office
+    assert estimate_tokens(selected[1]) <= 30 and selected[1].endswith(".")
+    assert budget.format_passages([]) == "No relevant information found in memory."
+
+    def step(n):
+        action = types.SimpleNamespace(tool="SearchSharedVectorMemory", tool_input=f"query {n}",
+                                       log=f"Thought: look up {n}\nAction: SearchSharedVectorMemory\nAction Input: query {n}")
+        return action, f"Observation number {n}. " + "detail " * 30
+
+    scratchpad = budget.format_scratchpad([step(1), step(2)])
+    assert "Thought: look up 2" in scratchpad and "detail " * 30 in scratchpad
+    assert "Thought: look up 1" not in scratchpad and "Action Input: query 1" in scratchpad
+
+    scratchpad = budget.format_scratchpad([step(n) for n in range(1, 8)])
+    assert scratchpad.startswith("(Earlier") and "Thought: look up 7" in scratchpad
+    assert estimate_tokens(scratchpad) <= 140
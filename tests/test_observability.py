@@ -0,0 +1,97 @@
+# File: tests/test_observability.py
+
+import sys
+import os
+
+# Add project root to path for imports
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from observability.metrics import MetricsRegistry, percentile
+from observability.http import instrument_app
+from observability.logs import JsonFormatter, RateLimitFilter, parse_level_overrides
+import json
+import logging
+
+def test_histogram_and_counter_render_prometheus_text():
+    """Tests bucket accumulation, labels and the exposition format."""
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_latency_seconds", "Test latency.", ["camera"], buckets=(0.01, 0.1, 1.0))
+    frames = registry.counter("test_frames_total", "Test frames.")
+
+    for value in (0.005, 0.05, 0.5, 5.0):
+        latency.labels(camera="Gate 1").observe(value)
+    frames.inc(3)
+
+    text = registry.render()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{camera="Gate 1",le="0.01"} 1' in text
+    assert 'test_latency_seconds_bucket{camera="Gate 1",le="1"} 3' in text
+    assert 'test_latency_seconds_bucket{camera="Gate 1",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{camera="Gate 1"} 4' in text
+    assert 'test_frames_total 3' in text
+    # Declaring a metric again returns the same object
+    assert registry.counter("test_frames_total", "Test frames.") is frames
+
+def test_percentile_is_nearest_rank_with_a_default_for_no_samples():
+    """Tests the shared percentile used by the /stats snapshots."""
+    ordered = [float(ms) for ms in range(1, 101)]
+    assert percentile(ordered, 0.50) == 51.0 and percentile(ordered, 0.95) == 96.0
+    assert percentile(ordered, 1.0) == 100.0
+    assert percentile([1.23456], 0.5, digits=1) == 1.2
+    assert percentile([], 0.5) is None and percentile([], 0.5, default=0.0) == 0.0
+
+def test_instrumented_app_exposes_request_metrics():
+    """Tests that requests are recorded by route template and served at /metrics."""
+    app = FastAPI()
+    instrument_app(app)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'neuracity_http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in response.text
+
+def _record(msg, *args, level=logging.INFO, **extra):
+    record = logging.LogRecord("modules.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_rate_limit_filter_samples_repeats_and_reports_suppressed():
+    """Tests that repeats of one template are burst-limited, sampled, and counted."""
+    rate_limit = RateLimitFilter(interval_seconds=60, burst=2, sample_every=3)
+    allowed = [rate_limit.filter(_record("Cooldown active for '%s'.", f"event{i}")) for i in range(8)]
+    # 2 burst records, then every 3rd repeat
+    assert allowed == [True, True, False, False, True, False, False, True]
+
+    sampled = _record("Cooldown active for '%s'.", "again")
+    for _ in range(2):
+        rate_limit.filter(_record("Cooldown active for '%s'.", "dropped"))
+    assert rate_limit.filter(sampled) is True
+    assert sampled.suppressed == 2
+
+    # Other templates and errors are never held back by this one
+    assert rate_limit.filter(_record("Different message")) is True
+    assert rate_limit.filter(_record("Cooldown active for '%s'.", "x", level=logging.ERROR)) is True
+
+def test_json_formatter_includes_extra_fields_and_level_overrides_parse():
+    """Tests the structured log line and the NEURACITY_LOG_LEVELS syntax."""
+    line = JsonFormatter("cv_watchtower").format(_record("TRIGGER [%s]", "cam1", camera_id="cam1"))
+    entry = json.loads(line)
+    assert entry["service"] == "cv_watchtower"
+    assert entry["message"] == "TRIGGER [cam1]"
+    assert entry["camera_id"] == "cam1"
+    assert entry["level"] == "INFO"
+
+    assert parse_level_overrides("modules.cv_watchtower=debug, observability=WARNING,,bad") == {
+        "modules.cv_watchtower": "DEBUG", "observability": "WARNING"
+    }
@@ -43,4 +43,173 @@ def test_call_security_validation_error():
     response = client.post("/api/actions/call_security", json=payload)
     
     # A 422 error code means "Unprocessable Entity," which is FastAPI's validation error.
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+def test_publish_many_uses_one_round_trip(monkeypatch):
+    """Tests that a burst of events goes out in a single pipeline without a PING per publish."""
+    import asyncio
+    import fakeredis
+    from modules.reflex_system import event_publisher
+
+    fake_redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(event_publisher, "EVENT_TRANSPORT", "pubsub")
+    monkeypatch.setattr(event_publisher.publisher, "_redis_client", fake_redis)
+    monkeypatch.setattr(event_publisher.publisher, "stats", event_publisher.PublishStats())
+
+    async def fail_on_ping():
+        raise AssertionError("publish should not PING Redis")
+    monkeypatch.setattr(fake_redis, "ping", fail_on_ping)
+
+    events = [("SECURITY_ALERT", {"location": f"Cam {i}"}) for i in range(5)]
+    asyncio.run(event_publisher.publisher.publish_many(events))
+
+    stats = event_publisher.publisher.stats.snapshot()
+    assert stats["round_trips"] == 1
+    assert stats["events_published"] == 5
+    assert stats["failures"] == 0
+
+def test_publisher_buffers_are_per_instance(monkeypatch):
+    """Tests that a newly created publisher does not share the stream buffer or stats of an earlier one."""
+    from modules.reflex_system.event_publisher import EventPublisher
+
+    monkeypatch.setattr(EventPublisher, "_instance", None)
+    first = EventPublisher()
+    monkeypatch.setattr(EventPublisher, "_instance", None)
+    second = EventPublisher()
+
+    first._stream_buffer.append(("pending", None))
+    assert first is not second
+    assert second._stream_buffer == []
+    assert first.stats is not second.stats
+
+def test_publisher_stats_endpoint():
+    """Tests that the publisher health and latency endpoint responds."""
+    response = client.get("/stats/publisher")
+    assert response.status_code == 200
+    assert "latency_ms_p95" in response.json()
+
+def test_audit_log_batches_and_rotates(tmp_path):
+    """Tests that queued audit lines are all written and that a full file is rotated into a gzip archive."""
+    import asyncio
+    import gzip
+    from modules.reflex_system.audit_log import AuditLogWriter
+
+    log_path = tmp_path / "system_action_log.txt"
+    writer = AuditLogWriter(path=str(log_path), max_bytes=200, rotate_interval_seconds=None)
+
+    async def scenario():
+        writer.start()
+        for i in range(20):
+            writer.record(f"[HIGH-PRIORITY SECURITY ALERT] Dispatched to: Gate {i}")
+            await asyncio.sleep(0)
+        await writer.stop()
+    asyncio.run(scenario())
+
+    archives = list(tmp_path.glob("system_action_log.*.txt.gz"))
+    assert archives
+    lines = log_path.read_text().splitlines()
+    for archive in archives:
+        lines += gzip.decompress(archive.read_bytes()).decode().splitlines()
+    assert len(lines) == 20
+    assert all(" - [HIGH-PRIORITY SECURITY ALERT]" in line for line in lines)
+
+def test_batch_coalesces_duplicate_actions(monkeypatch):
+    """Tests that identical actions in a batch run once and are recorded in one transaction."""
+    import uuid
+    import fakeredis
+    from modules.reflex_system import event_publisher
+    from modules.reflex_system.dedup import recent_actions
+    from memorycore.memory_manager import get_memory_core
+
+    monkeypatch.setattr(event_publisher, "EVENT_TRANSPORT", "pubsub")
+    monkeypatch.setattr(event_publisher.publisher, "_redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(event_publisher.publisher, "stats", event_publisher.PublishStats())
+    recent_actions.clear()
+
+    recorded = []
+    structured = get_memory_core().structured
+    monkeypatch.setattr(structured, "add_many", lambda source, events: recorded.append(events))
+
+    location = f"Camera {uuid.uuid4().hex[:8]} (CRITICAL: Fire/Smoke Detected)"
+    actions = [
+        {"action": "call_security", "location": location},
+        {"action": "call_security", "location": location},
+        {"action": "notify_admin", "department": "Security", "message": "Unattended object at Gate 2."},
+    ]
+    response = client.post("/api/actions/batch", json={"actions": actions})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["processed"], body["dispatched"], body["deduplicated"]) == (3, 2, 1)
+    assert body["results"][1]["deduplicated"] is True
+    assert body["results"][0]["duplicate_count"] == 1
+    assert len(recorded) == 1 and len(recorded[0]) == 2
+    assert event_publisher.publisher.stats.snapshot()["round_trips"] == 1
+
+def test_idempotency_key_replays_original_outcome(monkeypatch):
+    """Tests that a repeated Idempotency-Key is not executed again and a reused key with another payload is rejected."""
+    import uuid
+    from modules.reflex_system import action_handlers
+
+    dispatched = []
+    async def record_dispatch(prepared):
+        dispatched.extend(prepared)
+    monkeypatch.setattr(action_handlers, "_dispatch", record_dispatch)
+
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    first = client.post("/api/actions/notify_admin", json={"department": "IT", "message": "Server room door open."}, headers=headers)
+    second = client.post("/api/actions/notify_admin", json={"department": "IT", "message": "Server room door open."}, headers=headers)
+    conflict = client.post("/api/actions/notify_admin", json={"department": "IT", "message": "Different message."}, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["deduplicated"] is False
+    assert second.json()["deduplicated"] is True
+    assert len(dispatched) == 1
+    assert conflict.status_code == 409
+
+def test_notify_admin_answers_with_result_unless_async_is_preferred(monkeypatch):
+    """Tests that notify_admin returns the action result by default and a 202 only with 'Prefer: respond-async'."""
+    from modules.reflex_system import action_handlers
+
+    async def record_dispatch(prepared):
+        pass
+    monkeypatch.setattr(action_handlers, "_dispatch", record_dispatch)
+
+    payload = {"department": "Facilities", "message": "Lift 3 is stuck."}
+    response = client.post("/api/actions/notify_admin", json=payload)
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+
+    response = client.post("/api/actions/notify_admin", json=payload, headers={"Prefer": "respond-async"})
+    assert response.status_code in (200, 202)
+    if response.status_code == 202:
+        assert response.json()["status"] == "queued"
+
+def test_dispatcher_runs_security_first_and_rejects_when_full():
+    """Tests that queued security jobs overtake queued notifications and that a full lane raises LaneFull."""
+    import asyncio
+    from modules.reflex_system.dispatcher import ActionDispatcher, LaneFull
+
+    executed = []
+    async def execute(requests):
+        await asyncio.sleep(0.01)
+        executed.extend(action for action, _, _ in requests)
+        return [{"status": "success"} for _ in requests]
+
+    async def scenario():
+        dispatcher = ActionDispatcher(execute, workers=1, reserved_security_workers=0,
+                                      queue_sizes={"security": 10, "announcement": 10, "notification": 3})
+        dispatcher.start()
+        notifications = [await dispatcher.submit([("notify_admin", {"department": "IT", "message": f"Printer {i} jammed."}, None)])
+                         for i in range(3)]
+        with pytest.raises(LaneFull):
+            await dispatcher.submit([("notify_admin", {"department": "IT", "message": "One too many."}, None)])
+        security = await dispatcher.submit([("call_security", {"location": "Main Gate"}, None)])
+        await asyncio.gather(security, *notifications)
+        await dispatcher.stop()
+        return dispatcher.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    # Everything was queued before the worker first ran: security goes first although it was submitted last
+    assert executed == ["call_security", "notify_admin", "notify_admin", "notify_admin"]
+    assert snapshot["lanes"]["notification"]["rejected"] == 1
+    assert snapshot["lanes"]["security"]["completed"] == 1